@@ -1,7 +1,13 @@
+import datetime
 import time
-from utils import read_flights, append_flight, write_flights, display_table
-from db_connection import get_connection
+from utils import display_table
+import mysql.connector
+from db_connection import connection
+from services import inventory, reports
+from services.errors import NotFound, ServiceError
 from tabulate import tabulate
+from config import get_setting
+from flight_import import run_import
 
 def admin_menu():
     # shows admin menu until exit
@@ -14,7 +20,10 @@ def admin_menu():
 4. Update Flight
 5. View Bookings
 6. View Feedback
-7. Exit
+7. Import Flights
+8. Route Summary
+9. Sales Report
+10. Exit
 """)
         c = input("Enter choice: ").strip()
         if c == "1":
@@ -30,6 +39,12 @@ def admin_menu():
         elif c == "6":
             view_feedback()
         elif c == "7":
+            import_flights()
+        elif c == "8":
+            route_summary()
+        elif c == "9":
+            sales_report()
+        elif c == "10":
             print("Exiting Admin Menu...")
             time.sleep(1)
             break
@@ -39,22 +54,17 @@ def admin_menu():
 
 def add_flight():
     # adds a new flight
-    flights = read_flights()
-    existing_ids = {f[0].upper() for f in flights if len(f) >= 1}
-
     while True:
         fid = input("Flight ID (or type 'cancel' to abort): ").strip().upper()
         if fid.lower() == "cancel":
             print("Cancelled.")
             time.sleep(1)
             return
-        if not fid:
-            print("Flight ID cannot be empty.")
-            continue
-        if fid in existing_ids:
-            print("Flight ID already exists.")
-            continue
-        break
+        try:
+            fid = inventory.check_new_flight_id(fid)
+            break
+        except ServiceError as err:
+            print(err)
 
     src = input("Source: ").strip()
     dst = input("Destination: ").strip()
@@ -67,13 +77,10 @@ def add_flight():
             time.sleep(1)
             return
         try:
-            price = float(price_input)
-            if price <= 0:
-                print("Price must be positive.")
-                continue
+            price = inventory.parse_price(price_input)
             break
-        except ValueError:
-            print("Invalid price.")
+        except ServiceError as err:
+            print(err)
 
     # seats input
     while True:
@@ -83,22 +90,112 @@ def add_flight():
             time.sleep(1)
             return
         try:
-            seats = int(seats_input)
-            if seats <= 0:
-                print("Seats must be positive.")
-                continue
+            seats = inventory.parse_seats(seats_input, allow_zero=False)
             break
-        except ValueError:
-            print("Invalid seat number.")
+        except ServiceError as err:
+            print(err)
 
-    new_flight = [fid, src, dst, str(price), str(seats)]
-    append_flight(new_flight)
+    try:
+        inventory.add_flight(fid, src, dst, price, seats)
+    except ServiceError as err:
+        print(err)
+        time.sleep(1)
+        return
     print("Flight added successfully!")
     time.sleep(1)
 
+def import_flights():
+    # bulk imports a CSV or JSONL schedule file
+    path = input("Schedule file (.csv or .jsonl, or type 'cancel' to abort): ").strip()
+    if not path or path.lower() == "cancel":
+        print("Cancelled.")
+        time.sleep(1)
+        return
+    run_import(path)
+    time.sleep(1)
+
+def route_summary():
+    # seats left and average fare per route, optionally filtered
+    src = input("Source (blank = all): ").strip()
+    dst = input("Destination (blank = all): ").strip()
+    try:
+        rows = inventory.route_summary(src, dst)
+    except ServiceError as err:
+        print(err)
+        time.sleep(1)
+        return
+    print("\n--- Route Summary ---")
+    display_table(rows, ["Source", "Destination", "Flights", "Seats Left", "Average Fare"])
+
+SALES_HEADERS = ["Bookings", "Cancelled", "Seats Sold", "Gross", "Refunds",
+                 "Net Revenue", "Load Factor"]
+
+def _load_factor(row):
+    # report row with its load factor as a percentage
+    return row[:-1] + ["N/A" if row[-1] is None else f"{row[-1]:.1%}"]
+
+def _sales_rows(report, day=None):
+    # report rows for the pager, read a page at a time as it asks for
+    # more; the first page is read now so an error shows before the table
+    rows, after = report(day)
+
+    def pages(rows, after):
+        while True:
+            for r in rows:
+                # the daily reports have no load factor
+                yield r[:-1] if day else _load_factor(r)
+            if after is None:
+                return
+            rows, after = report(day, after)
+
+    return pages(rows, after)
+
+def sales_report():
+    # sales totals by flight, route or day from the summary tables
+    print("""
+1. By Flight
+2. By Route
+3. By Flight (today)
+4. By Route (today)
+5. By Day (last 30 days)
+6. Rebuild Summaries
+""")
+    c = input("Enter choice: ").strip()
+    today = datetime.date.today()
+    try:
+        if c == "1":
+            rows = _sales_rows(reports.sales_by_flight)
+            headers = ["Flight ID", "Source", "Destination"] + SALES_HEADERS
+        elif c == "2":
+            rows = _sales_rows(reports.sales_by_route)
+            headers = ["Source", "Destination"] + SALES_HEADERS
+        elif c == "3":
+            rows = _sales_rows(reports.sales_by_flight, today)
+            headers = ["Flight ID", "Source", "Destination"] + SALES_HEADERS[:-1]
+        elif c == "4":
+            rows = _sales_rows(reports.sales_by_route, today)
+            headers = ["Source", "Destination"] + SALES_HEADERS[:-1]
+        elif c == "5":
+            rows = [r[:-1] for r in reports.sales_by_day(30)]
+            headers = ["Day"] + SALES_HEADERS[:-1]
+        elif c == "6":
+            print(f"Summaries rebuilt for {reports.rebuild()} flights.")
+            time.sleep(1)
+            return
+        else:
+            print("Invalid choice.")
+            time.sleep(1)
+            return
+    except ServiceError as err:
+        print(err)
+        time.sleep(1)
+        return
+    print("\n--- Sales Report ---")
+    display_table(rows, headers, empty="No sales yet.")
+
 def view_flights():
     # shows all flights
-    flights = read_flights()
+    flights = inventory.list_flights()
     if not flights:
         print("No flights available.")
         time.sleep(1)
@@ -108,7 +205,7 @@ def view_flights():
 
 def remove_flight():
     # removes a flight by id
-    flights = read_flights()
+    flights = inventory.list_flights()
     if not flights:
         print("No flights to remove.")
         time.sleep(1)
@@ -124,19 +221,43 @@ def remove_flight():
             time.sleep(1)
             return
 
-        if fid not in [f[0].upper() for f in flights if len(f) >= 1]:
-            print("Flight ID not found.")
+        try:
+            inventory.find_flight(fid)
+            booked = inventory.bookings_on_flight(fid)
+        except NotFound as err:
+            print(err)
             continue
+        except ServiceError as err:
+            print(err)
+            time.sleep(1)
+            return
+        break
 
-        flights[:] = [f for f in flights if f[0] != fid]
-        write_flights(flights)
-        print("Flight removed successfully.")
+    # bookings on the flight are cancelled and refunded with it
+    reason = None
+    if booked:
+        confirm = input(f"{booked} booking(s) will be cancelled and refunded. "
+                        "Continue? (y/n): ").strip().lower()
+        if confirm != "y":
+            print("Cancelled.")
+            time.sleep(1)
+            return
+        reason = input("Reason (optional): ").strip() or None
+
+    try:
+        cancelled = inventory.remove_flight(fid, reason)
+    except ServiceError as err:
+        print(err)
         time.sleep(1)
-        break
+        return
+    print("Flight removed successfully.")
+    if cancelled:
+        print(f"{cancelled} booking(s) cancelled and refunded.")
+    time.sleep(1)
 
 def update_flight():
     # updates flight details
-    flights = read_flights()
+    flights = inventory.list_flights()
     if not flights:
         print("No flights to update.")
         time.sleep(1)
@@ -145,127 +266,263 @@ def update_flight():
     print("\n--- Available Flights to Update ---")
     display_table(flights)
 
-    selected_flight = None
-
     while True:
         fid = input("Enter Flight ID to update (or 'cancel'): ").strip().upper()
         if fid.lower() == "cancel":
             print("Cancelled.")
             time.sleep(1)
             return
-
-        for f in flights:
-            if f[0] == fid:
-                selected_flight = f
-                break
-
-        if selected_flight:
+        try:
+            f = inventory.find_flight(fid)
             break
-        else:
-            print("Flight ID not found.")
+        except ServiceError as err:
+            print(err)
 
-    f = selected_flight
     print(f"\nEditing Flight ID: {fid}")
 
     src = input(f"New Source (Current: {f[1]}): ").strip()
-    if src:
-        f[1] = src
-
     dst = input(f"New Destination (Current: {f[2]}): ").strip()
-    if dst:
-        f[2] = dst
 
+    price = None
     while True:
         price_input = input(f"New Price (Current: {f[3]}): ").strip()
         if not price_input:
             break
         try:
-            price = float(price_input)
-            if price > 0:
-                f[3] = str(price)
-                break
-            else:
-                print("Price must be positive.")
-        except ValueError:
-            print("Invalid price.")
+            price = inventory.parse_price(price_input)
+            break
+        except ServiceError as err:
+            print(err)
 
+    seats = None
     while True:
         seats_input = input(f"New Seats (Current: {f[4]}): ").strip()
         if not seats_input:
             break
         try:
-            seats = int(seats_input)
-            if seats >= 0:
-                f[4] = str(seats)
-                break
-            else:
-                print("Seats cannot be negative.")
-        except ValueError:
-            print("Invalid seat number.")
+            seats = inventory.parse_seats(seats_input)
+            break
+        except ServiceError as err:
+            print(err)
 
-    write_flights(flights)
+    try:
+        inventory.update_flight(fid, src, dst, price, seats)
+    except ServiceError as err:
+        print(err)
+        time.sleep(1)
+        return
     print("Flight details updated.")
     time.sleep(1)
 
-def view_bookings():
-    # shows booking details
-    con = get_connection()
-    cur = con.cursor()
-
-    all_rows = []
-
-    cur.execute("""
-        SELECT b.id, u.username, b.flight_id, b.seats_booked, b.booking_date
-        FROM bookings b
-        JOIN users u ON b.user_id = u.id
-        ORDER BY b.booking_date DESC
-    """)
-    active_rows = cur.fetchall()
-
-    for row in active_rows:
-        all_rows.append(list(row) + ["Active", "-"])
-
-    cur.execute("""
-        SELECT booking_id, username, flight_id, seats_booked, booking_date, reason
-        FROM cancelled_bookings
-        ORDER BY cancellation_date DESC
-    """)
-    cancelled_rows = cur.fetchall()
-
-    for row in cancelled_rows:
-        all_rows.append(list(row[:5]) + ["Cancelled"] + list(row[5:]))
-
-    cur.close()
-    con.close()
-
-    if not all_rows:
-        print("No booking records found.")
+BOOKING_HEADERS = ["Booking ID", "User", "Flight ID", "Seats", "Booking Date", "Status", "Reason"]
+
+def _booking_branch(select, alias, id_col, filters, after):
+    # one side of the UNION ALL with filters and the keyset pushed down
+    where, params = [], []
+    if filters.get("flight_id"):
+        where.append(f"{alias}.flight_id = %s")
+        params.append(filters["flight_id"])
+    if filters.get("date_from"):
+        where.append(f"{alias}.booking_date >= %s")
+        params.append(filters["date_from"])
+    if filters.get("date_to"):
+        where.append(f"{alias}.booking_date < %s")
+        params.append(filters["date_to"])
+    if after:
+        where.append(f"({alias}.booking_date < %s OR "
+                     f"({alias}.booking_date = %s AND {id_col} < %s))")
+        params += [after[0], after[0], after[1]]
+    sql = select
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    # each branch is limited as well, so neither side is read past one page
+    sql += f" ORDER BY {alias}.booking_date DESC, {id_col} DESC LIMIT %s"
+    return sql, params
+
+def _booking_page(filters, after, size):
+    # one page of bookings, newest first, starting after the (date, id) key;
+    # returns (rows, more) or None on a database error
+    branches = []
+    status = filters.get("status", "all")
+    if status in ("all", "active"):
+        branches.append(_booking_branch(
+            "SELECT b.id AS booking_id, u.username, b.flight_id, b.seats_booked, "
+            "b.booking_date, 'Active' AS status, '-' AS reason "
+            "FROM bookings b JOIN users u ON b.user_id = u.id",
+            "b", "b.id", filters, after))
+    if status in ("all", "cancelled"):
+        branches.append(_booking_branch(
+            "SELECT c.booking_id, c.username, c.flight_id, c.seats_booked, c.booking_date, "
+            "'Cancelled', c.reason FROM cancelled_bookings c",
+            "c", "c.booking_id", filters, after))
+
+    limit = size + 1
+    parts, params = [], []
+    for n, (sql, p) in enumerate(branches):
+        # derived tables keep each branch's ORDER BY/LIMIT on mysql and sqlite
+        parts.append(f"SELECT * FROM ({sql}) AS page{n}")
+        params += p + [limit]
+    query = (" UNION ALL ".join(parts)
+             + " ORDER BY booking_date DESC, booking_id DESC LIMIT %s")
+    params.append(limit)
+
+    try:
+        with connection() as con:
+            # unbuffered: rows are read from the server as they are iterated
+            cur = con.cursor(buffered=False)
+            cur.execute(query, params)
+            rows = [list(r) for r in cur]
+            cur.close()
+    except mysql.connector.Error as err:
+        print("Database error:", err.msg)
         time.sleep(1)
+        return None
+    return rows[:size], len(rows) > size
+
+def _ask_booking_filters():
+    # reads optional filters; returns a dict, or None if cancelled
+    status = input("Status (all/active/cancelled, blank for all): ").strip().lower() or "all"
+    if status not in ("all", "active", "cancelled"):
+        print("Invalid status.")
+        time.sleep(1)
+        return None
+    filters = {"status": status}
+    fid = input("Flight ID (blank for any): ").strip().upper()
+    if fid:
+        filters["flight_id"] = fid
+    dates = _ask_date_range()
+    if dates is None:
+        return None
+    for key, day in zip(("date_from", "date_to"), dates):
+        if day is not None:
+            filters[key] = day
+    return filters
+
+def _ask_date_range():
+    # reads optional from/to dates; returns (start, end) with the end made
+    # exclusive and None for a blank date, or None if a date is invalid
+    days = []
+    for prompt in ("From date YYYY-MM-DD (blank for any): ",
+                   "To date YYYY-MM-DD (blank for any): "):
+        value = input(prompt).strip()
+        if not value:
+            days.append(None)
+            continue
+        try:
+            days.append(datetime.datetime.strptime(value, "%Y-%m-%d"))
+        except ValueError:
+            print("Invalid date.")
+            time.sleep(1)
+            return None
+    if days[1] is not None:
+        days[1] += datetime.timedelta(days=1)  # inclusive end date
+    return days[0], days[1]
+
+def view_bookings():
+    # shows booking details one page at a time
+    filters = _ask_booking_filters()
+    if filters is None:
         return
+    size = get_setting("page_size", 20, int)
 
-    print("\n--- All Booking Records ---")
-    headers = ["Booking ID", "User", "Flight ID", "Seats", "Booking Date", "Status", "Reason"]
-    print(tabulate(all_rows, headers=headers, tablefmt="grid"))
-    time.sleep(1)
+    # cursors[i] is the key the i-th page starts after
+    cursors = [None]
+    while True:
+        page = _booking_page(filters, cursors[-1], size)
+        if page is None:
+            return
+        rows, more = page
+        if not rows and len(cursors) == 1:
+            print("No booking records found.")
+            time.sleep(1)
+            return
+
+        print(f"\n--- Booking Records (page {len(cursors)}) ---")
+        print(tabulate(rows, headers=BOOKING_HEADERS, tablefmt="grid"))
+
+        options = []
+        if more:
+            options.append("n = next")
+        if len(cursors) > 1:
+            options.append("p = previous")
+        options.append("q = back")
+        c = input(f"[{', '.join(options)}]: ").strip().lower()
+        if c == "n" and more:
+            cursors.append((rows[-1][4], rows[-1][0]))
+        elif c == "p" and len(cursors) > 1:
+            cursors.pop()
+        elif c == "q":
+            return
+
+FEEDBACK_PAGE_SQL = """
+    SELECT f.id, u.username, u.email, f.message, f.created_at
+    FROM feedback f JOIN users u ON f.user_id = u.id
+    {where}
+    ORDER BY f.created_at DESC, f.id DESC
+    LIMIT %s
+"""
+
+def _feedback_rows(batch=200):
+    # all feedback, newest first, read a batch at a time as the pager
+    # asks for more; each batch starts after the last row of the one before
+    after = None
+    while True:
+        with connection() as con:
+            cur = con.cursor()
+            if after is None:
+                cur.execute(FEEDBACK_PAGE_SQL.format(where=""), (batch,))
+            else:
+                cur.execute(FEEDBACK_PAGE_SQL.format(
+                    where="WHERE f.created_at < %s OR (f.created_at = %s AND f.id < %s)"),
+                    (after[0], after[0], after[1], batch))
+            rows = cur.fetchall()
+            cur.close()
+        yield from rows
+        if len(rows) < batch:
+            return
+        after = (rows[-1][4], rows[-1][0])
+
+def _search_rows(text, since, until, order):
+    # matching feedback, best or newest first; the first batch is read now
+    # so a bad search fails before anything is shown, later ones as the
+    # pager asks for more
+    rows, after = reports.search_feedback(text, since, until, order, limit=200)
+
+    def batches(rows, after):
+        while True:
+            yield from (r[:5] for r in rows)
+            if after is None:
+                return
+            rows, after = reports.search_feedback(text, since, until, order, after, limit=200)
+
+    return batches(rows, after)
 
 def view_feedback():
-    # shows feedback given by users
-    con = get_connection()
-    cur = con.cursor()
-    cur.execute("""
-        SELECT f.id, u.username, u.email, f.message, f.created_at
-        FROM feedback f JOIN users u ON f.user_id = u.id
-        ORDER BY f.created_at DESC
-    """)
-    rows = cur.fetchall()
-    cur.close()
-    con.close()
-
-    if not rows:
-        print("No feedback found.")
+    # shows feedback given by users, or the messages matching a search,
+    # a page at a time
+    text = input("Search words (blank for all feedback): ").strip()
+    try:
+        if not text:
+            print("\n--- All Feedback Messages ---")
+            display_table(_feedback_rows(), ["ID", "User", "Email", "Message", "Date"],
+                          empty="No feedback found.")
+            return
+        dates = _ask_date_range()
+        if dates is None:
+            return
+        order = input("Order by relevance or date (r/d, blank for relevance): ").strip().lower()
+        if order not in ("", "r", "d"):
+            print("Invalid choice.")
+            time.sleep(1)
+            return
+        order = "newest" if order == "d" else "rank"
+        rows = _search_rows(text, dates[0], dates[1], order)
+        print(f"\n--- Feedback matching '{text}' ---")
+        display_table(rows, ["ID", "User", "Email", "Message", "Date"],
+                      empty="No matching feedback found.")
+    except ServiceError as err:
+        print(err)
+        time.sleep(1)
+    except mysql.connector.Error as err:
+        print(f"Database error: {err.msg}")
         time.sleep(1)
-        return
-
-    print("\n--- All Feedback Messages ---")
-    print(tabulate(rows, headers=["ID", "User", "Email", "Message", "Date"], tablefmt="grid"))
-    time.sleep(1)
@@ -0,0 +1,365 @@
+import asyncio
+import base64
+import json
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+import metrics
+from config import get_setting
+from db_connection import initialize_database, close_pools
+from receipts import close_receipt_writer
+from services import auth, booking, inventory
+from services.errors import (AuthenticationError, Conflict, NotFound, ServiceError,
+                             Unavailable, ValidationError)
+from utils import ensure_file_exists
+
+# JSON over HTTP/1.1 for kiosks and web front ends, next to the console
+# entry point in main.py. The event loop only parses requests; every
+# service call runs on a bounded thread pool with a per-request timeout.
+#
+#   GET  /health
+#   GET  /metrics              Prometheus text format (metrics=on)
+#   GET  /flights?source=&destination=&min_price=&max_price=
+#   POST /users                {"username", "email", "password"}
+#   GET  /bookings                                          (auth)
+#   POST /bookings             {"flight_id", "seats"}       (auth)
+#   POST /bookings/<id>/cancel {"reason"}                   (auth)
+#   POST /feedback             {"message"}                  (auth)
+#
+# (auth) endpoints take HTTP Basic credentials: username or email and
+# password, as in the console login.
+
+MAX_BODY = 64 * 1024
+
+STATUS_TEXT = {
+    200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized",
+    404: "Not Found", 405: "Method Not Allowed", 409: "Conflict",
+    413: "Payload Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+ERROR_STATUS = [
+    (ValidationError, 400),
+    (AuthenticationError, 401),
+    (NotFound, 404),
+    (Conflict, 409),
+    (Unavailable, 503),
+]
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _number(query, key, default):
+    value = query.get(key, [""])[0].strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        raise ValidationError("Invalid price.")
+
+
+def _user(headers):
+    # Session from HTTP Basic credentials, checked against the users table
+    value = headers.get("authorization", "")
+    if not value.lower().startswith("basic "):
+        raise HTTPError(401, "Login required.")
+    try:
+        identifier, _, password = base64.b64decode(value[6:]).decode("utf-8").partition(":")
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPError(401, "Login required.")
+    try:
+        return auth.login(identifier, password)
+    except NotFound:
+        raise AuthenticationError("User not found.")
+
+
+def _flight_json(flight):
+    return {"id": flight[0], "source": flight[1], "destination": flight[2],
+            "price": float(flight[3]), "seats": int(flight[4])}
+
+
+# handlers run on the thread pool: (query, body, headers, path args) -> (status, payload)
+
+def search(query, body, headers):
+    results = inventory.search_flights(
+        query.get("source", [""])[0], query.get("destination", [""])[0],
+        _number(query, "min_price", 0.0), _number(query, "max_price", float("inf"))
+    )
+    return 200, {"flights": [_flight_json(f) for f in results]}
+
+
+def register(query, body, headers):
+    session = auth.register_user(str(body.get("username", "")).strip(),
+                                 str(body.get("email", "")).strip(),
+                                 str(body.get("password", "")).strip())
+    return 201, {"id": session.id}
+
+
+def my_bookings(query, body, headers):
+    rows = booking.user_bookings(_user(headers))
+    return 200, {"bookings": [
+        {"id": bid, "flight_id": fid, "source": src, "destination": dst, "seats": seats,
+         "price_per_seat": None if price is None else float(price),
+         "total_amount": None if total is None else float(total),
+         "booking_date": str(bdate), "receipt_id": receipt}
+        for bid, fid, src, dst, seats, price, total, bdate, receipt in rows
+    ]}
+
+
+def book(query, body, headers):
+    result = booking.book_flight(_user(headers), str(body.get("flight_id", "")),
+                                 body.get("seats", 1))
+    return 201, {"receipt_id": result["receipt_id"], "flight": _flight_json(result["flight"]),
+                 "seats": result["seats"], "total_cost": result["total_cost"],
+                 "seats_left": result["seats_left"]}
+
+
+def cancel(query, body, headers, booking_id):
+    result = booking.cancel_booking(_user(headers), booking_id, body.get("reason"))
+    return 200, {"booking_id": result["booking_id"], "seats": result["seats"],
+                 "total_amount": result["total_amount"], "refunded": result["refunded"]}
+
+
+def feedback(query, body, headers):
+    booking.send_feedback(_user(headers), str(body.get("message", "")))
+    return 201, {}
+
+
+def health(query, body, headers):
+    auth.check_database()
+    return 200, {"status": "ok"}
+
+
+def metrics_text(query, body, headers):
+    if not metrics.enabled():
+        raise HTTPError(404, "Metrics are off.")
+    return 200, metrics.render()
+
+
+ROUTES = {
+    ("GET", "/health"): health,
+    ("GET", "/metrics"): metrics_text,
+    ("GET", "/flights"): search,
+    ("POST", "/users"): register,
+    ("GET", "/bookings"): my_bookings,
+    ("POST", "/bookings"): book,
+    ("POST", "/feedback"): feedback,
+}
+
+
+def route(method, path):
+    # (handler, path args); raises HTTPError for unknown paths
+    handler = ROUTES.get((method, path))
+    if handler:
+        return handler, ()
+    parts = path.strip("/").split("/")
+    if len(parts) == 3 and parts[0] == "bookings" and parts[2] == "cancel":
+        if method != "POST":
+            raise HTTPError(405, "Method not allowed.")
+        return cancel, (parts[1],)
+    if any(p == path for _, p in ROUTES):
+        raise HTTPError(405, "Method not allowed.")
+    raise HTTPError(404, "Not found.")
+
+
+def call(handler, query, body, headers, args):
+    # runs on a worker thread; maps service errors to a status
+    try:
+        return handler(query, body, headers, *args)
+    except HTTPError as err:
+        return err.status, {"error": str(err)}
+    except ServiceError as err:
+        for kind, status in ERROR_STATUS:
+            if isinstance(err, kind):
+                return status, {"error": str(err)}
+        return 500, {"error": str(err)}
+
+
+class APIServer:
+    # asyncio HTTP server; keep-alive connections, JSON bodies
+
+    def __init__(self, host="127.0.0.1", port=8080, workers=None,
+                 timeout=10.0, idle_timeout=30.0, max_pending=None):
+        self.host = host
+        self.port = port
+        workers = workers or get_setting("pool_size", 5, int)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="api")
+        # calls allowed running or waiting for a worker (timed-out ones
+        # included, until they return) before new requests get 503
+        self._pending = asyncio.Semaphore(max_pending or workers * 4)
+        self._server = None
+        self._in_flight = 0
+        self._idle = None
+        self._stopping = False
+
+    async def start(self):
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._server = await asyncio.start_server(self._client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def _read_request(self, reader):
+        # (method, target, headers, body) or None when the client is done
+        line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line.")
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), self.timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length.")
+        if length > MAX_BODY:
+            raise HTTPError(413, "Request body too large.")
+        body = await asyncio.wait_for(reader.readexactly(length), self.timeout) if length else b""
+        return method.upper(), target, headers, body
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        # str payloads are sent as plain text, everything else as JSON
+        if isinstance(payload, str):
+            data, kind = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, kind = json.dumps(payload).encode("utf-8"), "application/json"
+        head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: {kind}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def _handle(self, method, target, headers, body):
+        # parses one request and runs its handler on the pool
+        url = urlsplit(target)
+        handler, args = route(method, url.path.rstrip("/") or "/")
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(400, "Body must be JSON.")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "Body must be a JSON object.")
+        query = parse_qs(url.query)
+
+        try:
+            await asyncio.wait_for(self._pending.acquire(), self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(503, "Server busy.")
+        try:
+            work = asyncio.get_running_loop().run_in_executor(
+                self._executor, call, handler, query, payload, headers, args)
+        except BaseException:
+            self._pending.release()
+            raise
+        # the slot is held until the call itself ends, not the request: a
+        # timed-out call keeps its worker until the database returns, and
+        # must keep counting against api_max_pending until then
+        work.add_done_callback(self._finished)
+        try:
+            return await asyncio.wait_for(asyncio.shield(work), self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(504, "Request timed out.")
+
+    def _finished(self, work):
+        self._pending.release()
+        if not work.cancelled():
+            # an error after a 504 has no one left to report it to
+            work.exception()
+
+    async def _client(self, reader, writer):
+        try:
+            while not self._stopping:
+                try:
+                    request = await self._read_request(reader)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HTTPError as err:
+                    await self._respond(writer, err.status, {"error": str(err)}, False)
+                    break
+                if request is None:
+                    break
+
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._in_flight += 1
+                self._idle.clear()
+                try:
+                    status, payload = await self._handle(method, target, headers, body)
+                except HTTPError as err:
+                    status, payload = err.status, {"error": str(err)}
+                except Exception as err:
+                    print("API error:", err)
+                    status, payload = 500, {"error": "Internal error."}
+                finally:
+                    self._in_flight -= 1
+                    if not self._in_flight:
+                        self._idle.set()
+                await self._respond(writer, status, payload, keep_alive and not self._stopping)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self, grace=10.0):
+        # stop accepting, let in-flight requests finish, then release workers
+        self._stopping = True
+        self._server.close()
+        await self._server.wait_closed()
+        try:
+            await asyncio.wait_for(self._idle.wait(), grace)
+        except asyncio.TimeoutError:
+            print(f"Shutting down with {self._in_flight} request(s) still running.")
+        self._executor.shutdown(wait=True)
+
+
+async def serve(host, port):
+    server = APIServer(
+        host, port,
+        workers=get_setting("api_workers", 0, int),
+        timeout=get_setting("api_timeout", 10, float),
+        max_pending=get_setting("api_max_pending", 0, int),
+    )
+    await server.start()
+    print(f"API listening on http://{server.host}:{server.port}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop.set))
+    await stop.wait()
+
+    print("Shutting down API...")
+    await server.stop(get_setting("api_shutdown_grace", 10, float))
+
+
+if __name__ == "__main__":
+    # python api_server.py [port] [host]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else get_setting("api_port", 8080, int)
+    host = sys.argv[2] if len(sys.argv) > 2 else get_setting("api_host", "127.0.0.1")
+    initialize_database()
+    ensure_file_exists()
+    try:
+        asyncio.run(serve(host, port))
+    finally:
+        close_receipt_writer()
+        close_pools()
@@ -0,0 +1,138 @@
+import asyncio
+import base64
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Latency and throughput of api_server.py at several client counts. Starts
+# the server against a throwaway SQLite database unless a URL is given.
+# Each client keeps one connection open and sends a mix of searches,
+# bookings and booking lists.
+# Usage: python benchmarks/bench_api.py [requests per client] [clients,...] [host:port]
+
+FLIGHTS = 200
+USER = ("bench_api", "bench_api@example.com", "bench")
+
+
+async def request(reader, writer, method, path, body=None, auth=None):
+    # one keep-alive request; returns (status, payload)
+    data = json.dumps(body).encode() if body is not None else b""
+    head = f"{method} {path} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(data)}\r\n"
+    if auth:
+        head += f"Authorization: Basic {auth}\r\n"
+    writer.write((head + "\r\n").encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode().partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length)) if length else {}
+
+
+async def client(host, port, count, seed, auth, latencies, errors):
+    rnd = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            roll = rnd.random()
+            start = time.perf_counter()
+            if roll < 0.7:
+                status, _ = await request(reader, writer, "GET",
+                                          f"/flights?source=city{rnd.randrange(20)}")
+            elif roll < 0.9:
+                status, _ = await request(reader, writer, "POST", "/bookings",
+                                          {"flight_id": f"BA{rnd.randrange(FLIGHTS)}",
+                                           "seats": 1}, auth)
+            else:
+                status, _ = await request(reader, writer, "GET", "/bookings", auth=auth)
+            latencies.append(time.perf_counter() - start)
+            if status >= 500:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_level(host, port, clients, count, auth):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*[client(host, port, count, i, auth, latencies, errors)
+                           for i in range(clients)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"{clients:>4} clients | {len(latencies):6} requests | {len(latencies) / elapsed:8.1f} req/s | "
+          f"p50 {pct(0.50):7.1f} ms | p95 {pct(0.95):7.1f} ms | p99 {pct(0.99):7.1f} ms | "
+          f"{len(errors)} errors")
+
+
+async def wait_ready(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            status, _ = await request(reader, writer, "GET", "/health")
+            writer.close()
+            if status == 200:
+                return
+        except (ConnectionError, OSError):
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API server did not start")
+
+
+def start_server(workdir, port):
+    # server with its own config, flight file and SQLite database
+    with open(os.path.join(workdir, "db_config.txt"), "w") as f:
+        f.write(f"db_backend=sqlite\nsqlite_path={os.path.join(workdir, 'bench.db')}\n"
+                "receipt_mode=archive\npool_size=8\n")
+    with open(os.path.join(workdir, "flights.csv"), "w") as f:
+        f.write("id,source,destination,price,seats\n")
+        for i in range(FLIGHTS):
+            f.write(f"BA{i},City{i % 20},City{(i + 7) % 20},{100 + i},1000000\n")
+    return subprocess.Popen([sys.executable, os.path.join(ROOT, "api_server.py"), str(port)],
+                            cwd=workdir, stdout=subprocess.DEVNULL)
+
+
+async def main(count, levels, target):
+    host, port = target
+    await wait_ready(host, port)
+    reader, writer = await asyncio.open_connection(host, port)
+    await request(reader, writer, "POST", "/users",
+                  {"username": USER[0], "email": USER[1], "password": USER[2]})
+    writer.close()
+    auth = base64.b64encode(f"{USER[0]}:{USER[2]}".encode()).decode()
+    for clients in levels:
+        await run_level(host, port, clients, count, auth)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    levels = [int(n) for n in sys.argv[2].split(",")] if len(sys.argv) > 2 else [1, 10, 100]
+    server = None
+    if len(sys.argv) > 3:
+        host, _, port = sys.argv[3].partition(":")
+        target = (host, int(port))
+    else:
+        workdir = tempfile.mkdtemp(prefix="bench_api_")
+        target = ("127.0.0.1", 18080)
+        server = start_server(workdir, target[1])
+    try:
+        asyncio.run(main(count, levels, target))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
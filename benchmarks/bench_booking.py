@@ -0,0 +1,98 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db_connection import initialize_database, connection
+from sales_summary import rebuild as rebuild_sales
+from services.booking import create_booking
+
+# Concurrency stress test for the booking transaction: N threads keep
+# booking one seat on the same flight until it is sold out. Checks that
+# nothing was oversold and prints bookings per second.
+# Usage: python benchmarks/bench_booking.py [bookers] [seats]
+
+FLIGHT = ["STRESS01", "Benchmark", "Benchmark", "100.0", "0"]
+USER = ("bench_booker", "bench_booker@example.com", "bench")
+
+
+def setup(seats):
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("DELETE FROM bookings WHERE flight_id=%s", (FLIGHT[0],))
+        cur.execute("""
+            INSERT INTO flights (id, source, destination, price, seats)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE seats=VALUES(seats)
+        """, (FLIGHT[0], FLIGHT[1], FLIGHT[2], FLIGHT[3], seats))
+        cur.execute("SELECT id FROM users WHERE username=%s", (USER[0],))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute("INSERT INTO users (username, email, password) VALUES (%s, %s, %s)", USER)
+            user_id = cur.lastrowid
+        else:
+            user_id = row[0]
+        con.commit()
+        cur.close()
+    return user_id
+
+
+def cleanup(user_id):
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("DELETE FROM bookings WHERE flight_id=%s", (FLIGHT[0],))
+        cur.execute("DELETE FROM flights WHERE id=%s", (FLIGHT[0],))
+        cur.execute("DELETE FROM users WHERE id=%s", (user_id,))
+        # the summaries counted the benchmark's sales
+        rebuild_sales(cur)
+        con.commit()
+        cur.close()
+
+
+def booker(user_id, results, index):
+    # checks a pooled connection out per booking, like the menus do
+    booked = 0
+    while True:
+        with connection() as con:
+            if create_booking(con, user_id, FLIGHT, 1, f"STRESS-{index}-{booked}") is None:
+                break
+        booked += 1
+    results[index] = booked
+
+
+def run(bookers, seats):
+    user_id = setup(seats)
+    results = [0] * bookers
+    threads = [threading.Thread(target=booker, args=(user_id, results, i)) for i in range(bookers)]
+
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT seats FROM flights WHERE id=%s", (FLIGHT[0],))
+        seats_left = cur.fetchone()[0]
+        cur.execute("SELECT COALESCE(SUM(seats_booked), 0) FROM bookings WHERE flight_id=%s", (FLIGHT[0],))
+        seats_booked = int(cur.fetchone()[0])
+        cur.close()
+    cleanup(user_id)
+
+    ok = sum(results) == seats and seats_booked == seats and seats_left == 0
+    print(f"{bookers:>4} bookers | {seats} seats | booked {sum(results)} "
+          f"(in table: {seats_booked}, left: {seats_left}) | "
+          f"{sum(results) / elapsed:8.1f} bookings/s | {'OK' if ok else 'OVERSOLD'}")
+    return ok
+
+
+if __name__ == "__main__":
+    bookers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seats = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    initialize_database()
+    if not run(bookers, seats):
+        sys.exit(1)
@@ -0,0 +1,120 @@
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db_connection import initialize_database, connection
+from sales_summary import rebuild as rebuild_sales
+from receipts import flush_receipts, close_receipt_writer
+from services import booking, inventory
+from services.auth import Session
+from utils import ensure_file_exists, get_flight_store
+
+# Cancelling every booking on a flight: one cancel_booking call per
+# booking against the set-based removal of the flight. Both write the
+# same cancelled_bookings rows and receipts (to the configured receipt
+# store). Checks that every booking ended up cancelled with its refund.
+# Usage: python benchmarks/bench_cascade.py [bookings...]
+
+SIZES = [1_000, 5_000]
+FLIGHT = ["CASCADE01", "Benchmark", "Benchmark", "120.5", "1000000"]
+USER = ("bench_canceller", "bench_canceller@example.com", "bench")
+
+
+def setup(n):
+    # the flight and n one-seat bookings on it; returns the user's session
+    fid = FLIGHT[0]
+    if fid not in get_flight_store():
+        inventory.add_flight(*FLIGHT)
+    price = float(FLIGHT[3])
+    now = datetime.datetime.now()
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT id FROM users WHERE username=%s", (USER[0],))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute("INSERT INTO users (username, email, password) VALUES (%s, %s, %s)", USER)
+            user_id = cur.lastrowid
+        else:
+            user_id = row[0]
+        cur.execute("DELETE FROM bookings WHERE flight_id=%s", (fid,))
+        cur.execute("DELETE FROM cancelled_bookings WHERE flight_id=%s", (fid,))
+        cur.executemany(booking.BOOKING_INSERT, [
+            (user_id, fid, f"CASCADE-{i}", 1, FLIGHT[1], FLIGHT[2], price, price, now)
+            for i in range(n)
+        ])
+        con.commit()
+        cur.close()
+    return Session(user_id, USER[0], USER[1])
+
+
+def check(n):
+    # (cancelled rows, bookings left, refunds total)
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT COUNT(*), COALESCE(SUM(amount_refunded), 0) "
+                    "FROM cancelled_bookings WHERE flight_id=%s", (FLIGHT[0],))
+        cancelled, refunded = cur.fetchone()
+        cur.execute("SELECT COUNT(*) FROM bookings WHERE flight_id=%s", (FLIGHT[0],))
+        left = cur.fetchone()[0]
+        cur.close()
+    return cancelled == n and left == 0, float(refunded)
+
+
+def one_by_one(session):
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT id FROM bookings WHERE flight_id=%s", (FLIGHT[0],))
+        ids = [r[0] for r in cur.fetchall()]
+        cur.close()
+    for bid in ids:
+        booking.cancel_booking(session, bid, "benchmark")
+    inventory.remove_flight(FLIGHT[0])
+
+
+def cleanup(session):
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("DELETE FROM cancelled_bookings WHERE flight_id=%s", (FLIGHT[0],))
+        cur.execute("DELETE FROM users WHERE id=%s", (session.id,))
+        # the summaries counted the benchmark's sales
+        rebuild_sales(cur)
+        con.commit()
+        cur.close()
+
+
+def run(n):
+    session = setup(n)
+    start = time.perf_counter()
+    one_by_one(session)
+    flush_receipts()
+    loop = time.perf_counter() - start
+    loop_ok, loop_refunded = check(n)
+
+    setup(n)
+    start = time.perf_counter()
+    cancelled = inventory.remove_flight(FLIGHT[0], "benchmark")
+    flush_receipts()
+    cascade = time.perf_counter() - start
+    cascade_ok, cascade_refunded = check(n)
+    cleanup(session)
+
+    ok = loop_ok and cascade_ok and cancelled == n and loop_refunded == cascade_refunded
+    print(f"{n:>7} bookings | one by one {loop * 1000:9.1f} ms | "
+          f"set-based {cascade * 1000:8.1f} ms | x{loop / cascade:6.1f} | "
+          f"refunded {cascade_refunded:.2f} | {'OK' if ok else 'MISMATCH'}")
+    return ok
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    initialize_database()
+    ensure_file_exists()
+    try:
+        ok = all([run(n) for n in sizes])
+    finally:
+        close_receipt_writer()
+    if not ok:
+        sys.exit(1)
@@ -0,0 +1,148 @@
+import datetime
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from db_connection import initialize_database, connection
+from feedback_search import rebuild as rebuild_search
+from services import reports
+from datagen import CITIES, START
+
+# Searches generated feedback with the full-text index against the
+# LIKE '%word%' scan it replaces, for the first page (newest first, as
+# the admin list shows it) and for ranked results. Words are searched as
+# prefixes so both find the same messages, and the first pages are
+# checked to match. Also pages 50 pages deep through the ranked results
+# (timed once; each page scores every match again).
+# The rows are added to the configured database and removed afterwards.
+# Usage: python benchmarks/bench_feedback.py [sizes...]
+
+SIZES = [100_000, 1_000_000]
+USER = ("bench_feedback", "bench_feedback@example.com", "bench")
+COMMON = ["flight", "was", "the", "and", "staff", "seat", "time", "good", "bad", "very",
+          "crew", "food", "boarding", "gate", "late", "app", "queue", "clean", "great",
+          "delayed", "refund", "service", "baggage", "checkin"]
+RARE = ["wheelchair", "lounge", "visa", "stroller", "allergy", "upgrade", "oxygen", "pet"]
+QUERIES = ["delayed*", "mumbai* delayed*", "refund* baggage*", "wheelchair*",
+           "lounge* dubai*", "zzz*"]
+REPEAT = 5
+CHUNK = 5000
+
+
+def make_messages(n, user_id, seed=46):
+    # mostly common words, a city or two, now and then a rare word
+    rng = random.Random(seed)
+    cities = [c.lower() for c in CITIES]
+    for _ in range(n):
+        words = [rng.choice(COMMON) for _ in range(rng.randint(4, 20))]
+        words.insert(rng.randrange(len(words)), rng.choice(cities))
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(cities))
+        if rng.random() < 0.02:
+            words.insert(rng.randrange(len(words)), rng.choice(RARE))
+        when = START + datetime.timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        yield (user_id, " ".join(words), when)
+
+
+def setup(n):
+    # the benchmark user and n feedback rows; returns the user id
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT id FROM users WHERE username=%s", (USER[0],))
+        row = cur.fetchone()
+        if row is None:
+            cur.execute("INSERT INTO users (username, email, password) VALUES (%s, %s, %s)", USER)
+            user_id = cur.lastrowid
+        else:
+            user_id = row[0]
+        cur.execute("DELETE FROM feedback WHERE user_id=%s", (user_id,))
+        batch = []
+        for row in make_messages(n, user_id):
+            batch.append(row)
+            if len(batch) == CHUNK:
+                cur.executemany("INSERT INTO feedback (user_id, message, created_at) "
+                                "VALUES (%s, %s, %s)", batch)
+                batch = []
+        if batch:
+            cur.executemany("INSERT INTO feedback (user_id, message, created_at) "
+                            "VALUES (%s, %s, %s)", batch)
+        rebuild_search(cur)
+        con.commit()
+        cur.close()
+    return user_id
+
+
+def cleanup(user_id):
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("DELETE FROM feedback WHERE user_id=%s", (user_id,))
+        cur.execute("DELETE FROM users WHERE id=%s", (user_id,))
+        rebuild_search(cur)
+        con.commit()
+        cur.close()
+
+
+def like_page(query, size=20):
+    # newest first page of messages containing every word, by LIKE scan
+    words = [w.rstrip("*") for w in query.split()]
+    where = " AND ".join(["f.message LIKE %s"] * len(words))
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute(f"""
+            SELECT f.id, u.username, u.email, f.message, f.created_at
+            FROM feedback f LEFT JOIN users u ON u.id = f.user_id
+            WHERE {where}
+            ORDER BY f.created_at DESC, f.id DESC LIMIT %s
+        """, [f"%{w}%" for w in words] + [size])
+        rows = cur.fetchall()
+        cur.close()
+    return rows
+
+
+def deep_page(query, pages=50):
+    # the ranked results 50 pages in, following the keyset
+    after = None
+    for _ in range(pages):
+        rows, after = reports.search_feedback(query, after=after)
+        if after is None:
+            break
+    return rows
+
+
+def timed(fn, *args, repeat=REPEAT):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run(n):
+    start = time.perf_counter()
+    user_id = setup(n)
+    print(f"{n:>9} feedback rows loaded and indexed in {time.perf_counter() - start:6.1f} s")
+    ok = True
+    try:
+        for query in QUERIES:
+            t_like, expected = timed(like_page, query)
+            t_new, (got, _) = timed(reports.search_feedback, query, None, None, "newest")
+            t_rank, _ = timed(reports.search_feedback, query)
+            t_deep, _ = timed(deep_page, query, repeat=1)
+            same = [r[0] for r in got] == [r[0] for r in expected]
+            ok = ok and same
+            print(f"  {query:<18} | LIKE {t_like * 1000:8.1f} ms | "
+                  f"index newest {t_new * 1000:7.1f} ms | x{t_like / t_new:7.1f} | "
+                  f"ranked {t_rank * 1000:7.1f} ms | 50 pages {t_deep * 1000:8.1f} ms | "
+                  f"{'OK' if same else 'MISMATCH'}")
+    finally:
+        cleanup(user_id)
+    return ok
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    initialize_database()
+    if not all([run(n) for n in sizes]):
+        sys.exit(1)
@@ -0,0 +1,75 @@
+import array
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ids import new_id, id_time
+
+# Makes IDs from several forked processes with several threads each and
+# checks that none repeat, that each thread saw them increase, and that
+# they carry the current time. Prints IDs per second.
+# Usage: python benchmarks/bench_ids.py [processes] [threads] [ids per thread]
+
+PROCESSES = 4
+THREADS = 4
+PER_THREAD = 250_000
+
+
+def thread_ids(count, out, index):
+    ids = array.array("q", (new_id() for _ in range(count)))
+    out[index] = ids.tobytes()
+
+
+def process_ids(args):
+    # one worker process: ids from each of its threads, as raw bytes
+    threads, count = args
+    out = [None] * threads
+    workers = [threading.Thread(target=thread_ids, args=(count, out, i)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return out
+
+
+def increasing(ids):
+    return all(a < b for a, b in zip(ids, ids[1:]))
+
+
+def run(processes, threads, count):
+    # the parent takes a slot first, so the children must not reuse it
+    first = new_id()
+    ctx = multiprocessing.get_context("fork")
+    start = time.perf_counter()
+    with ctx.Pool(processes) as pool:
+        results = pool.map(process_ids, [(threads, count)] * processes)
+    elapsed = time.perf_counter() - start
+
+    seen = {first}
+    ordered = True
+    for blobs in results:
+        for blob in blobs:
+            ids = array.array("q")
+            ids.frombytes(blob)
+            ordered = ordered and increasing(ids)
+            seen.update(ids)
+    total = processes * threads * count
+    unique = len(seen) - 1
+    skew = abs(time.time() - id_time(max(seen)).timestamp())
+
+    ok = unique == total and ordered and skew < 60
+    print(f"{processes} processes x {threads} threads | {total} ids | "
+          f"{unique} unique | {'increasing' if ordered else 'OUT OF ORDER'} | "
+          f"{total / elapsed:10.0f} ids/s | {'OK' if ok else 'DUPLICATES'}")
+    return ok
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:4]]
+    processes, threads, count = args + [PROCESSES, THREADS, PER_THREAD][len(args):]
+    if not run(processes, threads, count):
+        sys.exit(1)
@@ -0,0 +1,85 @@
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flight_journal import JournalFlightStore
+from utils import FlightStore, write_csv_atomic
+from datagen import make_flights
+
+# Seat-change throughput of the full-rewrite csv store against the
+# journal store (one thread, and several threads sharing fsyncs through
+# group commit), plus journal recovery and compaction time. Every write
+# is fsynced in both stores.
+# Usage: python benchmarks/bench_journal.py [sizes...]
+
+SIZES = [10_000, 100_000]
+REWRITE_OPS = 100
+JOURNAL_OPS = 5_000
+THREADS = 8
+
+
+def seat_changes(store, flights, ops, threads=1, seed=1):
+    # ops set_seats calls spread over threads; returns ops per second
+    def work(n, rng):
+        for _ in range(n):
+            store.set_seats(rng.choice(flights)[0], rng.randint(0, 300))
+
+    workers = [threading.Thread(target=work, args=(ops // threads, random.Random(seed + i)))
+               for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (ops // threads * threads) / (time.perf_counter() - start)
+
+
+def run(n, workdir):
+    flights = make_flights(n)
+    path = os.path.join(workdir, f"flights_{n}.csv")
+
+    write_csv_atomic(path, flights)
+    rewrite = seat_changes(FlightStore(path), flights, REWRITE_OPS)
+
+    write_csv_atomic(path, flights)
+    store = JournalFlightStore(path, compact_bytes=1 << 40)
+    single = seat_changes(store, flights, JOURNAL_OPS)
+    syncs = store.journal.syncs
+    grouped = seat_changes(store, flights, JOURNAL_OPS, THREADS)
+    grouped_syncs = store.journal.syncs - syncs
+    journal_bytes = os.path.getsize(store.journal_path)
+
+    start = time.perf_counter()
+    recovered = JournalFlightStore(path, compact_bytes=1 << 40)
+    rows = recovered.all()
+    recover = time.perf_counter() - start
+    assert rows == store.all(), "recovered rows differ"
+
+    start = time.perf_counter()
+    store.compact()
+    compact = time.perf_counter() - start
+    assert JournalFlightStore(path).all() == rows, "compacted rows differ"
+
+    print(f"{n:>8} flights | rewrite {rewrite:9.1f} ops/s | "
+          f"journal {single:9.1f} ops/s (x{single / rewrite:6.1f}) | "
+          f"{THREADS} threads {grouped:9.1f} ops/s (x{grouped / rewrite:6.1f}, "
+          f"{JOURNAL_OPS / grouped_syncs:4.1f} changes/fsync)")
+    print(f"{'':>8}         | recovery of {2 * JOURNAL_OPS} records "
+          f"({journal_bytes / 1024:.0f} KB) {recover * 1000:7.1f} ms | "
+          f"compaction {compact * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    workdir = tempfile.mkdtemp(prefix="amsjournal_")
+    try:
+        for n in sizes:
+            run(n, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from flight_search import FlightSearchIndex
+from datagen import make_flights
+
+try:
+    from flight_columns import FlightColumns
+except ImportError:
+    FlightColumns = None
+
+# Compares the indexed search and the NumPy columns (when installed) with
+# the linear scan search_flights used to do, and the columns' route
+# summary with the same aggregate as a Python loop.
+# Usage: python benchmarks/bench_search.py [sizes...]
+
+SIZES = [10_000, 100_000, 1_000_000]
+QUERIES = [
+    ("mum", "", 0, float("inf")),
+    ("", "del", 0, float("inf")),
+    ("bengaluru", "goa", 0, float("inf")),
+    ("", "", 100, 150),
+    ("ch", "pu", 200, 400),
+    ("zz", "", 0, float("inf")),
+]
+REPEAT = 5
+
+
+def linear_search(flights, src, dst, pmin, pmax):
+    # the loop search_flights used before the index
+    results = []
+    for f in flights:
+        try:
+            price = float(f[3])
+        except:
+            continue
+        if price < pmin or price > pmax:
+            continue
+        if src and src not in f[1].lower():
+            continue
+        if dst and dst not in f[2].lower():
+            continue
+        results.append(f)
+    return results
+
+
+def linear_summary(flights):
+    # seats left and average fare per route, one row at a time
+    routes = {}
+    for f in flights:
+        try:
+            price = float(f[3])
+            seats = int(f[4])
+        except (ValueError, IndexError):
+            continue
+        key = (f[1].strip().lower(), f[2].strip().lower())
+        total = routes.setdefault(key, [0, 0, 0.0])
+        total[0] += 1
+        total[1] += seats
+        total[2] += price
+    return {k: (n, s, round(p / n, 2)) for k, (n, s, p) in routes.items()}
+
+
+def build_index(rows):
+    index = FlightSearchIndex()
+    index.rebuild(rows)
+    return index
+
+
+def build_columns(rows):
+    columns = FlightColumns()
+    columns.rebuild(rows)
+    return columns
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def run(n):
+    flights = make_flights(n)
+    build, index = timed(build_index, flights)
+    columns = build_columns(flights) if FlightColumns else None
+
+    linear_total = 0.0
+    index_total = 0.0
+    columns_total = 0.0
+    for q in QUERIES:
+        for _ in range(REPEAT):
+            t_lin, expected = timed(linear_search, flights, *q)
+            t_idx, got = timed(index.search, *q)
+            assert got == expected, f"result mismatch for {q}"
+            linear_total += t_lin
+            index_total += t_idx
+            if columns:
+                t_col, got = timed(columns.search, *q)
+                assert got == expected, f"columns result mismatch for {q}"
+                columns_total += t_col
+
+    runs = len(QUERIES) * REPEAT
+    line = (f"{n:>9} flights | build {build * 1000:8.1f} ms | "
+            f"linear {linear_total / runs * 1000:8.2f} ms/query | "
+            f"index {index_total / runs * 1000:8.2f} ms/query | "
+            f"x{linear_total / index_total:6.1f}")
+    if columns:
+        line += (f" | columns {columns_total / runs * 1000:8.2f} ms/query | "
+                 f"x{linear_total / columns_total:6.1f}")
+    print(line)
+
+    if columns:
+        t_lin, expected = timed(linear_summary, flights)
+        t_col, summary = timed(columns.route_summary)
+        got = {(s.lower(), d.lower()): (f, seats, fare) for s, d, f, seats, fare in summary}
+        assert got == expected, "route summary mismatch"
+        print(f"{'':>9}         | route summary: linear {t_lin * 1000:8.1f} ms | "
+              f"columns {t_col * 1000:8.1f} ms | x{t_lin / t_col:6.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    for n in sizes:
+        run(n)
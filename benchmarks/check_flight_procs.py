@@ -0,0 +1,100 @@
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from binary_flights import BinaryFlightStore
+from flight_journal import JournalFlightStore
+
+# Several processes changing one flight file at once, each through its own
+# store: the journal store with compaction kicking in every few KB, and
+# the binary store growing its file as it fills. Every add and seat change
+# must be in the file afterwards and in the view of every process.
+# Usage: python benchmarks/check_flight_procs.py [processes] [adds]
+
+PROCESSES = 4
+ADDS = 1500
+COMPACT_BYTES = 5000
+
+
+def journal_store(path):
+    return JournalFlightStore(path, compact_bytes=COMPACT_BYTES)
+
+
+def expected(processes, adds):
+    # flight id -> seats once every process is done
+    rows = {}
+    for p in range(processes):
+        for n in range(adds):
+            rows[f"P{p}F{n}"] = str(n % 300) if n % 3 == 0 else "100"
+    return rows
+
+
+def work(make_store, path, p, adds, done, results):
+    # adds flights and sets the seats of every third, then waits for the
+    # others and reports what this process sees (or the error it hit)
+    try:
+        store = make_store(path)
+        for n in range(adds):
+            fid = f"P{p}F{n}"
+            store.add([fid, "Mumbai", "Delhi", "5000", "100"])
+            if n % 3 == 0:
+                store.set_seats(fid, n % 300)
+    except Exception as err:
+        done.abort()
+        results.put((p, f"{type(err).__name__}: {err}"))
+        return
+    try:
+        done.wait()
+    except threading.BrokenBarrierError:
+        pass
+    results.put((p, {r[0]: r[4] for r in store.all()}))
+
+
+def run(name, make_store, workdir, processes, adds):
+    path = os.path.join(workdir, f"{name}.flights")
+    done = multiprocessing.Barrier(processes)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=work,
+                                       args=(make_store, path, p, adds, done, results))
+               for p in range(processes)]
+    for w in workers:
+        w.start()
+    views = [results.get() for _ in workers]
+    for w in workers:
+        w.join()
+    want = expected(processes, adds)
+    ok = True
+    try:
+        views.append(("fresh", {r[0]: r[4] for r in make_store(path).all()}))
+    except Exception as err:
+        views.append(("fresh", f"{type(err).__name__}: {err}"))
+    for p, view in sorted(views, key=lambda v: str(v[0])):
+        if isinstance(view, str):
+            ok = False
+            print(f"  {name:<8} view of {p!s:<5} | failed: {view}")
+            continue
+        missing = len(want.keys() - view.keys())
+        wrong = sum(1 for k, v in view.items() if want.get(k) != v)
+        ok = ok and not missing and not wrong and len(view) == len(want)
+        print(f"  {name:<8} view of {p!s:<5} | {len(view):>6} rows | "
+              f"{missing:>5} missing | {wrong:>5} wrong")
+    return ok
+
+
+if __name__ == "__main__":
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else PROCESSES
+    adds = int(sys.argv[2]) if len(sys.argv) > 2 else ADDS
+    workdir = tempfile.mkdtemp(prefix="amsprocs_")
+    try:
+        ok = run("journal", journal_store, workdir, processes, adds)
+        ok = run("binary", BinaryFlightStore, workdir, processes, adds) and ok
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    print("OK" if ok else "FAILED")
+    if not ok:
+        sys.exit(1)
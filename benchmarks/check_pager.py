@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from utils import HEADERS, TablePager
+
+# Pages short, long and empty rows, as a malformed flight file can hold,
+# and checks every page comes out as an even grid with one cell per header.
+# Usage: python benchmarks/check_pager.py
+
+RAGGED = [["AI101", "Mumbai", "Delhi", "5000", "120"], ["AI102", "Goa"], [],
+          ("AI103", "Pune", "Kochi", 4200, 80, "extra", "cells"), ["AI104"]]
+
+
+def run():
+    pager = TablePager(iter(RAGGED), HEADERS, page_size=2)
+    ok = True
+    for number in range(3):
+        lines = pager.render(number).splitlines()
+        even = len({len(line) for line in lines}) == 1
+        cells = all(line.count("|") in (0, len(HEADERS) + 1) for line in lines)
+        ok = ok and even and cells
+        print(f"  page {number + 1} | {len(lines)} lines | "
+              f"{'even' if even else 'RAGGED'} | {'cells OK' if cells else 'CELLS WRONG'}")
+    pages = not pager.has_page(3) and pager.pages == 3
+    print(f"  {pager.pages} pages | {'OK' if pages else 'WRONG PAGE COUNT'}")
+    return ok and pages
+
+
+if __name__ == "__main__":
+    ok = run()
+    print("OK" if ok else "FAILED")
+    if not ok:
+        sys.exit(1)
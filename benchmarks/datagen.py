@@ -0,0 +1,119 @@
+import datetime
+import random
+
+# Deterministic synthetic data for the benchmarks: the same sizes and seed
+# always give the same flights, users, bookings, cancellations and
+# feedback. populate() loads them into an empty database.
+
+CITIES = [
+    "Mumbai", "Delhi", "Chennai", "Kolkata", "Bengaluru", "Hyderabad",
+    "Goa", "Pune", "Jaipur", "Kochi", "Lucknow", "Ahmedabad", "Dubai",
+    "Singapore", "London", "Frankfurt", "Doha", "Colombo", "Kathmandu",
+    "Bangkok",
+]
+
+START = datetime.datetime(2025, 1, 1)
+CHUNK = 5000
+
+
+def make_flights(n, seed=42):
+    rng = random.Random(seed)
+    cities = CITIES + [f"{c} {i}" for c in CITIES for i in range(1, 10)]
+    return [
+        [f"FL{i:07d}", rng.choice(cities), rng.choice(cities),
+         str(rng.randint(50, 1000)), str(rng.randint(0, 300))]
+        for i in range(n)
+    ]
+
+
+def make_users(m):
+    return [(f"bench_user{i}", f"bench_user{i}@example.com", "bench") for i in range(m)]
+
+
+def _when(rng):
+    # spread over one year, second resolution
+    return START + datetime.timedelta(seconds=rng.randrange(365 * 24 * 3600))
+
+
+def make_bookings(k, user_ids, flights, seed=43):
+    # (user_id, flight_id, receipt_id, seats_booked, booking_date,
+    #  source, destination, price_per_seat, total_amount)
+    rng = random.Random(seed)
+    rows = []
+    for i in range(k):
+        user_id = rng.choice(user_ids)
+        flight = rng.choice(flights)
+        seats = rng.randint(1, 4)
+        price = float(flight[3])
+        rows.append((user_id, flight[0], f"RCPTBENCH{i}", seats, _when(rng),
+                     flight[1], flight[2], price, round(price * seats, 2)))
+    return rows
+
+
+def make_cancellations(c, users, flights, first_id, seed=44):
+    # cancelled_bookings rows; booking ids continue after the live bookings
+    rng = random.Random(seed)
+    rows = []
+    for i in range(c):
+        flight = rng.choice(flights)
+        seats = rng.randint(1, 4)
+        total = float(flight[3]) * seats
+        booked = _when(rng)
+        rows.append((first_id + i, rng.choice(users)[0], flight[0], flight[1], flight[2],
+                     seats, total, round(total * 0.75, 2), booked,
+                     booked + datetime.timedelta(days=rng.randint(0, 30)),
+                     "No reason provided"))
+    return rows
+
+
+def make_feedback(f, user_ids, seed=45):
+    rng = random.Random(seed)
+    words = ["late", "seat", "crew", "food", "clean", "delay", "refund", "great", "app", "queue"]
+    return [
+        (rng.choice(user_ids), " ".join(rng.choice(words) for _ in range(rng.randint(3, 20))),
+         _when(rng))
+        for _ in range(f)
+    ]
+
+
+def _insert(cur, sql, rows):
+    for i in range(0, len(rows), CHUNK):
+        cur.executemany(sql, rows[i:i + CHUNK])
+
+
+def populate(con, flights=1000, users=100, bookings=10000, cancellations=1000,
+             feedback=1000, seed=42):
+    # fills an empty database and returns the generated flight rows
+    from sales_summary import rebuild as rebuild_sales
+    from feedback_search import rebuild as rebuild_search
+
+    cur = con.cursor()
+    flight_rows = make_flights(flights, seed)
+    _insert(cur, "INSERT INTO flights (id, source, destination, price, seats) "
+                 "VALUES (%s, %s, %s, %s, %s)",
+            [(f[0], f[1], f[2], float(f[3]), int(f[4])) for f in flight_rows])
+
+    user_rows = make_users(users)
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+    base = cur.fetchone()[0]
+    _insert(cur, "INSERT INTO users (username, email, password) VALUES (%s, %s, %s)", user_rows)
+    # single-session inserts on an empty table get consecutive ids
+    user_ids = list(range(base + 1, base + users + 1))
+
+    booking_rows = make_bookings(bookings, user_ids, flight_rows, seed + 1)
+    _insert(cur, "INSERT INTO bookings (user_id, flight_id, receipt_id, seats_booked, booking_date, "
+                 "source, destination, price_per_seat, total_amount) "
+                 "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)", booking_rows)
+    _insert(cur, """
+        INSERT INTO cancelled_bookings
+        (booking_id, username, flight_id, source, destination, seats_booked,
+        total_amount, amount_refunded, booking_date, cancellation_date, reason)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, make_cancellations(cancellations, user_rows, flight_rows, bookings + 1, seed + 2))
+    _insert(cur, "INSERT INTO feedback (user_id, message, created_at) VALUES (%s, %s, %s)",
+            make_feedback(feedback, user_ids, seed + 3))
+    rebuild_sales(cur)
+    rebuild_search(cur)
+    con.commit()
+    cur.close()
+    return flight_rows
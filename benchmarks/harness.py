@@ -0,0 +1,83 @@
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+
+# Timing and result files for the benchmark suite. A result is a dict of
+# milliseconds per run; files hold {"meta": ..., "results": {name: result}}
+# so two runs (e.g. two commits) can be compared.
+
+
+def percentile(sorted_values, p):
+    # nearest-rank percentile of an already sorted list
+    rank = max(1, math.ceil(p * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def measure(fn, repeat=10, warmup=2):
+    # runs fn warmup times untimed, then repeat times timed
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "median_ms": statistics.median(times),
+        "p95_ms": percentile(times, 0.95),
+        "min_ms": times[0],
+        "mean_ms": statistics.fmean(times),
+        "runs": repeat,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**extra):
+    meta = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+    meta.update(extra)
+    return meta
+
+
+def save(path, meta, results):
+    with open(path, "w") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def regressions(results, baseline, threshold=0.2):
+    # [(name, old median, new median, change)] where the median grew by
+    # more than threshold (0.2 = 20%)
+    slower = []
+    for name, old in baseline.get("results", {}).items():
+        new = results.get(name)
+        if new is None or not old["median_ms"]:
+            continue
+        change = new["median_ms"] / old["median_ms"] - 1
+        if change > threshold:
+            slower.append((name, old["median_ms"], new["median_ms"], change))
+    return slower
+
+
+def report(name, result):
+    print(f"{name:<28} median {result['median_ms']:9.3f} ms | p95 {result['p95_ms']:9.3f} ms | "
+          f"min {result['min_ms']:9.3f} ms | {result['runs']} runs")
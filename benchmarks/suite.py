@@ -0,0 +1,181 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+import datagen
+import harness
+
+# Micro-benchmarks for the hot paths as data grows. Runs in a scratch
+# directory with its own db_config.txt: a throwaway SQLite database by
+# default, or the database named by --config (point it at a scratch MySQL
+# schema, the generator inserts into whatever it connects to).
+#
+#   python benchmarks/suite.py --flights 10000 --bookings 100000 --out new.json
+#   python benchmarks/suite.py --baseline old.json --threshold 20
+#
+# Exits with status 1 when a median is slower than the baseline by more
+# than the threshold (percent).
+
+SEARCHES = [
+    ("mum", "", 0, float("inf")),
+    ("", "del", 0, float("inf")),
+    ("bengaluru", "goa", 0, float("inf")),
+    ("", "", 100, 150),
+]
+BOOKINGS_PER_RUN = 20
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Airport Management System micro-benchmarks")
+    p.add_argument("--flights", type=int, default=10_000)
+    p.add_argument("--users", type=int, default=1_000)
+    p.add_argument("--bookings", type=int, default=50_000)
+    p.add_argument("--cancellations", type=int, default=5_000)
+    p.add_argument("--feedback", type=int, default=5_000)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--repeat", type=int, default=15)
+    p.add_argument("--warmup", type=int, default=3)
+    p.add_argument("--only", help="comma-separated benchmark name prefixes")
+    p.add_argument("--config", help="db_config.txt to use instead of a SQLite scratch database")
+    p.add_argument("--out", help="write results to this JSON file")
+    p.add_argument("--baseline", help="JSON results to compare against")
+    p.add_argument("--threshold", type=float, default=20.0,
+                   help="allowed median slowdown against the baseline, in percent")
+    return p.parse_args()
+
+
+def prepare(args, workdir):
+    # config for the scratch directory; app modules read it on first use
+    if args.config:
+        shutil.copy(args.config, os.path.join(workdir, "db_config.txt"))
+    else:
+        with open(os.path.join(workdir, "db_config.txt"), "w") as f:
+            f.write(f"db_backend=sqlite\nsqlite_path={os.path.join(workdir, 'bench.db')}\n"
+                    "receipt_mode=archive\n")
+    os.chdir(workdir)
+
+
+def benchmarks(args, flights):
+    # (name, callable); imported here so the scratch config is in effect
+    from admin_module import _booking_page
+    from db_connection import connection
+    from services.auth import find_user
+    from services.booking import create_booking, user_bookings
+    from utils import FlightStore, get_flight_store
+    from flight_search import get_search_index
+    from ids import new_receipt_id
+    from services import reports
+
+    rng = random.Random(args.seed)
+    store = get_flight_store()
+    copy_path = os.path.abspath("flights_copy.csv")
+    shutil.copy(store.path, copy_path)
+    copy = FlightStore(copy_path)
+    index = get_search_index()
+    users = [f"bench_user{i}" for i in range(args.users)]
+    sessions = [find_user(u) for u in users[:100]]
+
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT booking_date FROM bookings ORDER BY booking_date LIMIT 1 OFFSET %s",
+                    (args.bookings // 2,))
+        row = cur.fetchone()
+        booker = sessions[0].id
+        cur.execute("UPDATE flights SET seats = 1000000000 WHERE id=%s", (flights[0][0],))
+        con.commit()
+        cur.close()
+    middle = (row[0], 0) if row else None
+    target = list(flights[0])
+
+    def book():
+        with connection() as con:
+            for i in range(BOOKINGS_PER_RUN):
+                create_booking(con, booker, target, 1, new_receipt_id())
+
+    cases = [
+        ("flights.read_cold", lambda: FlightStore(store.path).all()),
+        ("flights.read_cached", store.all),
+        ("flights.write", lambda: copy.replace_all(flights)),
+        ("flights.search", lambda: [index.search(*q) for q in SEARCHES]),
+        ("ids.receipt_x1000", lambda: [new_receipt_id() for _ in range(1000)]),
+        (f"booking.insert_x{BOOKINGS_PER_RUN}", book),
+        ("bookings.user_list", lambda: user_bookings(rng.choice(sessions))),
+        ("bookings.admin_first_page", lambda: _booking_page({"status": "all"}, None, 20)),
+        ("bookings.admin_deep_page", lambda: _booking_page({"status": "all"}, middle, 20)),
+        ("bookings.admin_by_flight",
+         lambda: _booking_page({"status": "all", "flight_id": rng.choice(flights)[0]}, None, 20)),
+        ("reports.sales_by_route", reports.sales_by_route),
+        ("reports.sales_by_day", reports.sales_by_day),
+        ("feedback.search_ranked", lambda: reports.search_feedback("delay refund")),
+        ("feedback.search_newest",
+         lambda: reports.search_feedback("delay refund", order="newest")),
+    ]
+    try:
+        from flight_columns import FlightColumns
+    except ImportError:
+        return cases
+    columns = FlightColumns(store)
+    return cases + [
+        ("flights.search_columns", lambda: [columns.search(*q) for q in SEARCHES]),
+        ("flights.route_summary", columns.route_summary),
+    ]
+
+
+def main():
+    args = parse_args()
+    workdir = tempfile.mkdtemp(prefix="amsbench_")
+    baseline = harness.load(os.path.abspath(args.baseline)) if args.baseline else None
+    out = os.path.abspath(args.out) if args.out else None
+    commit = harness.git_commit()
+    prepare(args, workdir)
+
+    from db_connection import initialize_database, connection, close_pools
+    from receipts import close_receipt_writer
+    from utils import ensure_file_exists, write_flights
+
+    initialize_database()
+    ensure_file_exists()
+    with connection() as con:
+        flights = datagen.populate(con, args.flights, args.users, args.bookings,
+                                   args.cancellations, args.feedback, args.seed)
+    write_flights(flights)
+    print(f"Data: {args.flights} flights, {args.users} users, {args.bookings} bookings, "
+          f"{args.cancellations} cancellations, {args.feedback} feedback (in {workdir})")
+
+    prefixes = args.only.split(",") if args.only else None
+    results = {}
+    for name, fn in benchmarks(args, flights):
+        if prefixes and not any(name.startswith(p) for p in prefixes):
+            continue
+        results[name] = harness.measure(fn, args.repeat, args.warmup)
+        harness.report(name, results[name])
+
+    close_receipt_writer()
+    close_pools()
+    meta = harness.metadata(
+        commit=commit,
+        backend="config" if args.config else "sqlite",
+        sizes={k: getattr(args, k) for k in ("flights", "users", "bookings",
+                                             "cancellations", "feedback", "seed")},
+    )
+    if out:
+        harness.save(out, meta, results)
+        print("Results written to", out)
+
+    if baseline:
+        slower = harness.regressions(results, baseline, args.threshold / 100)
+        for name, old, new, change in slower:
+            print(f"REGRESSION {name}: {old:.3f} ms -> {new:.3f} ms (+{change * 100:.0f}%)")
+        if slower:
+            sys.exit(1)
+        print(f"No regressions over {args.threshold:.0f}% against {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
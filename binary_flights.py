@@ -0,0 +1,379 @@
+import contextlib
+import csv
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from utils import HEADERS, FLIGHTS_CSV, FlightRepository, format_price
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process per flight file
+    fcntl = None
+
+# Fixed-width flight file, accessed through mmap.
+#
+#   header   64 bytes   magic, version, record size, used records,
+#                       record capacity, index slots
+#   index    slots * 4  open-addressing hash table of record numbers
+#   records  capacity * RECORD_SIZE
+#
+# A seat change is one 4 byte write into the record; a lookup by id
+# probes the on-disk index instead of scanning the records.
+#
+# Changes are made under an exclusive flock on flights.dat.lock, so
+# processes sharing the file take turns; reads go straight to the map.
+
+FLIGHTS_BIN = "flights.dat"
+
+MAGIC = b"AMSF"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIII")
+HEADER_SIZE = 64
+
+ID_LEN = 16
+PLACE_LEN = 48
+RECORD = struct.Struct(f"<B{ID_LEN}s{PLACE_LEN}s{PLACE_LEN}sdi")
+RECORD_SIZE = RECORD.size
+SEATS_OFFSET = RECORD_SIZE - 4
+SEATS = struct.Struct("<i")
+
+SLOT = struct.Struct("<i")
+EMPTY = -1
+DELETED = -2
+
+LIVE = 1
+DEAD = 0
+
+INITIAL_CAPACITY = 1024
+MAX_LOAD = 0.7
+
+
+def _encode(text, size, field):
+    data = text.encode("utf-8")
+    if len(data) > size:
+        raise ValueError(f"{field} is longer than {size} bytes: {text!r}")
+    return data
+
+
+def _decode(data):
+    return data.rstrip(b"\0").decode("utf-8")
+
+
+def _pack_row(row):
+    fid = row[0].upper()
+    return RECORD.pack(
+        LIVE,
+        _encode(fid, ID_LEN, "Flight ID"),
+        _encode(row[1], PLACE_LEN, "Source"),
+        _encode(row[2], PLACE_LEN, "Destination"),
+        float(row[3]),
+        int(row[4])
+    )
+
+
+def _unpack_row(data):
+    flag, fid, src, dst, price, seats = RECORD.unpack(data)
+    return flag, [_decode(fid), _decode(src), _decode(dst), format_price(price), str(seats)]
+
+
+def _slot_for(fid, slots):
+    return zlib.crc32(fid.encode("utf-8")) % slots
+
+
+@contextlib.contextmanager
+def _locked(path):
+    # exclusive lock between processes
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+
+class BinaryFlightStore(FlightRepository):
+    # same interface as utils.FlightStore, backed by the fixed-width file
+
+    def __init__(self, path=FLIGHTS_BIN):
+        self.path = path
+        self._file = None
+        self._mm = None
+        self._lock_path = path + ".lock"
+        self._lock = threading.RLock()
+        self._held = False  # this store holds the file lock
+        self._listeners = []
+
+    @contextlib.contextmanager
+    def _file_locked(self):
+        # the thread lock plus the file lock; nests within one store
+        with self._lock:
+            if self._held:
+                yield
+                return
+            with _locked(self._lock_path):
+                self._held = True
+                try:
+                    yield
+                finally:
+                    self._held = False
+
+    # --- file management ---
+
+    def _create(self, rows, capacity=INITIAL_CAPACITY):
+        # writes a fresh file holding rows, then maps it
+        while len(rows) > capacity * MAX_LOAD:
+            capacity *= 2
+        slots = capacity * 2
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, 0, capacity, slots).ljust(HEADER_SIZE, b"\0"))
+            f.write(SLOT.pack(EMPTY) * slots)
+            f.truncate(HEADER_SIZE + slots * SLOT.size + capacity * RECORD_SIZE)
+        self._close()
+        os.replace(tmp, self.path)
+        self._map()
+        for row in rows:
+            if self._find(row[0].upper())[1] is None:
+                self._insert(row)
+        self._mm.flush()
+
+    def _map(self):
+        self._file = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        magic, version, record_size, _, _, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            self._close()
+            raise ValueError(f"{self.path} is not a version {VERSION} flight file")
+
+    def _close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+        self._mm = None
+        self._file = None
+
+    def _ensure_open(self):
+        # maps the file, creating it if needed; remaps if another
+        # process grew or rebuilt it
+        if self._mm is None:
+            with self._file_locked():
+                if not os.path.exists(self.path):
+                    self._create([])
+                else:
+                    self._map()
+        elif os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino \
+                or os.fstat(self._file.fileno()).st_size != len(self._mm):
+            self._close()
+            self._map()
+            self._notify("reload")
+
+    def _header(self):
+        _, _, _, used, capacity, slots = HEADER.unpack_from(self._mm, 0)
+        return used, capacity, slots
+
+    def _set_used(self, used):
+        _, _, _, _, capacity, slots = HEADER.unpack_from(self._mm, 0)
+        HEADER.pack_into(self._mm, 0, MAGIC, VERSION, RECORD_SIZE, used, capacity, slots)
+
+    def _record_offset(self, number):
+        _, capacity, slots = self._header()
+        return HEADER_SIZE + slots * SLOT.size + number * RECORD_SIZE
+
+    def _flush(self, offset, length):
+        # msync only the pages that were touched
+        start = offset - offset % mmap.PAGESIZE
+        self._mm.flush(start, offset + length - start)
+
+    # --- index ---
+
+    def _find(self, fid):
+        # returns (slot position, record number or None)
+        _, _, slots = self._header()
+        pos = _slot_for(fid, slots)
+        first_free = None
+        for _ in range(slots):
+            number = SLOT.unpack_from(self._mm, HEADER_SIZE + pos * SLOT.size)[0]
+            if number == EMPTY:
+                return (first_free if first_free is not None else pos), None
+            if number == DELETED:
+                if first_free is None:
+                    first_free = pos
+            else:
+                offset = self._record_offset(number)
+                stored = _decode(self._mm[offset + 1:offset + 1 + ID_LEN])
+                if stored == fid:
+                    return pos, number
+            pos = (pos + 1) % slots
+        return first_free, None
+
+    def _insert(self, row):
+        used, capacity, slots = self._header()
+        # slots are twice the capacity, so probing always finds a free slot;
+        # the caller holds the file lock, so the header is current
+        if used >= capacity:
+            self._create(self._live_rows() + [row], capacity * 2)
+            return
+        pos, _ = self._find(row[0].upper())
+        offset = self._record_offset(used)
+        self._mm[offset:offset + RECORD_SIZE] = _pack_row(row)
+        SLOT.pack_into(self._mm, HEADER_SIZE + pos * SLOT.size, used)
+        self._set_used(used + 1)
+
+    def _live_rows(self):
+        used, _, _ = self._header()
+        rows = []
+        for number in range(used):
+            offset = self._record_offset(number)
+            flag, row = _unpack_row(self._mm[offset:offset + RECORD_SIZE])
+            if flag == LIVE:
+                rows.append(row)
+        return rows
+
+    # --- store interface ---
+
+    def refresh(self):
+        with self._lock:
+            self._ensure_open()
+
+    def all(self):
+        with self._lock:
+            self._ensure_open()
+            return self._live_rows()
+
+    def get(self, flight_id):
+        with self._lock:
+            self._ensure_open()
+            _, number = self._find(flight_id.upper())
+            if number is None:
+                return None
+            offset = self._record_offset(number)
+            return _unpack_row(self._mm[offset:offset + RECORD_SIZE])[1]
+
+    def __contains__(self, flight_id):
+        with self._lock:
+            self._ensure_open()
+            return self._find(flight_id.upper())[1] is not None
+
+    def add(self, flight):
+        with self._file_locked():
+            self._ensure_open()
+            if self._find(flight[0].upper())[1] is not None:
+                raise ValueError(f"Flight ID {flight[0].upper()} already exists")
+            self._insert(flight)
+            self._mm.flush()
+            self._notify("add", list(flight))
+
+    def add_many(self, flights):
+        # inserts several records with one flush; skips ids already present
+        with self._file_locked():
+            self._ensure_open()
+            added = []
+            for flight in flights:
+                if self._find(flight[0].upper())[1] is None:
+                    self._insert(flight)
+                    added.append(flight)
+            self._mm.flush()
+            for flight in added:
+                self._notify("add", list(flight))
+
+    def update(self, flight):
+        # rewrites one record in place
+        with self._file_locked():
+            self._ensure_open()
+            _, number = self._find(flight[0].upper())
+            if number is None:
+                return False
+            offset = self._record_offset(number)
+            self._mm[offset:offset + RECORD_SIZE] = _pack_row(flight)
+            self._flush(offset, RECORD_SIZE)
+            self._notify("update", _unpack_row(self._mm[offset:offset + RECORD_SIZE])[1])
+            return True
+
+    def set_seats(self, flight_id, seats):
+        # in-place write of the 4 byte seat count
+        with self._file_locked():
+            self._ensure_open()
+            _, number = self._find(flight_id.upper())
+            if number is None:
+                return False
+            offset = self._record_offset(number) + SEATS_OFFSET
+            SEATS.pack_into(self._mm, offset, int(seats))
+            self._flush(offset, SEATS.size)
+            self._notify("seats", (flight_id.upper(), int(seats)))
+            return True
+
+    def set_many_seats(self, seats_by_id):
+        # each change is already an in-place write
+        with self._file_locked():
+            return sum(1 for fid, seats in seats_by_id.items() if self.set_seats(fid, seats))
+
+    def remove(self, flight_id):
+        # marks the record dead and leaves a tombstone in the index
+        with self._file_locked():
+            self._ensure_open()
+            pos, number = self._find(flight_id.upper())
+            if number is None:
+                return False
+            offset = self._record_offset(number)
+            self._mm[offset] = DEAD
+            SLOT.pack_into(self._mm, HEADER_SIZE + pos * SLOT.size, DELETED)
+            self._mm.flush()
+            self._notify("remove", flight_id.upper())
+            return True
+
+    def replace_all(self, flights):
+        with self._file_locked():
+            self._create([f for f in flights if f])
+            self._notify("reload")
+
+    def compact(self):
+        # rebuilds the file without dead records and tombstones
+        with self._file_locked():
+            self._ensure_open()
+            self._create(self._live_rows())
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+def import_csv(csv_path=FLIGHTS_CSV, bin_path=FLIGHTS_BIN):
+    # builds a binary flight file from the csv layout; returns row count
+    with open(csv_path, "r", newline="") as f:
+        rows = [r for r in csv.reader(f) if r]
+    if rows and rows[0] == HEADERS:
+        rows = rows[1:]
+    store = BinaryFlightStore(bin_path)
+    store.replace_all(rows)
+    count = len(store.all())
+    store.close()
+    return count
+
+
+def export_csv(bin_path=FLIGHTS_BIN, csv_path=FLIGHTS_CSV):
+    # writes the binary flight file back out in the csv layout
+    store = BinaryFlightStore(bin_path)
+    rows = store.all()
+    store.close()
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        writer.writerows(rows)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    # python binary_flights.py import [flights.csv] [flights.dat]
+    # python binary_flights.py export [flights.dat] [flights.csv]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python binary_flights.py import|export [source] [target]")
+        sys.exit(1)
+    if sys.argv[1] == "import":
+        n = import_csv(*sys.argv[2:4])
+    else:
+        n = export_csv(*sys.argv[2:4])
+    print(f"{n} flights converted.")
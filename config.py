@@ -0,0 +1,42 @@
+CONFIG_FILE = "db_config.txt"
+
+_config = None
+
+
+def load_config():
+    # reads key=value settings from the config file once per process
+    global _config
+    if _config is None:
+        settings = {}
+        try:
+            with open(CONFIG_FILE, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line or line.startswith("#") or "=" not in line:
+                        continue
+                    key, value = line.split("=", 1)
+                    settings[key.strip()] = value.strip()
+        except FileNotFoundError:
+            pass  # first time run
+        _config = settings
+    return _config
+
+
+def get_setting(key, default=None, cast=str):
+    # returns a single setting, falling back to default if missing or invalid
+    value = load_config().get(key)
+    if value is None or value == "":
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def save_setting(key, value):
+    # stores a setting and rewrites the config file, keeping other keys
+    settings = load_config()
+    settings[key] = str(value)
+    with open(CONFIG_FILE, "w") as f:
+        for k, v in settings.items():
+            f.write(f"{k}={v}\n")
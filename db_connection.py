@@ -1,18 +1,17 @@
 import mysql.connector
+import re
+import threading
 import time
-
-CONFIG_FILE = "db_config.txt"
+import metrics
+from config import get_setting, save_setting
+from migrations import LATEST_VERSION, current_version, migrate
 
 
 def load_mysql_password():
-    # loads mysql password from file or asks user
-    try:
-        with open(CONFIG_FILE, "r") as f:
-            for line in f:
-                if line.startswith("password="):
-                    return line.strip().split("=", 1)[1]
-    except FileNotFoundError:
-        pass  # first time run
+    # loads mysql password from config (read once per process) or asks user
+    pwd = get_setting("password")
+    if pwd is not None:
+        return pwd
 
     print("\nMySQL password not found.")
     print("Enter the MySQL root password.\n")
@@ -30,8 +29,7 @@ def load_mysql_password():
             test_con.close()
 
             # save password after successful connection
-            with open(CONFIG_FILE, "w") as f:
-                f.write(f"password={pwd}")
+            save_setting("password", pwd)
 
             print("\nConnection successful.")
             return pwd
@@ -40,24 +38,254 @@ def load_mysql_password():
             time.sleep(1)
 
 
-def get_connection(database="airport_db"):
-    # returns database connection
-    password = load_mysql_password()
-    try:
-        con = mysql.connector.connect(
+_OPERATION = re.compile(r"[\s(]*(\w+)")
+_UPDATED_TABLE = re.compile(r"[\s(]*UPDATE\s+`?(\w+)", re.I)
+_READ_TABLE = re.compile(r"\b(?:FROM|INTO)\s+`?(\w+)", re.I)
+_statement_labels = {}
+
+
+def _labels(sql):
+    # (operation, table) of a statement, cached by statement text
+    labels = _statement_labels.get(sql)
+    if labels is None:
+        m = _OPERATION.match(sql)
+        op = m.group(1).lower() if m else ""
+        m = (_UPDATED_TABLE.match if op == "update" else _READ_TABLE.search)(sql)
+        labels = (op, m.group(1).lower() if m else "")
+        _statement_labels[sql] = labels
+    return labels
+
+
+class MeteredCursor:
+    # times statements and counts fetched rows; used only with metrics on
+
+    def __init__(self, cur):
+        self._cur = cur
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+    def _timed(self, method, sql, params):
+        op, table = _labels(sql)
+        with metrics.timer("db_query_seconds", op=op, table=table):
+            return method(sql, params)
+
+    def execute(self, sql, params=()):
+        return self._timed(self._cur.execute, sql, params)
+
+    def executemany(self, sql, seq):
+        return self._timed(self._cur.executemany, sql, seq)
+
+    def fetchone(self):
+        row = self._cur.fetchone()
+        if row is not None:
+            metrics.count("db_rows_fetched_total")
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._cur.fetchmany(size)
+        metrics.count("db_rows_fetched_total", len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cur.fetchall()
+        metrics.count("db_rows_fetched_total", len(rows))
+        return rows
+
+    def __iter__(self):
+        for row in self._cur:
+            metrics.count("db_rows_fetched_total")
+            yield row
+
+
+class PooledConnection:
+    # wraps a real connection; close() hands it back to the pool
+
+    def __init__(self, pool, con):
+        self._pool = pool
+        self._con = con
+
+    def __getattr__(self, name):
+        if self._con is None:
+            raise mysql.connector.Error(msg="Connection already returned to pool")
+        return getattr(self._con, name)
+
+    def cursor(self, *args, **kwargs):
+        cur = self.__getattr__("cursor")(*args, **kwargs)
+        return MeteredCursor(cur) if metrics.enabled() else cur
+
+    def close(self):
+        if self._con is not None:
+            con, self._con = self._con, None
+            self._pool.release(con)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ConnectionPool:
+    # keeps a bounded set of open connections for reuse
+
+    def __init__(self, database="airport_db", size=5, timeout=10,
+                 idle_timeout=300, ping_after=30):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self._idle = []  # (connection, last used time), most recent last
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _open(self):
+        metrics.count("db_connections_opened_total")
+        if get_setting("db_backend", "mysql") == "sqlite":
+            from sqlite_backend import SQLiteConnection
+            return SQLiteConnection(get_setting("sqlite_path", "airport.db"))
+        return mysql.connector.connect(
             host="localhost",
             user="root",
-            password=password,
-            database=database
+            password=load_mysql_password(),
+            database=self.database
         )
-        return con
+
+    def _discard(self, con):
+        try:
+            con.close()
+        except Exception:
+            pass
+
+    def _healthy(self, con, last_used):
+        # only ping connections that sat idle for a while
+        if time.time() - last_used < self.ping_after:
+            return True
+        try:
+            return con.is_connected()
+        except Exception:
+            return False
+
+    def _evict_idle(self):
+        # close connections idle longer than idle_timeout
+        now = time.time()
+        with self._lock:
+            stale = [c for c, t in self._idle if now - t > self.idle_timeout]
+            self._idle = [(c, t) for c, t in self._idle if now - t <= self.idle_timeout]
+        for con in stale:
+            self._discard(con)
+
+    def acquire(self):
+        # returns a PooledConnection, waiting for a free slot if needed
+        if not self._slots.acquire(timeout=self.timeout):
+            raise mysql.connector.Error(msg="Timed out waiting for a free database connection")
+        try:
+            self._evict_idle()
+            while True:
+                with self._lock:
+                    item = self._idle.pop() if self._idle else None
+                if item is None:
+                    con = self._open()
+                    break
+                con, last_used = item
+                if self._healthy(con, last_used):
+                    break
+                self._discard(con)
+        except Exception:
+            self._slots.release()
+            raise
+        return PooledConnection(self, con)
+
+    def release(self, con):
+        # put a connection back, dropping it if it cannot be reset
+        try:
+            if con.in_transaction:
+                con.rollback()
+            with self._lock:
+                self._idle.append((con, time.time()))
+        except Exception:
+            self._discard(con)
+        finally:
+            self._slots.release()
+
+    def close_all(self):
+        # closes every idle connection
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for con, _ in idle:
+            self._discard(con)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database="airport_db"):
+    # returns the shared pool for a database, created on first use
+    with _pools_lock:
+        pool = _pools.get(database)
+        if pool is None:
+            pool = ConnectionPool(
+                database,
+                size=get_setting("pool_size", 5, int),
+                timeout=get_setting("pool_timeout", 10, float),
+                idle_timeout=get_setting("pool_idle_timeout", 300, float),
+                ping_after=get_setting("pool_ping_after", 30, float)
+            )
+            _pools[database] = pool
+        return pool
+
+
+def connection(database="airport_db"):
+    # pooled connection for use in a with block; raises on failure
+    return get_pool(database).acquire()
+
+
+def get_connection(database="airport_db"):
+    # returns pooled database connection, or None if it cannot connect
+    try:
+        return connection(database)
     except mysql.connector.Error as err:
         print("Connection failed:", err.msg)
         return None
 
 
+def close_pools():
+    # closes idle connections of every pool
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+
+def _schema_is_current():
+    # cheap startup check so no DDL runs when nothing changed
+    try:
+        with connection() as con:
+            cur = con.cursor()
+            version = current_version(cur)
+            cur.close()
+    except mysql.connector.Error:
+        return False
+    return version >= LATEST_VERSION
+
+
 def initialize_database():
-    # creates database and tables
+    # creates database and applies pending schema migrations
+    if _schema_is_current():
+        return
+
+    if get_setting("db_backend", "mysql") == "sqlite":
+        # the database file is created on first connect
+        try:
+            with connection() as con:
+                migrate(con)
+        except mysql.connector.Error as err:
+            print("Database setup failed:", err.msg)
+        return
+
     password = load_mysql_password()
     try:
         con = mysql.connector.connect(
@@ -70,77 +298,9 @@ def initialize_database():
         # create database
         cur.execute("CREATE DATABASE IF NOT EXISTS airport_db")
         con.database = "airport_db"
-
-        # admin table
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS admin (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            username VARCHAR(50) UNIQUE NOT NULL,
-            password VARCHAR(255) NOT NULL
-        )
-        """)
-
-        # users table
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            username VARCHAR(50) UNIQUE NOT NULL,
-            email VARCHAR(100) UNIQUE NOT NULL,
-            password VARCHAR(255) NOT NULL
-        )
-        """)
-
-        # bookings table
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS bookings (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT,
-            flight_id VARCHAR(50),
-            receipt_id VARCHAR(50),
-            seats_booked INT DEFAULT 1,
-            booking_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-        """)
-
-        # feedback table
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS feedback (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            user_id INT,
-            message TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-        """)
-
-        # cancelled bookings table
-        cur.execute("""
-        CREATE TABLE IF NOT EXISTS cancelled_bookings (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            booking_id INT,
-            username VARCHAR(50),
-            flight_id VARCHAR(50),
-            seats_booked INT,
-            total_amount DECIMAL(10,2),
-            amount_refunded DECIMAL(10,2),
-            booking_date DATETIME,
-            cancellation_date DATETIME,
-            reason TEXT
-        )
-        """)
-
-        # create default admin if not present
-        cur.execute("SELECT COUNT(*) FROM admin")
-        if cur.fetchone()[0] == 0:
-            cur.execute(
-                "INSERT INTO admin (username, password) VALUES (%s, %s)",
-                ("admin", "admin123")
-            )
-            con.commit()
-            print("Default admin created.")
-
         cur.close()
+
+        migrate(con)
         con.close()
 
     except mysql.connector.Error as err:
@@ -0,0 +1,193 @@
+import argparse
+import csv
+import datetime
+import decimal
+import gzip
+import json
+import os
+from config import get_setting
+from db_connection import connection
+
+# Streaming dumps of bookings, cancelled_bookings and feedback as CSV or
+# JSON lines, optionally gzipped. Rows come off an unbuffered cursor in
+# fetchmany batches and go straight to the file, so memory stays flat
+# however large the table is. The file is written under a .part name and
+# renamed once complete.
+#
+# An incremental export starts after the id its watermark (migration 7)
+# recorded and moves the watermark to the last id written once the file
+# is in place; a crash in between repeats rows rather than losing them.
+# Incremental runs leave rows younger than export_lag seconds for the
+# next run, so a transaction that took its id early but committed late
+# is not skipped.
+
+# table -> (id column, time column, query without WHERE / ORDER BY)
+EXPORTS = {
+    "bookings": ("b.id", "b.booking_date", """
+        SELECT b.id, b.user_id, u.username, b.flight_id, b.source, b.destination,
+               b.seats_booked, b.price_per_seat, b.total_amount, b.booking_date,
+               b.receipt_id
+        FROM bookings b LEFT JOIN users u ON b.user_id = u.id
+    """),
+    "cancelled_bookings": ("c.id", "c.cancellation_date", """
+        SELECT c.id, c.booking_id, c.username, c.flight_id, c.source, c.destination,
+               c.seats_booked, c.total_amount, c.amount_refunded, c.booking_date,
+               c.cancellation_date, c.reason
+        FROM cancelled_bookings c
+    """),
+    "feedback": ("f.id", "f.created_at", """
+        SELECT f.id, f.user_id, u.username, f.message, f.created_at
+        FROM feedback f LEFT JOIN users u ON f.user_id = u.id
+    """),
+}
+FORMATS = ("csv", "jsonl")
+
+
+def get_watermark(name):
+    # last id written by the named incremental export, 0 before the first
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT last_id FROM export_watermarks WHERE name=%s", (name,))
+        row = cur.fetchone()
+        cur.close()
+    return row[0] if row else 0
+
+
+def set_watermark(name, last_id):
+    with connection() as con:
+        cur = con.cursor()
+        cur.execute("""
+            INSERT INTO export_watermarks (name, last_id, exported_at) VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE last_id=VALUES(last_id), exported_at=VALUES(exported_at)
+        """, (name, last_id, datetime.datetime.now()))
+        con.commit()
+        cur.close()
+
+
+def _json_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class _CSVRows:
+    def __init__(self, f, header):
+        self._writer = csv.writer(f)
+        self._writer.writerow(header)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+
+class _JSONRows:
+    def __init__(self, f, header):
+        self._f = f
+        self._header = header
+
+    def write(self, rows):
+        self._f.writelines(
+            json.dumps(dict(zip(self._header, r)), default=_json_value) + "\n" for r in rows
+        )
+
+
+def default_path(table, fmt, compress):
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    name = f"{table}-{stamp}.{fmt}" + (".gz" if compress else "")
+    return os.path.join(get_setting("export_dir", "exports"), name)
+
+
+def export_table(table, fmt="csv", path=None, compress=None, since=None, until=None,
+                 incremental=False, name=None, batch=None):
+    # streams one table to path; since is inclusive, until exclusive.
+    # compress defaults to path ending in .gz. Returns (rows, path, last id).
+    if table not in EXPORTS:
+        raise ValueError(f"Unknown table {table!r}; choose from {', '.join(EXPORTS)}.")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; choose from {', '.join(FORMATS)}.")
+    if compress is None:
+        compress = bool(path) and path.endswith(".gz")
+    path = path or default_path(table, fmt, compress)
+    batch = batch or get_setting("export_batch", 1000, int)
+    name = name or table
+    id_col, time_col, query = EXPORTS[table]
+
+    last_id = get_watermark(name) if incremental else 0
+    where, params = [f"{id_col} > %s"], [last_id]
+    if since is not None:
+        where.append(f"{time_col} >= %s")
+        params.append(since)
+    if until is not None:
+        where.append(f"{time_col} < %s")
+        params.append(until)
+    if incremental:
+        lag = get_setting("export_lag", 5, float)
+        where.append(f"{time_col} <= %s")
+        params.append(datetime.datetime.now() - datetime.timedelta(seconds=lag))
+    sql = f"{query} WHERE {' AND '.join(where)} ORDER BY {id_col}"
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    part = path + ".part"
+    count = 0
+    with connection() as con:
+        cur = con.cursor(buffered=False)
+        cur.execute(sql, params)
+        header = [d[0] for d in cur.description]
+        if compress:
+            f = gzip.open(part, "wt", compresslevel=6, newline="", encoding="utf-8")
+        else:
+            f = open(part, "w", newline="", encoding="utf-8")
+        with f:
+            out = (_CSVRows if fmt == "csv" else _JSONRows)(f, header)
+            while True:
+                rows = cur.fetchmany(batch)
+                if not rows:
+                    break
+                out.write(rows)
+                count += len(rows)
+                last_id = rows[-1][0]
+        cur.close()
+    os.replace(part, path)
+
+    if incremental and count:
+        set_watermark(name, last_id)
+    return count, path, last_id
+
+
+def _when(value):
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a date or timestamp: {value!r}")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(
+        description="Stream a table to CSV or JSON lines, optionally gzipped.")
+    p.add_argument("table", choices=sorted(EXPORTS))
+    p.add_argument("--format", choices=FORMATS, default="csv")
+    p.add_argument("--gzip", action="store_true", help="compress (implied by an --out ending in .gz)")
+    p.add_argument("--out", help="output file (default: <export_dir>/<table>-<time>.<format>)")
+    p.add_argument("--from", dest="since", type=_when, help="first date or timestamp to include")
+    p.add_argument("--to", dest="until", type=_when, help="date or timestamp to stop before")
+    p.add_argument("--since-last", action="store_true",
+                   help="only rows after the last incremental export, then record this one")
+    p.add_argument("--name", help="watermark name for --since-last (default: the table)")
+    p.add_argument("--batch", type=int, help="rows per fetch (default: export_batch setting)")
+    return p.parse_args(argv)
+
+
+if __name__ == "__main__":
+    # python exports.py bookings --format jsonl --gzip --since-last
+    from db_connection import initialize_database
+
+    args = parse_args()
+    initialize_database()
+    count, path, last_id = export_table(
+        args.table, args.format, args.out, args.gzip or None, args.since, args.until,
+        args.since_last, args.name, args.batch
+    )
+    print(f"{count} rows written to {path}.")
+    if args.since_last:
+        print(f"Watermark {args.name or args.table}: id {last_id}.")
@@ -0,0 +1,148 @@
+import re
+import sys
+from config import get_setting
+from db_connection import connection
+
+# Full-text search over feedback.message (migration 8). On MySQL it is an
+# InnoDB FULLTEXT index, which the server keeps current on every insert.
+# On sqlite it is an FTS5 table holding an inverted index of the messages
+# (the text itself stays in feedback only); send_feedback adds each new
+# message to it in the same transaction as the insert, and rebuild()
+# recomputes it from the feedback table.
+#
+# A query is a list of words, all of which must appear; a word ending in
+# * matches as a prefix ("delay*" finds delayed, delays). Results are
+# ranked by relevance (MySQL's relevance or FTS5's bm25, higher first) or
+# by date, and paged with a key of (score or date, id) so a later page
+# costs the same as the first.
+
+MAX_TERMS = 10
+ORDERS = ("rank", "newest")
+_TERM = re.compile(r"\w+\*?")
+
+
+def _sqlite():
+    return get_setting("db_backend", "mysql") == "sqlite"
+
+
+def terms(text):
+    # the words of a query, lower case, in order, without repeats
+    seen = []
+    for term in _TERM.findall((text or "").lower()):
+        if term not in seen:
+            seen.append(term)
+    return seen[:MAX_TERMS]
+
+
+def match_query(words):
+    # the words as a MATCH expression for the backend in use
+    if _sqlite():
+        return " ".join(f'"{w[:-1]}"*' if w.endswith("*") else f'"{w}"' for w in words)
+    return " ".join("+" + w for w in words)
+
+
+def create_index(cur):
+    # the FULLTEXT index on mysql, the FTS5 table (filled) on sqlite
+    if _sqlite():
+        cur.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS feedback_fts
+            USING fts5(message, content='feedback', content_rowid='id')
+        """)
+        rebuild(cur)
+        return
+    cur.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'feedback'
+        AND index_name = 'ft_feedback_message' LIMIT 1
+    """)
+    if cur.fetchone() is None:
+        cur.execute("CREATE FULLTEXT INDEX ft_feedback_message ON feedback (message)")
+
+
+def index_feedback(cur, rows):
+    # rows: (feedback id, message) just inserted in this transaction;
+    # nothing to do on mysql
+    if _sqlite() and rows:
+        cur.executemany("INSERT INTO feedback_fts (rowid, message) VALUES (%s, %s)", rows)
+
+
+def rebuild(cur):
+    # recomputes the sqlite index from the feedback table
+    if _sqlite():
+        cur.execute("INSERT INTO feedback_fts (feedback_fts) VALUES ('rebuild')")
+
+
+def rebuild_index():
+    with connection() as con:
+        cur = con.cursor()
+        rebuild(cur)
+        con.commit()
+        cur.close()
+
+
+def _matches(query):
+    # (FROM ... WHERE, its params, score expression, its params) for the
+    # feedback matching the query
+    if _sqlite():
+        return ("""
+            FROM feedback_fts JOIN feedback f ON f.id = feedback_fts.rowid
+            LEFT JOIN users u ON u.id = f.user_id
+            WHERE feedback_fts MATCH %s
+        """, [query], "-bm25(feedback_fts)", [])
+    return ("""
+        FROM feedback f LEFT JOIN users u ON u.id = f.user_id
+        WHERE MATCH(f.message) AGAINST (%s IN BOOLEAN MODE)
+    """, [query], "MATCH(f.message) AGAINST (%s IN BOOLEAN MODE)", [query])
+
+
+def search(cur, words, since=None, until=None, order="rank", after=None, limit=20):
+    # one page of (id, username, email, message, created_at, score), best
+    # or newest first (score is None for newest first), starting after the
+    # (score or date, id) key of the last row of the page before; since is
+    # inclusive, until exclusive
+    source, source_params, score, score_params = _matches(match_query(words))
+    if order != "rank":
+        # scoring every match only to sort by date would be wasted work
+        score, score_params = "NULL", []
+    params = score_params + source_params
+    filters = []
+    if since is not None:
+        filters.append(" AND f.created_at >= %s")
+        params.append(since)
+    if until is not None:
+        filters.append(" AND f.created_at < %s")
+        params.append(until)
+    key = "score" if order == "rank" else "created_at"
+    sql = f"""
+        SELECT * FROM (
+            SELECT f.id, u.username, u.email, f.message, f.created_at, {score} AS score
+            {source}{"".join(filters)}
+        ) m
+    """
+    if after is not None:
+        sql += f" WHERE m.{key} < %s OR (m.{key} = %s AND m.id < %s)"
+        params += [after[0], after[0], after[1]]
+    sql += f" ORDER BY m.{key} DESC, m.id DESC LIMIT %s"
+    params.append(limit)
+    cur.execute(sql, params)
+    return cur.fetchall()
+
+
+if __name__ == "__main__":
+    # python feedback_search.py rebuild
+    # python feedback_search.py <words...>
+    from db_connection import initialize_database
+
+    if len(sys.argv) < 2:
+        print("Usage: python feedback_search.py rebuild | <words...>")
+        sys.exit(1)
+    initialize_database()
+    if sys.argv[1:] == ["rebuild"]:
+        rebuild_index()
+        print("Feedback search index rebuilt.")
+        sys.exit(0)
+    with connection() as con:
+        cur = con.cursor()
+        for row in search(cur, terms(" ".join(sys.argv[1:]))):
+            print(f"{row[5]:8.3f}  #{row[0]}  {row[4]}  {row[1]}: {row[3]}")
+        cur.close()
@@ -0,0 +1,237 @@
+import threading
+import numpy as np
+from config import get_setting
+from flight_search import normalize, get_search_index
+from utils import get_flight_store
+
+# Columnar copy of the flight schedule for vectorized filters and
+# aggregates (needs NumPy).
+#
+#   price, seats   float64 / int64 arrays, parsed once per row
+#   source, dest   int32 codes into one list of normalized place names
+#   live           False for removed rows until the next compaction
+#
+# A route filter tests each distinct place once and expands that to a
+# row mask with one take; price ranges and aggregates are array
+# operations. Rows keep their position, so results come out in file
+# order, the same as FlightSearchIndex.
+
+INITIAL_CAPACITY = 1024
+
+
+def _price(row):
+    try:
+        return float(row[3])
+    except (ValueError, IndexError):
+        return None
+
+
+def _seats(row):
+    try:
+        return int(row[4])
+    except (ValueError, IndexError):
+        return 0
+
+
+class FlightColumns:
+    # keeps the columns in step with a flight store through its events
+
+    def __init__(self, store=None):
+        self._lock = threading.RLock()
+        self._store = store
+        self._clear()
+        if store is not None:
+            store.subscribe(self._on_change)
+            self.rebuild(store.all())
+
+    def _clear(self, capacity=INITIAL_CAPACITY):
+        self._n = 0                 # rows used, live or not
+        self._dead = 0
+        self._price = np.zeros(capacity, np.float64)
+        self._seats = np.zeros(capacity, np.int64)
+        self._source = np.zeros(capacity, np.int32)
+        self._dest = np.zeros(capacity, np.int32)
+        self._live = np.zeros(capacity, bool)
+        self._rows = []             # row position -> row, None once removed
+        self._pos = {}              # flight id -> row position
+        self._places = []           # code -> normalized place
+        self._labels = []           # code -> place as first written
+        self._codes = {}            # normalized place -> code
+
+    def _on_change(self, event, data):
+        if event == "reload":
+            self.rebuild(self._store.all())
+        elif event == "add":
+            self.add(data)
+        elif event == "update":
+            self.update(data)
+        elif event == "remove":
+            self.remove(data)
+        elif event == "seats":
+            self.set_seats(*data)
+
+    def _code(self, place):
+        key = normalize(place)
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self._places)
+            self._places.append(key)
+            self._labels.append(place.strip())
+        return code
+
+    def _grow(self, needed):
+        size = len(self._price)
+        if needed <= size:
+            return
+        while size < needed:
+            size *= 2
+        for name in ("_price", "_seats", "_source", "_dest", "_live"):
+            old = getattr(self, name)
+            new = np.zeros(size, old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+
+    def _put(self, i, row, price):
+        self._price[i] = price
+        self._seats[i] = _seats(row)
+        self._source[i] = self._code(row[1])
+        self._dest[i] = self._code(row[2])
+        self._live[i] = True
+
+    def rebuild(self, rows):
+        # bulk load: arrays sized once, columns parsed in one pass
+        with self._lock:
+            self._clear(max(INITIAL_CAPACITY, len(rows)))
+            for row in rows:
+                price = _price(row)
+                fid = row[0].upper()
+                if price is None or fid in self._pos:
+                    continue
+                self._put(self._n, row, price)
+                self._rows.append(list(row))
+                self._pos[fid] = self._n
+                self._n += 1
+
+    def add(self, row):
+        # rows with a price that does not parse are never searchable
+        price = _price(row)
+        if price is None:
+            return
+        fid = row[0].upper()
+        with self._lock:
+            if fid in self._pos:
+                return
+            self._grow(self._n + 1)
+            self._put(self._n, row, price)
+            self._rows.append(list(row))
+            self._pos[fid] = self._n
+            self._n += 1
+
+    def remove(self, flight_id):
+        with self._lock:
+            i = self._pos.pop(flight_id.upper(), None)
+            if i is None:
+                return
+            self._live[i] = False
+            self._rows[i] = None
+            self._dead += 1
+            if self._dead > INITIAL_CAPACITY and self._dead * 2 > self._n:
+                self.rebuild([r for r in self._rows if r is not None])
+
+    def update(self, row):
+        # keeps the flight's position so results stay in file order
+        fid = row[0].upper()
+        price = _price(row)
+        with self._lock:
+            i = self._pos.get(fid)
+            if i is None or price is None:
+                self.remove(fid)
+                self.add(row)
+                return
+            self._put(i, row, price)
+            self._rows[i] = list(row)
+
+    def set_seats(self, flight_id, seats):
+        with self._lock:
+            i = self._pos.get(flight_id.upper())
+            if i is not None:
+                self._seats[i] = seats
+                self._rows[i][4] = str(seats)
+
+    def __len__(self):
+        if self._store is not None:
+            self._store.refresh()
+        with self._lock:
+            return len(self._pos)
+
+    def _place_mask(self, query):
+        # per-code mask of places containing query
+        return np.fromiter((query in p for p in self._places), bool, len(self._places))
+
+    def _mask(self, src, dst, pmin, pmax):
+        # row mask for the filters; callers hold the lock
+        n = self._n
+        mask = self._live[:n].copy()
+        if src:
+            mask &= self._place_mask(src)[self._source[:n]]
+        if dst:
+            mask &= self._place_mask(dst)[self._dest[:n]]
+        if pmin > 0:
+            mask &= self._price[:n] >= pmin
+        if pmax != float("inf"):
+            mask &= self._price[:n] <= pmax
+        return mask
+
+    def search(self, src="", dst="", pmin=0, pmax=float("inf")):
+        # same results and order as FlightSearchIndex.search
+        src = normalize(src)
+        dst = normalize(dst)
+        if self._store is not None:
+            self._store.refresh()
+        with self._lock:
+            rows = self._rows
+            return [list(rows[i]) for i in np.flatnonzero(self._mask(src, dst, pmin, pmax))]
+
+    def route_summary(self, src="", dst="", pmin=0, pmax=float("inf")):
+        # [source, destination, flights, seats left, average fare] per
+        # route among the matching flights, sorted by route
+        src = normalize(src)
+        dst = normalize(dst)
+        if self._store is not None:
+            self._store.refresh()
+        with self._lock:
+            mask = self._mask(src, dst, pmin, pmax)
+            if not mask.any():
+                return []
+            places = len(self._places)
+            keys = (self._source[:self._n][mask].astype(np.int64) * places
+                    + self._dest[:self._n][mask])
+            routes, inverse = np.unique(keys, return_inverse=True)
+            flights = np.bincount(inverse)
+            seats = np.bincount(inverse, weights=self._seats[:self._n][mask]).astype(np.int64)
+            fares = np.bincount(inverse, weights=self._price[:self._n][mask]) / flights
+            # order routes by their place names without sorting strings per route
+            labels = self._labels
+            rank = np.empty(places, np.int64)
+            rank[sorted(range(places), key=lambda c: labels[c].lower())] = np.arange(places)
+            froms, tos = routes // places, routes % places
+            order = np.lexsort((rank[tos], rank[froms]))
+            return [[labels[s], labels[d], f, n, round(a, 2)] for s, d, f, n, a in zip(
+                froms[order].tolist(), tos[order].tolist(), flights[order].tolist(),
+                seats[order].tolist(), fares[order].tolist())]
+
+
+_columns = None
+_columns_lock = threading.Lock()
+
+
+def get_flight_columns():
+    # process-wide columns over the configured flight store; the search
+    # index itself when search_index=columns
+    global _columns
+    if get_setting("search_index", "index") == "columns":
+        return get_search_index()
+    with _columns_lock:
+        if _columns is None:
+            _columns = FlightColumns(get_flight_store())
+        return _columns
@@ -0,0 +1,203 @@
+import csv
+import json
+import sys
+import time
+import mysql.connector
+from config import get_setting
+from db_connection import connection
+from utils import HEADERS, append_flights, get_flight_store, format_price
+
+# Bulk schedule import. The file is read one row at a time and written in
+# chunks, each chunk in its own transaction, so only one chunk is held in
+# memory however big the file is. Rejected rows are streamed to a CSV
+# report next to the input.
+
+DEFAULT_CHUNK = 1000
+
+
+def _read_csv(path):
+    # yields (line number, [id, source, destination, price, seats])
+    with open(path, "r", newline="") as f:
+        for line_no, row in enumerate(csv.reader(f), 1):
+            if not row:
+                continue
+            if line_no == 1 and [c.strip().lower() for c in row] == HEADERS:
+                continue
+            yield line_no, row
+
+
+def _read_jsonl(path):
+    # one JSON object (keys from HEADERS) or array per line
+    with open(path, "r") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError:
+                yield line_no, None
+                continue
+            if isinstance(item, dict):
+                item = [item.get(h) for h in HEADERS]
+            yield line_no, item
+
+
+def read_schedule(path):
+    if path.lower().endswith((".jsonl", ".json", ".ndjson")):
+        return _read_jsonl(path)
+    return _read_csv(path)
+
+
+def validate(row):
+    # returns (flight row, None) or (None, reason)
+    if row is None:
+        return None, "Unreadable line."
+    if not isinstance(row, list) or len(row) != len(HEADERS):
+        return None, f"Expected {len(HEADERS)} fields: {', '.join(HEADERS)}."
+    fid, src, dst, price, seats = [("" if v is None else str(v)).strip() for v in row]
+    if not fid:
+        return None, "Flight ID cannot be empty."
+    if len(fid) > 50:
+        return None, "Flight ID is too long."
+    if not src or not dst:
+        return None, "Source and destination are required."
+    try:
+        price = float(price)
+    except ValueError:
+        return None, "Invalid price."
+    if price <= 0:
+        return None, "Price must be positive."
+    try:
+        seats = int(seats)
+    except ValueError:
+        return None, "Invalid seat number."
+    if seats < 0:
+        return None, "Seats cannot be negative."
+    return [fid.upper(), src, dst, format_price(price), str(seats)], None
+
+
+def _existing_ids(cur, ids):
+    # ids already in the flights table (primary key lookup)
+    marks = ", ".join(["%s"] * len(ids))
+    cur.execute(f"SELECT id FROM flights WHERE id IN ({marks})", list(ids))
+    return {r[0].upper() for r in cur.fetchall()}
+
+
+class _Rejects:
+    # streams rejected rows to a CSV report, opened on first reject
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def add(self, line_no, reason, row):
+        if self._file is None:
+            self._file = open(self.path, "w", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(["line", "reason"] + HEADERS)
+        self._writer.writerow([line_no, reason] + (list(row) if isinstance(row, list) else []))
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _commit_chunk(chunk, rejects):
+    # chunk: list of (line number, flight row); returns rows imported
+    store = get_flight_store()
+    with connection() as con:
+        cur = con.cursor()
+        taken = _existing_ids(cur, {row[0] for _, row in chunk})
+        good = []
+        for line_no, row in chunk:
+            if row[0] in taken or (not store.holds_inventory and row[0] in store):
+                rejects.add(line_no, "Flight ID already exists.", row)
+            else:
+                good.append(row)
+        # a store that is the flights table inserts the rows itself below
+        if good and not store.holds_inventory:
+            cur.executemany(
+                "INSERT INTO flights (id, source, destination, price, seats) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [(r[0], r[1], r[2], float(r[3]), int(r[4])) for r in good]
+            )
+        con.commit()
+        cur.close()
+    if good:
+        append_flights(good)
+    return len(good)
+
+
+def import_schedule(path, chunk_size=None, rejects_path=None, progress=None):
+    # imports a CSV or JSONL schedule; returns (imported, rejected, seconds)
+    chunk_size = chunk_size or get_setting("import_chunk_size", DEFAULT_CHUNK, int)
+    rejects = _Rejects(rejects_path or path + ".rejects.csv")
+    imported = 0
+    start = time.perf_counter()
+
+    chunk = []
+    seen = set()  # ids in the current chunk only
+    try:
+        for line_no, raw in read_schedule(path):
+            row, reason = validate(raw)
+            if row is None:
+                rejects.add(line_no, reason, raw)
+                continue
+            if row[0] in seen:
+                rejects.add(line_no, "Duplicate flight ID in file.", row)
+                continue
+            seen.add(row[0])
+            chunk.append((line_no, row))
+            if len(chunk) >= chunk_size:
+                try:
+                    imported += _commit_chunk(chunk, rejects)
+                except mysql.connector.Error as err:
+                    for n, r in chunk:
+                        rejects.add(n, f"Database error: {err.msg}", r)
+                chunk = []
+                seen = set()
+                if progress:
+                    progress(imported, rejects.count, time.perf_counter() - start)
+        if chunk:
+            try:
+                imported += _commit_chunk(chunk, rejects)
+            except mysql.connector.Error as err:
+                for n, r in chunk:
+                    rejects.add(n, f"Database error: {err.msg}", r)
+    finally:
+        rejects.close()
+
+    return imported, rejects.count, time.perf_counter() - start
+
+
+def print_progress(imported, rejected, seconds):
+    rate = imported / seconds if seconds else 0.0
+    print(f"  {imported} imported, {rejected} rejected ({rate:.0f} rows/s)")
+
+
+def run_import(path, chunk_size=None):
+    # imports and prints a summary; used by the admin menu and the CLI
+    try:
+        imported, rejected, seconds = import_schedule(path, chunk_size, progress=print_progress)
+    except FileNotFoundError:
+        print("File not found:", path)
+        return
+    rate = imported / seconds if seconds else 0.0
+    print(f"Imported {imported} flights, rejected {rejected} "
+          f"in {seconds:.1f}s ({rate:.0f} rows/s).")
+    if rejected:
+        print("Rejected rows written to", path + ".rejects.csv")
+
+
+if __name__ == "__main__":
+    # python flight_import.py schedule.csv|schedule.jsonl [chunk size]
+    if len(sys.argv) < 2:
+        print("Usage: python flight_import.py <schedule.csv|schedule.jsonl> [chunk size]")
+        sys.exit(1)
+    from db_connection import initialize_database
+    initialize_database()
+    run_import(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else None)
@@ -0,0 +1,489 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import zlib
+import metrics
+from config import get_setting
+from utils import FLIGHTS_CSV, FlightStore, ensure_file_exists, fsync_dir, write_csv_atomic
+
+try:
+    import fcntl
+except ImportError:  # Windows: one process per flight file
+    fcntl = None
+
+# Flight file with an append-only change journal.
+#
+#   flights.csv                snapshot, same layout as the csv store
+#   flights.csv.journal        one line per change since the snapshot,
+#                              "<crc32 hex> <json record>\n"
+#   flights.csv.journal.old    journal being folded in by a compaction
+#
+# A change is applied in memory, appended to the journal and fsynced
+# before the call returns; if the write fails the rows are reloaded from
+# disk and the call raises. A failed write is cut back off the journal, as
+# is a torn line another process left, before the next append. Threads committing at the same time share one
+# write and one fsync (group commit). Once the journal passes
+# journal_compact_bytes, a background thread rotates it to .old, writes
+# the rows to a temp file, then renames that over the snapshot and drops
+# .old together; writers only wait for the rotation and the rename.
+#
+# Loading replays .old and the journal on top of the snapshot. Records
+# set values (a seat count, a whole row) instead of applying deltas, so
+# replaying one the snapshot already holds changes nothing. A line torn
+# by a crash fails its checksum and is cut off at startup.
+
+DEFAULT_COMPACT_BYTES = 4 * 1024 * 1024
+
+
+def _encode(record):
+    data = json.dumps(record, separators=(",", ":"))
+    return f"{zlib.crc32(data.encode('utf-8')):08x} {data}\n"
+
+
+def read_journal(path, offset=0):
+    # (records, offset after the last good line) from offset on; stops at
+    # a line that is incomplete or fails its checksum
+    records = []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return records, offset
+    with f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                crc, data = line[:-1].split(b" ", 1)
+                if int(crc, 16) != zlib.crc32(data):
+                    break
+                records.append(json.loads(data))
+            except ValueError:
+                break
+            offset += len(line)
+    return records, offset
+
+
+def _stat(path):
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+
+@contextlib.contextmanager
+def _locked(path, block=True):
+    # exclusive lock between processes; yields False when block is False
+    # and another process holds it
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | (0 if block else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+        yield True
+    finally:
+        os.close(fd)
+
+
+class Journal:
+    # append side of the journal. append() queues lines and returns a
+    # ticket; wait(ticket) returns once they are on disk. The first waiter
+    # writes and fsyncs everything queued so far while later ones wait.
+
+    def __init__(self, path, lock_path, delay=0.0):
+        self.path = path
+        self.lock_path = lock_path
+        self.delay = delay
+        st = _stat(path)
+        self.size = st.st_size if st else 0
+        self.syncs = 0
+        self._cond = threading.Condition()
+        self._pending = []
+        self._queued = 0        # ticket of the newest append
+        self._durable = 0       # every ticket up to this one is on disk
+        self._flushing = False
+        self._failed = (0, None)
+        self._fd = None
+
+    def append(self, records):
+        lines = [_encode(r) for r in records]
+        with self._cond:
+            self._pending.extend(lines)
+            self._queued += 1
+            return self._queued
+
+    def wait(self, ticket):
+        with self._cond:
+            while self._durable < ticket:
+                if ticket <= self._failed[0]:
+                    raise self._failed[1]
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                self._flushing = True
+                if self.delay:
+                    # let other committers join this batch
+                    self._cond.wait(self.delay)
+                lines, upto = self._pending, self._queued
+                self._pending = []
+                error = None
+                self._cond.release()
+                try:
+                    self._write(lines)
+                except OSError as err:
+                    error = err
+                finally:
+                    self._cond.acquire()
+                    self._flushing = False
+                    if error is None:
+                        self._durable = upto
+                    else:
+                        self._failed = (upto, error)
+                    self._cond.notify_all()
+
+    def sync(self):
+        # waits for everything appended so far
+        with self._cond:
+            ticket = self._queued
+        self.wait(ticket)
+
+    def _rotated(self):
+        st = _stat(self.path)
+        return st is None or st.st_ino != os.fstat(self._fd).st_ino
+
+    def _good_end(self):
+        # (offset after the last whole line, file size); a write that failed
+        # part way leaves a torn line, and lines appended after it are never read
+        size = os.fstat(self._fd).st_size
+        pos = size
+        while pos > 0:
+            start = max(0, pos - 4096)
+            os.lseek(self._fd, start, os.SEEK_SET)
+            chunk = os.read(self._fd, pos - start)
+            i = chunk.rfind(b"\n")
+            if i >= 0:
+                return start + i + 1, size
+            pos = start
+        return 0, size
+
+    def _write(self, lines):
+        data = "".join(lines).encode("utf-8")
+        with metrics.timer("flights_file_seconds", op="journal"), _locked(self.lock_path):
+            if self._fd is not None and self._rotated():
+                os.close(self._fd)
+                self._fd = None
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT |
+                                   getattr(os, "O_BINARY", 0), 0o644)
+            start, size = self._good_end()
+            try:
+                if size > start:
+                    os.ftruncate(self._fd, start)
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(self._fd, view):]
+                os.fsync(self._fd)
+            except OSError:
+                # leave the journal ending on a whole line for the next append
+                try:
+                    os.ftruncate(self._fd, start)
+                except OSError:
+                    pass
+                raise
+            self.size = start + len(data)
+        self.syncs += 1
+        metrics.count("flights_file_bytes_written_total", len(data))
+
+    def close(self):
+        with self._cond:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+
+class JournalFlightStore(FlightStore):
+    # flights.csv as a snapshot plus the journal of changes made since
+
+    def __init__(self, path=FLIGHTS_CSV, compact_bytes=None, delay=None):
+        super().__init__(path)
+        self.journal_path = path + ".journal"
+        self._old_path = self.journal_path + ".old"
+        self._lock_path = self.journal_path + ".lock"
+        self._compact_path = self.journal_path + ".compact"
+        if delay is None:
+            delay = get_setting("journal_group_delay", 0, float) / 1000
+        self.journal = Journal(self.journal_path, self._lock_path, delay)
+        self.compact_bytes = compact_bytes or get_setting(
+            "journal_compact_bytes", DEFAULT_COMPACT_BYTES, int)
+        self._writer = f"{os.getpid()}.{os.urandom(3).hex()}"
+        self._journal_ino = None    # journal file the offset belongs to
+        self._offset = 0            # journal bytes already applied
+        self._compacting = False
+        self._recover()
+
+    def _recover(self):
+        # cuts off lines torn by a crash so new records follow good ones
+        with _locked(self._lock_path):
+            for path in (self._old_path, self.journal_path):
+                st = _stat(path)
+                if st is None:
+                    continue
+                _, end = read_journal(path)
+                if st.st_size > end:
+                    print(f"Flight journal {path}: dropped {st.st_size - end} "
+                          f"damaged bytes at the end.")
+                    with open(path, "r+b") as f:
+                        f.truncate(end)
+                        os.fsync(f.fileno())
+
+    def _apply(self, record):
+        # one record against the rows in memory; returns its (event, data)
+        # for the listeners, or None if it changed nothing
+        op = record["op"]
+        if op == "add":
+            row = list(record["row"])
+            if row[0] in self._index:
+                return None
+            self._rows.append(row)
+            self._index[row[0]] = row
+            event, data = "add", row
+        elif op == "update":
+            row = self._index.get(record["row"][0])
+            if row is None:
+                return None
+            row[1:] = record["row"][1:]
+            event, data = "update", row
+        elif op == "seats":
+            row = self._index.get(record["id"])
+            if row is None:
+                return None
+            row[4] = str(record["seats"])
+            event, data = "seats", (row[0], int(record["seats"]))
+        elif op == "remove":
+            fid = record["id"]
+            if fid not in self._index:
+                return None
+            self._rows = [r for r in self._rows if r[0] != fid]
+            del self._index[fid]
+            event, data = "remove", fid
+        else:
+            return None
+        return event, data
+
+    def _load(self, held=False):
+        # snapshot, then .old and the journal replayed on top of it, read
+        # under the journal lock so a compaction cannot replace the snapshot
+        # and drop .old between the reads (held: the caller has the lock)
+        with contextlib.nullcontext() if held else _locked(self._lock_path):
+            stamp = self._file_stamp()
+            super()._load()
+            st = _stat(self.journal_path)
+            for path in (self._old_path, self.journal_path):
+                records, end = read_journal(path)
+                for record in records:
+                    self._apply(record)
+        self._stamp = stamp
+        self._journal_ino = st.st_ino if st else None
+        self._offset = end if st else 0
+
+    def _refresh(self, held=False):
+        # reloads when the snapshot was replaced or the journal rotated;
+        # otherwise applies records other processes appended
+        ensure_file_exists(self.path)
+        stamp = self._file_stamp()
+        st = _stat(self.journal_path)
+        rotated = self._journal_ino is not None and (st is None or st.st_ino != self._journal_ino)
+        if stamp != self._stamp or rotated:
+            # records applied here but not yet written would be lost by the reload
+            self.journal.sync()
+            self._load(held)
+            self._notify("reload")
+            return
+        if st is None or st.st_size <= self._offset:
+            return
+        self._journal_ino = st.st_ino
+        records, self._offset = read_journal(self.journal_path, self._offset)
+        for record in records:
+            if record.get("w") != self._writer:
+                change = self._apply(record)
+                if change:
+                    self._notify(*change)
+
+    def _commit(self, records):
+        # applies records and returns once they are on disk; returns how
+        # many of them changed something. Listeners hear of the changes
+        # only after the write; if it fails the rows are reloaded from disk
+        with self._lock:
+            self._refresh()
+            applied = []
+            changes = []
+            for record in records:
+                record["w"] = self._writer
+                change = self._apply(record)
+                if change:
+                    applied.append(record)
+                    changes.append(change)
+            ticket = self.journal.append(applied) if applied else 0
+        if ticket:
+            try:
+                self.journal.wait(ticket)
+            except OSError:
+                self._roll_back()
+                raise
+            metrics.count("flights_journal_records_total", len(applied))
+            with self._lock:
+                for change in changes:
+                    self._notify(*change)
+            if self.journal.size > self.compact_bytes:
+                self._compact_later()
+        return len(applied)
+
+    def _roll_back(self):
+        # drops changes that never reached the journal from memory
+        with self._lock:
+            try:
+                # other threads' records still queued get their own chance
+                self.journal.sync()
+            except OSError:
+                pass
+            self._load()
+            self._notify("reload")
+
+    # --- store interface ---
+
+    def add(self, flight):
+        row = list(flight)
+        row[0] = row[0].upper()
+        self._commit([{"op": "add", "row": row}])
+
+    def add_many(self, flights):
+        records = []
+        for f in flights:
+            row = list(f)
+            row[0] = row[0].upper()
+            records.append({"op": "add", "row": row})
+        self._commit(records)
+
+    def update(self, flight):
+        row = list(flight)
+        row[0] = row[0].upper()
+        return self._commit([{"op": "update", "row": row}]) == 1
+
+    def set_seats(self, flight_id, seats):
+        return self.set_many_seats({flight_id: seats}) == 1
+
+    def set_many_seats(self, seats_by_id):
+        return self._commit([{"op": "seats", "id": fid.upper(), "seats": int(seats)}
+                             for fid, seats in seats_by_id.items()])
+
+    def remove(self, flight_id):
+        return self._commit([{"op": "remove", "id": flight_id.upper()}]) == 1
+
+    def replace_all(self, flights):
+        # writes a new snapshot directly and discards the journal
+        rows = []
+        for f in flights:
+            if f:
+                row = list(f)
+                row[0] = row[0].upper()
+                rows.append(row)
+        with _locked(self._compact_path), self._lock:
+            self.journal.sync()
+            with _locked(self._lock_path):
+                with metrics.timer("flights_file_seconds", op="write"):
+                    write_csv_atomic(self.path, rows)
+                for path in (self._old_path, self.journal_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                self.journal.size = 0
+                self._rows = []
+                self._index = {}
+                for row in rows:
+                    self._rows.append(row)
+                    self._index.setdefault(row[0], row)
+                self._stamp = self._file_stamp()
+                self._journal_ino = None
+                self._offset = 0
+        self._notify("reload")
+
+    # --- compaction ---
+
+    def _compact_later(self):
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact_in_background, name="flights-compact",
+                         daemon=True).start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact(block=False)
+        except OSError as err:
+            print("Flight journal compaction failed:", err)
+        finally:
+            self._compacting = False
+
+    def compact(self, block=True):
+        # folds the journal into a fresh snapshot; False if there was nothing
+        # to fold or another process is already compacting
+        with _locked(self._compact_path, block) as locked:
+            if not locked:
+                return False
+            with self._lock:
+                self._refresh()
+                self.journal.sync()
+                with _locked(self._lock_path):
+                    # records another process wrote before we got the lock
+                    self._refresh(held=True)
+                    if os.path.exists(self._old_path):
+                        # a crashed compaction left .old behind; fold both
+                        if os.path.exists(self.journal_path):
+                            with open(self.journal_path, "rb") as src, \
+                                    open(self._old_path, "ab") as dst:
+                                dst.write(src.read())
+                                dst.flush()
+                                os.fsync(dst.fileno())
+                            os.remove(self.journal_path)
+                    elif os.path.exists(self.journal_path):
+                        os.replace(self.journal_path, self._old_path)
+                    else:
+                        return False
+                    self.journal.size = 0
+                    self._journal_ino = None
+                    self._offset = 0
+                    rows = [list(r) for r in self._rows]
+
+            # writers continue on a new journal while the snapshot is written;
+            # it replaces the old one and .old goes in one step under the
+            # journal lock, so a loader sees either both or neither
+            staged = self._compact_path + ".csv"
+            with metrics.timer("flights_file_seconds", op="compact"):
+                write_csv_atomic(staged, rows)
+            with self._lock, _locked(self._lock_path):
+                os.replace(staged, self.path)
+                os.remove(self._old_path)
+                self._stamp = self._file_stamp()
+            fsync_dir(self.path)
+        return True
+
+    def close(self):
+        self.journal.close()
+
+
+if __name__ == "__main__":
+    # python flight_journal.py compact [flights.csv]
+    if len(sys.argv) < 2 or sys.argv[1] != "compact":
+        print("Usage: python flight_journal.py compact [flights.csv]")
+        sys.exit(1)
+    store = JournalFlightStore(sys.argv[2] if len(sys.argv) > 2 else
+                               get_setting("flights_file", FLIGHTS_CSV))
+    if store.compact():
+        print(f"Journal folded into {store.path} ({len(store.all())} flights).")
+    else:
+        print("Nothing to compact.")
@@ -0,0 +1,276 @@
+import threading
+from bisect import bisect_left, bisect_right
+from config import get_setting
+from utils import get_flight_store
+
+# Search index for source/destination/price queries.
+#
+# Places are few compared to flights, so n-grams point at distinct
+# normalized place names and each place points at its flights. A price
+# range is two bisects into parallel sorted lists. Each filter knows the
+# size of its candidate set before building it, so candidate sets are
+# intersected smallest first and much larger ones are only probed.
+
+GRAM_SIZE = 3
+
+
+def normalize(text):
+    return text.strip().lower()
+
+
+def _price(row):
+    try:
+        return float(row[3])
+    except (ValueError, IndexError):
+        return None
+
+
+def _grams(text):
+    # every substring of length 1..GRAM_SIZE, so queries up to GRAM_SIZE
+    # characters are answered exactly by one lookup
+    grams = set()
+    for n in range(1, GRAM_SIZE + 1):
+        for i in range(len(text) - n + 1):
+            grams.add(text[i:i + n])
+    return grams
+
+
+class _PlaceIndex:
+    # substring lookup over one column (source or destination)
+
+    def __init__(self):
+        self.flights = {}  # normalized place -> set of flight ids
+        self.grams = {}    # n-gram -> set of normalized places
+
+    def add(self, place, fid):
+        ids = self.flights.get(place)
+        if ids is None:
+            ids = self.flights[place] = set()
+            for g in _grams(place):
+                self.grams.setdefault(g, set()).add(place)
+        ids.add(fid)
+
+    def remove(self, place, fid):
+        ids = self.flights.get(place)
+        if ids is None:
+            return
+        ids.discard(fid)
+        if not ids:
+            del self.flights[place]
+            for g in _grams(place):
+                places = self.grams.get(g)
+                if places is not None:
+                    places.discard(place)
+                    if not places:
+                        del self.grams[g]
+
+    def places_matching(self, query):
+        # set of normalized places that contain query
+        if len(query) <= GRAM_SIZE:
+            return self.grams.get(query, set())
+        sets = []
+        for i in range(len(query) - GRAM_SIZE + 1):
+            places = self.grams.get(query[i:i + GRAM_SIZE])
+            if not places:
+                return set()
+            sets.append(places)
+        sets.sort(key=len)
+        return {p for p in sets[0].intersection(*sets[1:]) if query in p}
+
+
+class FlightSearchIndex:
+    # keeps the indexes in step with a flight store through its events
+
+    def __init__(self, store=None):
+        self._lock = threading.RLock()
+        self._store = store
+        self._clear()
+        if store is not None:
+            store.subscribe(self._on_change)
+            self.rebuild(store.all())
+
+    def _clear(self):
+        self._rows = {}         # flight id -> row, in file order
+        self._meta = {}         # flight id -> (price, source, destination) normalized
+        self._order = {}        # flight id -> position for file-order results
+        self._next = 0
+        self._price_keys = []   # sorted prices
+        self._price_ids = []    # flight ids, parallel to _price_keys
+        self._source = _PlaceIndex()
+        self._destination = _PlaceIndex()
+
+    def _on_change(self, event, data):
+        if event == "reload":
+            self.rebuild(self._store.all())
+        elif event == "add":
+            self.add(data)
+        elif event == "update":
+            self.update(data)
+        elif event == "remove":
+            self.remove(data)
+        elif event == "seats":
+            with self._lock:
+                row = self._rows.get(data[0])
+                if row is not None:
+                    row[4] = str(data[1])
+
+    def _index(self, fid, row, price):
+        src, dst = normalize(row[1]), normalize(row[2])
+        self._rows[fid] = list(row)
+        self._meta[fid] = (price, src, dst)
+        self._source.add(src, fid)
+        self._destination.add(dst, fid)
+
+    def _unindex(self, fid):
+        price, src, dst = self._meta.pop(fid)
+        lo = bisect_left(self._price_keys, price)
+        hi = bisect_right(self._price_keys, price)
+        pos = self._price_ids.index(fid, lo, hi)
+        del self._price_keys[pos]
+        del self._price_ids[pos]
+        self._source.remove(src, fid)
+        self._destination.remove(dst, fid)
+
+    def _index_price(self, fid, price):
+        pos = bisect_right(self._price_keys, price)
+        self._price_keys.insert(pos, price)
+        self._price_ids.insert(pos, fid)
+
+    def rebuild(self, rows):
+        # bulk load: one sort for the price index instead of n inserts
+        with self._lock:
+            self._clear()
+            prices = []
+            for row in rows:
+                price = _price(row)
+                fid = row[0].upper()
+                if price is None or fid in self._rows:
+                    continue
+                self._index(fid, row, price)
+                self._order[fid] = self._next
+                self._next += 1
+                prices.append((price, self._order[fid], fid))
+            prices.sort()
+            self._price_keys = [p[0] for p in prices]
+            self._price_ids = [p[2] for p in prices]
+
+    def add(self, row):
+        # rows with a price that does not parse are never searchable
+        price = _price(row)
+        if price is None:
+            return
+        fid = row[0].upper()
+        with self._lock:
+            if fid in self._rows:
+                return
+            self._index(fid, row, price)
+            self._index_price(fid, price)
+            self._order[fid] = self._next
+            self._next += 1
+
+    def remove(self, flight_id):
+        fid = flight_id.upper()
+        with self._lock:
+            if self._rows.pop(fid, None) is None:
+                return
+            del self._order[fid]
+            self._unindex(fid)
+
+    def update(self, row):
+        # keeps the flight's position so results stay in file order
+        fid = row[0].upper()
+        price = _price(row)
+        with self._lock:
+            if fid not in self._rows or price is None:
+                self.remove(fid)
+                self.add(row)
+                return
+            self._unindex(fid)
+            self._index(fid, row, price)
+            self._index_price(fid, price)
+
+    def __len__(self):
+        if self._store is not None:
+            self._store.refresh()
+        with self._lock:
+            return len(self._rows)
+
+    def _place_filter(self, index, query, column):
+        places = index.places_matching(query)
+        size = sum(len(index.flights[p]) for p in places)
+
+        def build():
+            ids = set()
+            for p in places:
+                ids |= index.flights[p]
+            return ids
+
+        return size, build, lambda fid: self._meta[fid][column] in places
+
+    def _price_filter(self, pmin, pmax):
+        lo = bisect_left(self._price_keys, pmin)
+        hi = bisect_right(self._price_keys, pmax)
+        return (hi - lo, lambda: self._price_ids[lo:hi],
+                lambda fid: pmin <= self._meta[fid][0] <= pmax)
+
+    def search(self, src="", dst="", pmin=0, pmax=float("inf")):
+        # rows whose source/destination contain src/dst (case-insensitive)
+        # and whose price is within [pmin, pmax], in file order
+        src = normalize(src)
+        dst = normalize(dst)
+        if self._store is not None:
+            self._store.refresh()
+        with self._lock:
+            filters = []
+            if src:
+                filters.append(self._place_filter(self._source, src, 1))
+            if dst:
+                filters.append(self._place_filter(self._destination, dst, 2))
+            if pmin > 0 or pmax != float("inf"):
+                filters.append(self._price_filter(pmin, pmax))
+
+            if not filters:
+                return [list(row) for row in self._rows.values()]
+
+            # start from the smallest candidate set; intersect with sets of
+            # similar size, probe candidates one by one against much larger ones
+            filters.sort(key=lambda f: f[0])
+            ids = set(filters[0][1]())
+            for size, build, test in filters[1:]:
+                if not ids:
+                    break
+                if size > 4 * len(ids):
+                    ids = {fid for fid in ids if test(fid)}
+                else:
+                    ids = ids.intersection(build())
+
+            if len(ids) * 8 > len(self._rows):
+                # large result: walking the rows in order beats sorting
+                return [list(row) for fid, row in self._rows.items() if fid in ids]
+            ordered = sorted(ids, key=self._order.__getitem__)
+            return [list(self._rows[fid]) for fid in ordered]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    # process-wide index over the configured flight store;
+    # search_index=columns uses the NumPy columns from flight_columns.py
+    global _index
+    with _index_lock:
+        if _index is None:
+            if get_setting("search_index", "index") == "columns":
+                try:
+                    from flight_columns import FlightColumns
+                    _index = FlightColumns(get_flight_store())
+                except ImportError:
+                    print("NumPy is not installed; using the default search index.")
+            if _index is None:
+                _index = FlightSearchIndex(get_flight_store())
+        return _index
+
+
+def search(src="", dst="", pmin=0, pmax=float("inf")):
+    return get_search_index().search(src, dst, pmin, pmax)
@@ -0,0 +1,169 @@
+import datetime
+import os
+import tempfile
+import threading
+import time
+from config import get_setting
+
+try:
+    import fcntl
+except ImportError:  # Windows: slot picked from the process id instead
+    fcntl = None
+
+# Unique, time-ordered IDs without a database round trip (Snowflake
+# layout), 63 bits:
+#
+#   41 bits  milliseconds since 2024-01-01 UTC (good until 2093)
+#    5 bits  node, the id_node setting; give each host its own
+#    5 bits  process slot on the node, held with an flock on
+#            <id_lock_dir>/slot-NN.lock for the life of the process
+#   12 bits  sequence within the millisecond
+#
+# A process makes up to 4096 IDs per millisecond. Past that, or when the
+# wall clock steps back, it carries on from the last millisecond it used
+# instead of waiting, so IDs never repeat or go backwards. The lock file
+# keeps the last millisecond its slot used, and the next process to
+# claim the slot starts after it. Written as
+# text they are 13 Crockford base32 characters, which sort in the same
+# order as the numbers.
+
+EPOCH_MS = 1704067200000
+NODE_BITS = 5
+SLOT_BITS = 5
+SEQUENCE_BITS = 12
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SLOT = (1 << SLOT_BITS) - 1
+SEQUENCE_MASK = (1 << SEQUENCE_BITS) - 1
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+WIDTH = 13
+
+
+def encode(value):
+    # fixed width base32 text that sorts like the number
+    chars = []
+    for _ in range(WIDTH):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def decode(text):
+    value = 0
+    for ch in text.upper():
+        value = value * 32 + ALPHABET.index(ch)
+    return value
+
+
+def id_time(value):
+    # UTC time an ID was made
+    ms = (value >> (NODE_BITS + SLOT_BITS + SEQUENCE_BITS)) + EPOCH_MS
+    return datetime.datetime.fromtimestamp(ms / 1000, datetime.timezone.utc)
+
+
+def _claim_slot(lock_dir):
+    # first slot no other process on this host holds; returns
+    # (slot, fd, last millisecond the slot used)
+    if fcntl is None:
+        return os.getpid() & MAX_SLOT, None, 0
+    os.makedirs(lock_dir, exist_ok=True)
+    for slot in range(MAX_SLOT + 1):
+        fd = os.open(os.path.join(lock_dir, f"slot-{slot:02d}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            continue
+        return slot, fd, int.from_bytes(os.pread(fd, 8, 0), "big")
+    raise RuntimeError(f"All {MAX_SLOT + 1} ID slots in {lock_dir} are in use.")
+
+
+class IdGenerator:
+    # thread safe; claims its process slot on first use
+
+    def __init__(self, node=0, lock_dir=None):
+        if not 0 <= node <= MAX_NODE:
+            raise ValueError(f"id_node must be between 0 and {MAX_NODE}.")
+        self.node = node
+        self.lock_dir = lock_dir or os.path.join(tempfile.gettempdir(), "ams_ids")
+        self._lock = threading.Lock()
+        self._slot = None
+        self._fd = None
+        self._last = 0
+        self._sequence = 0
+
+    def _release(self):
+        # gives the slot back; the next ID claims one again
+        if self._fd is not None:
+            os.close(self._fd)
+        self._slot = None
+        self._fd = None
+
+    def close(self):
+        with self._lock:
+            self._release()
+
+    def next(self):
+        now = int(time.time() * 1000) - EPOCH_MS
+        with self._lock:
+            if self._slot is None:
+                self._slot, self._fd, self._last = _claim_slot(self.lock_dir)
+                # the next ID goes past everything the slot gave out
+                self._sequence = SEQUENCE_MASK
+            if now > self._last:
+                self._last = now
+                self._sequence = 0
+            else:
+                self._sequence = (self._sequence + 1) & SEQUENCE_MASK
+                if self._sequence == 0:
+                    self._last += 1
+            if self._sequence == 0 and self._fd is not None:
+                os.pwrite(self._fd, self._last.to_bytes(8, "big"), 0)
+            return ((self._last << (NODE_BITS + SLOT_BITS + SEQUENCE_BITS))
+                    | (self.node << (SLOT_BITS + SEQUENCE_BITS))
+                    | (self._slot << SEQUENCE_BITS)
+                    | self._sequence)
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def _after_fork():
+    # a forked child shares the parent's slot lock; it drops its copy and
+    # claims a slot of its own on first use
+    global _generator_lock
+    _generator_lock = threading.Lock()
+    if _generator is not None:
+        _generator._lock = threading.Lock()
+        _generator._release()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_id_generator():
+    # process-wide generator for the configured node
+    global _generator
+    with _generator_lock:
+        if _generator is None:
+            _generator = IdGenerator(get_setting("id_node", 0, int),
+                                     get_setting("id_lock_dir", None))
+        return _generator
+
+
+def new_id():
+    return get_id_generator().next()
+
+
+def new_receipt_id():
+    # "RCPT" and 13 base32 characters, e.g. RCPT01J9Z3K8W4M00
+    return "RCPT" + encode(new_id())
+
+
+if __name__ == "__main__":
+    # python ids.py [count]: prints new IDs with the time they carry
+    import sys
+    for _ in range(int(sys.argv[1]) if len(sys.argv) > 1 else 1):
+        value = new_id()
+        print(encode(value), value, id_time(value).isoformat())
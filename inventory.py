@@ -0,0 +1,112 @@
+from utils import get_flight_store
+
+# Seat inventory lives in the flights table. Every function takes the
+# caller's cursor so seat changes commit or roll back together with the
+# booking rows they belong to. The flight file keeps a copy of the seat
+# count for listings; mirror_seats() refreshes it after a commit. With
+# flights_format=sql the flight store is this table and keeps no copy.
+
+
+def sync_flight(cur, flight):
+    # insert or overwrite one flight row from [id, source, destination, price, seats]
+    cur.execute("""
+        INSERT INTO flights (id, source, destination, price, seats)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            source=VALUES(source), destination=VALUES(destination),
+            price=VALUES(price), seats=VALUES(seats)
+    """, (flight[0].upper(), flight[1], flight[2], float(flight[3]), int(flight[4])))
+
+
+def update_schedule(cur, flight):
+    # route and price from [id, source, destination, price, seats]; the
+    # seat count is left to the table, where bookings may have changed it
+    # since the flight file was written. Returns the seats in the table.
+    ensure_flight(cur, flight)
+    cur.execute(
+        "UPDATE flights SET source=%s, destination=%s, price=%s WHERE id=%s",
+        (flight[1], flight[2], float(flight[3]), flight[0].upper())
+    )
+    return get_seats(cur, flight[0])
+
+
+def ensure_flight(cur, flight):
+    # add the flight if the table does not know it yet; keeps existing seats
+    cur.execute("""
+        INSERT IGNORE INTO flights (id, source, destination, price, seats)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (flight[0].upper(), flight[1], flight[2], float(flight[3]), int(flight[4])))
+
+
+def delete_flight(cur, flight_id):
+    cur.execute("DELETE FROM flights WHERE id=%s", (flight_id.upper(),))
+
+
+def get_seats(cur, flight_id, lock=False):
+    # current seat count, or None if the flight is unknown
+    sql = "SELECT seats FROM flights WHERE id=%s"
+    if lock:
+        sql += " FOR UPDATE"
+    cur.execute(sql, (flight_id.upper(),))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def reserve_seats(cur, flight_id, num):
+    # takes num seats only if that many are left; True on success
+    cur.execute(
+        "UPDATE flights SET seats = seats - %s WHERE id = %s AND seats >= %s",
+        (num, flight_id.upper(), num)
+    )
+    return cur.rowcount == 1
+
+
+def release_seats(cur, flight_id, num):
+    # gives num seats back; False if the flight no longer exists
+    cur.execute(
+        "UPDATE flights SET seats = seats + %s WHERE id = %s",
+        (num, flight_id.upper())
+    )
+    return cur.rowcount == 1
+
+
+def lock_flights(cur, flight_ids):
+    # locks the given flights for this transaction; returns
+    # {id: [id, source, destination, price, seats]} for those that exist
+    ids = sorted({fid.upper() for fid in flight_ids})
+    if not ids:
+        return {}
+    marks = ", ".join(["%s"] * len(ids))
+    cur.execute(
+        f"SELECT id, source, destination, price, seats FROM flights "
+        f"WHERE id IN ({marks}) FOR UPDATE", ids
+    )
+    return {r[0]: [r[0], r[1], r[2], float(r[3]), int(r[4])] for r in cur.fetchall()}
+
+
+def set_many_seats(cur, seats_by_id):
+    # one UPDATE for several flights; rows should be locked by lock_flights
+    if not seats_by_id:
+        return
+    ids = list(seats_by_id)
+    cases = " ".join(["WHEN %s THEN %s"] * len(ids))
+    params = []
+    for fid in ids:
+        params += [fid, seats_by_id[fid]]
+    marks = ", ".join(["%s"] * len(ids))
+    cur.execute(
+        f"UPDATE flights SET seats = CASE id {cases} END WHERE id IN ({marks})",
+        params + ids
+    )
+
+
+def mirror_seats(flight_id, seats):
+    # copy a committed seat count into the flight file
+    if seats is not None:
+        get_flight_store().record_seats({flight_id: seats})
+
+
+def mirror_many_seats(seats_by_id):
+    # copy several committed seat counts into the flight file at once
+    if seats_by_id:
+        get_flight_store().record_seats(seats_by_id)
@@ -1,22 +1,9 @@
 import time
-from db_connection import get_connection
+from services import auth
+from services.errors import AuthenticationError, NotFound, ServiceError
 from user_module import user_menu
 from admin_module import admin_menu
 
-# Check if the email has an @ and a dot in the right place
-def is_valid_email(email):
-    if email.count("@") != 1:
-        return False
-    parts = email.split("@")
-    if not parts[0] or not parts[1]:
-        return False
-    if "." not in parts[1]:
-        return False
-    domain_parts = parts[1].split(".")
-    if not domain_parts[0] or len(domain_parts[-1]) < 2:
-        return False
-    return True
-
 # The first menu shown when the program starts
 def show_login_menu():
     while True:
@@ -49,17 +36,24 @@ def user_submenu():
         if ch == "1":
             register_user(auto_login=True)
         elif ch == "2":
-            username = user_login()
-            if username:
-                user_menu(username)
+            session = user_login()
+            if session:
+                user_menu(session)
         elif ch == "3":
             break
 
+def _database_ready():
+    # prints why and returns False if the database cannot be reached
+    try:
+        auth.check_database()
+        return True
+    except ServiceError as err:
+        print(err)
+        return False
+
 # Admin login section
 def admin_login():
-    con = get_connection()
-    if not con: return
-    cur = con.cursor()
+    if not _database_ready(): return
 
     while True:
         u = input("Admin username (or 'cancel'): ").strip()
@@ -67,44 +61,49 @@ def admin_login():
             print("Username cannot be empty.")
             continue
         if u.lower() == 'cancel':
-            cur.close(); con.close(); return
+            return
         
         # Check if admin exists before asking for password
-        cur.execute("SELECT password FROM admin WHERE username=%s", (u,))
-        row = cur.fetchone()
-        if not row:
-            print("Admin name not found.")
-            continue
+        try:
+            if not auth.admin_exists(u):
+                print("Admin name not found.")
+                continue
+        except ServiceError as err:
+            print(err)
+            return
         
         # User exists, now ask for password
         while True:
             p = input("Password (or 'cancel'): ").strip()
             if p.lower() == 'cancel':
-                cur.close(); con.close(); return
+                return
             
-            if p == row[0]:
-                print(f"Welcome back, {u}!")
-                cur.close(); con.close()
-                admin_menu()
+            try:
+                auth.authenticate_admin(u, p)
+            except AuthenticationError as err:
+                print(err)
+                continue
+            except ServiceError as err:
+                print(err)
                 return
-            else:
-                print("Wrong password.")
+            print(f"Welcome back, {u}!")
+            admin_menu()
+            return
 
 # Create a new user account
 def register_user(auto_login=False):
-    con = get_connection()
-    if not con: return
-    cur = con.cursor()
+    if not _database_ready(): return
 
     # Get a new username
     while True:
         uname = input("Choose Username (or 'cancel'): ").strip()
         if not uname: continue
         if uname.lower() == 'cancel':
-            cur.close(); con.close(); return
-        cur.execute("SELECT id FROM users WHERE username=%s", (uname,))
-        if cur.fetchone():
-            print("That name is taken.")
+            return
+        try:
+            auth.check_username(uname)
+        except ServiceError as err:
+            print(err)
             continue
         break
 
@@ -112,13 +111,11 @@ def register_user(auto_login=False):
     while True:
         email = input("Enter Email (sample@domain.com) or 'cancel': ").strip()
         if email.lower() == 'cancel':
-            cur.close(); con.close(); return
-        if not is_valid_email(email):
-            print("Email format is wrong.")
-            continue
-        cur.execute("SELECT id FROM users WHERE email=%s", (email,))
-        if cur.fetchone():
-            print("Email is already used.")
+            return
+        try:
+            auth.check_email(email)
+        except ServiceError as err:
+            print(err)
             continue
         break
 
@@ -127,50 +124,56 @@ def register_user(auto_login=False):
         pwd = input("Choose Password (or 'cancel'): ").strip()
         if not pwd: continue
         if pwd.lower() == 'cancel':
-            cur.close(); con.close(); return
+            return
         break
 
     # Save to database
-    cur.execute("INSERT INTO users (username, email, password) VALUES (%s, %s, %s)", (uname, email, pwd))
-    con.commit()
-    cur.close(); con.close()
+    try:
+        session = auth.register_user(uname, email, pwd)
+    except ServiceError as err:
+        print(err)
+        time.sleep(1)
+        return
     
     print("Account created!")
     print(f"Welcome, {uname}!") # Greeting for new user
     time.sleep(1)
     
     if auto_login: 
-        user_menu(uname)
+        user_menu(session)
 
 # Login for existing users
 def user_login():
-    con = get_connection()
-    if not con: return
-    cur = con.cursor()
+    if not _database_ready(): return
 
     while True:
         identifier = input("Username/Email (or 'cancel'): ").strip()
         if not identifier: continue
         if identifier.lower() == "cancel":
-            cur.close(); con.close(); return None
+            return None
 
         # Check user exists first
-        cur.execute("SELECT username, password FROM users WHERE username=%s OR email=%s", (identifier, identifier))
-        row = cur.fetchone()
-        if not row:
-            print("User not found.")
-            continue
+        try:
+            auth.find_user(identifier)
+        except ServiceError as err:
+            print(err)
+            if isinstance(err, NotFound):
+                continue
+            return None
         
         # User found, check password
-        actual_name, stored_pwd = row
         while True:
             pwd = input("Enter Password (or 'cancel'): ").strip()
             if pwd.lower() == "cancel":
-                cur.close(); con.close(); return None
+                return None
             
-            if pwd == stored_pwd:
-                print(f"Welcome back, {actual_name}!") # Greeting for returning user
-                cur.close(); con.close()
-                return actual_name
-            else:
-                print("Incorrect password.")
\ No newline at end of file
+            try:
+                session = auth.login(identifier, pwd)
+            except AuthenticationError as err:
+                print(err)
+                continue
+            except ServiceError as err:
+                print(err)
+                return None
+            print(f"Welcome back, {session.username}!") # Greeting for returning user
+            return session
@@ -1,4 +1,5 @@
-from db_connection import initialize_database
+import atexit
+from db_connection import initialize_database, close_pools
 from utils import ensure_file_exists
 from login import show_login_menu
 
@@ -7,6 +8,7 @@ print("=======================================")
 print("      Airport Management System")
 print("=======================================")
 
+atexit.register(close_pools)  # Close pooled connections on exit
 initialize_database()   # Create DB and tables if missing
 ensure_file_exists()    # Ensure flights CSV exists with headers
 show_login_menu()       # Enter main interactive menu
\ No newline at end of file
@@ -0,0 +1,193 @@
+import atexit
+import bisect
+import functools
+import os
+import threading
+import time
+from config import get_setting
+
+# In-process counters and histograms, exported in the Prometheus text
+# format. Off unless metrics=on in db_config.txt; when off every call
+# returns after one flag check. When on, the metrics are written to
+# metrics_file at exit and on dump(), and the API serves them at /metrics.
+
+PREFIX = "ams_"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_enabled = None  # decided on first use
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_help = {}
+
+
+def enabled():
+    global _enabled
+    if _enabled is None:
+        _enabled = get_setting("metrics", "off").lower() in ("on", "1", "true", "yes")
+        if _enabled:
+            atexit.register(dump)
+    return _enabled
+
+
+def enable(on=True):
+    # overrides the setting, e.g. for benchmarks
+    global _enabled
+    if on and _enabled is None:
+        atexit.register(dump)
+    _enabled = on
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def count(name, value=1, **labels):
+    # adds to a counter
+    if not enabled():
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, seconds, **labels):
+    # records one duration in a histogram
+    if not enabled():
+        return
+    key = _key(name, labels)
+    slot = bisect.bisect_left(BUCKETS, seconds)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        h[slot] += 1
+        h[-1] += seconds
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class _NoTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+def timer(name, **labels):
+    # with timer("flights_load_seconds"): ...
+    if not enabled():
+        return _NO_TIMER
+    return _Timer(name, labels)
+
+
+def timed(name, **labels):
+    # decorator form of timer()
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not enabled():
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter() - start, **labels)
+        return inner
+    return wrap
+
+
+def describe(name, text):
+    # HELP line for a metric
+    _help[name] = text
+
+
+def _labels(pairs, extra=None):
+    items = list(pairs) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                    for k, v in items)
+    return "{" + body + "}"
+
+
+def render():
+    # all metrics in the Prometheus text exposition format
+    with _lock:
+        counters = dict(_counters)
+        histograms = {k: list(v) for k, v in _histograms.items()}
+    lines = []
+    seen = set()
+    for (name, pairs), value in sorted(counters.items()):
+        full = PREFIX + name
+        if full not in seen:
+            seen.add(full)
+            if name in _help:
+                lines.append(f"# HELP {full} {_help[name]}")
+            lines.append(f"# TYPE {full} counter")
+        lines.append(f"{full}{_labels(pairs)} {value}")
+    for (name, pairs), h in sorted(histograms.items()):
+        full = PREFIX + name
+        if full not in seen:
+            seen.add(full)
+            if name in _help:
+                lines.append(f"# HELP {full} {_help[name]}")
+            lines.append(f"# TYPE {full} histogram")
+        cumulative = 0
+        for bound, n in zip(BUCKETS, h):
+            cumulative += n
+            lines.append(f"{full}_bucket{_labels(pairs, ('le', bound))} {cumulative}")
+        cumulative += h[len(BUCKETS)]
+        lines.append(f"{full}_bucket{_labels(pairs, ('le', '+Inf'))} {cumulative}")
+        lines.append(f"{full}_sum{_labels(pairs)} {h[-1]:.6f}")
+        lines.append(f"{full}_count{_labels(pairs)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path=None):
+    # writes render() to metrics_file (atomically); returns the path
+    if not _enabled:
+        return None
+    path = path or get_setting("metrics_file", "metrics.prom")
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(render())
+    os.replace(tmp, path)
+    return path
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+describe("db_connections_opened_total", "New database connections opened by the pool.")
+describe("db_query_seconds", "Database statement time by operation and table.")
+describe("db_rows_fetched_total", "Rows read from database cursors.")
+describe("flights_file_seconds", "Flight file reads and writes.")
+describe("flights_file_bytes_written_total", "Bytes written to the flight file.")
+describe("receipts_written_total", "Receipts written by the background writer.")
+describe("receipts_bytes_written_total", "Receipt bytes written.")
+describe("receipt_write_seconds", "Time to write one batch of receipts.")
+describe("operation_seconds", "Service operation time.")
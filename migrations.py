@@ -0,0 +1,448 @@
+import sys
+from config import get_setting
+
+# Each migration is (version, description, function taking a cursor).
+# Applied versions are recorded in schema_version; never edit a shipped
+# migration, add a new one instead.
+
+
+def _index_exists(cur, table, name):
+    if get_setting("db_backend", "mysql") == "sqlite":
+        cur.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+            (table, name)
+        )
+        return cur.fetchone() is not None
+    cur.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    """, (table, name))
+    return cur.fetchone() is not None
+
+
+def _add_index(cur, table, name, columns):
+    # mysql has no CREATE INDEX IF NOT EXISTS
+    if not _index_exists(cur, table, name):
+        cur.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+
+
+def _column_exists(cur, table, name):
+    if get_setting("db_backend", "mysql") == "sqlite":
+        cur.execute(f"PRAGMA table_info({table})")
+        return any(row[1] == name for row in cur.fetchall())
+    cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+    """, (table, name))
+    return cur.fetchone() is not None
+
+
+def _add_column(cur, table, name, definition):
+    # mysql has no ADD COLUMN IF NOT EXISTS
+    if not _column_exists(cur, table, name):
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+def _create_tables(cur):
+    # original tables; IF NOT EXISTS keeps it safe on pre-migration installs
+
+    # admin table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS admin (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(50) UNIQUE NOT NULL,
+        password VARCHAR(255) NOT NULL
+    )
+    """)
+
+    # users table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS users (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        username VARCHAR(50) UNIQUE NOT NULL,
+        email VARCHAR(100) UNIQUE NOT NULL,
+        password VARCHAR(255) NOT NULL
+    )
+    """)
+
+    # bookings table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS bookings (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT,
+        flight_id VARCHAR(50),
+        receipt_id VARCHAR(50),
+        seats_booked INT DEFAULT 1,
+        booking_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """)
+
+    # feedback table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS feedback (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id INT,
+        message TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id)
+    )
+    """)
+
+    # cancelled bookings table
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS cancelled_bookings (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        booking_id INT,
+        username VARCHAR(50),
+        flight_id VARCHAR(50),
+        seats_booked INT,
+        total_amount DECIMAL(10,2),
+        amount_refunded DECIMAL(10,2),
+        booking_date DATETIME,
+        cancellation_date DATETIME,
+        reason TEXT
+    )
+    """)
+
+    # create default admin if not present
+    cur.execute("SELECT COUNT(*) FROM admin")
+    if cur.fetchone()[0] == 0:
+        cur.execute(
+            "INSERT INTO admin (username, password) VALUES (%s, %s)",
+            ("admin", "admin123")
+        )
+        print("Default admin created.")
+
+
+def _add_listing_indexes(cur):
+    # user bookings: WHERE user_id=%s ORDER BY booking_date DESC
+    # (also covers the user_id foreign key)
+    _add_index(cur, "bookings", "idx_bookings_user_date", "user_id, booking_date")
+    # admin booking list: ORDER BY booking_date DESC
+    _add_index(cur, "bookings", "idx_bookings_date", "booking_date")
+    _add_index(cur, "cancelled_bookings", "idx_cancelled_date", "cancellation_date")
+    _add_index(cur, "feedback", "idx_feedback_created", "created_at")
+    # users.username and users.email are already UNIQUE; logins look up
+    # one or the other, never both in one query
+
+
+def _create_flights_table(cur):
+    # seat inventory moves into the database; seeded from the flight file
+    from utils import get_flight_store
+
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS flights (
+        id VARCHAR(50) PRIMARY KEY,
+        source VARCHAR(100) NOT NULL,
+        destination VARCHAR(100) NOT NULL,
+        price DECIMAL(10,2) NOT NULL,
+        seats INT NOT NULL,
+        CHECK (seats >= 0)
+    )
+    """)
+    store = get_flight_store()
+    if store.holds_inventory:
+        # flights_format=sql: the table is the schedule, there is no file
+        return
+    rows = []
+    for f in store.all():
+        try:
+            rows.append((f[0].upper(), f[1], f[2], float(f[3]), int(f[4])))
+        except (ValueError, IndexError):
+            print("Skipping invalid flight row:", f)
+    if rows:
+        cur.executemany("""
+            INSERT IGNORE INTO flights (id, source, destination, price, seats)
+            VALUES (%s, %s, %s, %s, %s)
+        """, rows)
+
+
+def _add_booking_page_indexes(cur):
+    # admin booking pages: keyset on (booking_date, id), optionally by flight.
+    # bookings(booking_date) already carries the primary key id; cancelled
+    # rows are keyed by the original booking_id, so it is listed explicitly
+    _add_index(cur, "bookings", "idx_bookings_flight_date", "flight_id, booking_date")
+    _add_index(cur, "cancelled_bookings", "idx_cancelled_booking_date",
+               "booking_date, booking_id")
+    _add_index(cur, "cancelled_bookings", "idx_cancelled_flight_date",
+               "flight_id, booking_date, booking_id")
+
+
+def _add_booking_fares(cur):
+    # route and fare as they were at booking time, so booking views and
+    # refunds do not depend on the current schedule
+    from utils import get_flight_store
+
+    _add_column(cur, "bookings", "source", "VARCHAR(100)")
+    _add_column(cur, "bookings", "destination", "VARCHAR(100)")
+    _add_column(cur, "bookings", "price_per_seat", "DECIMAL(10,2)")
+    _add_column(cur, "bookings", "total_amount", "DECIMAL(10,2)")
+
+    # backfill from today's schedule, the best record left of older fares:
+    # the flights table first, then the flight file for flights it lacks
+    cur.execute("""
+        UPDATE bookings SET
+            source = (SELECT f.source FROM flights f WHERE f.id = bookings.flight_id),
+            destination = (SELECT f.destination FROM flights f WHERE f.id = bookings.flight_id),
+            price_per_seat = (SELECT f.price FROM flights f WHERE f.id = bookings.flight_id)
+        WHERE price_per_seat IS NULL
+    """)
+    cur.execute("SELECT DISTINCT flight_id FROM bookings WHERE price_per_seat IS NULL")
+    missing = [r[0] for r in cur.fetchall() if r[0]]
+    store = get_flight_store()
+    if missing and not store.holds_inventory:
+        found = store.get_many(missing)
+        rows = []
+        for fid in missing:
+            f = found.get(fid.upper())
+            try:
+                rows.append((f[1], f[2], float(f[3]), fid))
+            except (TypeError, ValueError, IndexError):
+                continue
+        if rows:
+            cur.executemany("""
+                UPDATE bookings SET source=%s, destination=%s, price_per_seat=%s
+                WHERE flight_id=%s AND price_per_seat IS NULL
+            """, rows)
+    cur.execute("""
+        UPDATE bookings SET total_amount = price_per_seat * seats_booked
+        WHERE total_amount IS NULL AND price_per_seat IS NOT NULL
+    """)
+
+
+def _add_sales_summaries(cur):
+    # running sales totals per flight, route and day (sales_summary.py),
+    # and the route on cancelled bookings so a rebuild can place them
+    from utils import get_flight_store
+    from sales_summary import rebuild
+
+    _add_column(cur, "cancelled_bookings", "source", "VARCHAR(100)")
+    _add_column(cur, "cancelled_bookings", "destination", "VARCHAR(100)")
+    cur.execute("""
+        UPDATE cancelled_bookings SET
+            source = (SELECT f.source FROM flights f WHERE f.id = cancelled_bookings.flight_id),
+            destination = (SELECT f.destination FROM flights f
+                           WHERE f.id = cancelled_bookings.flight_id)
+        WHERE source IS NULL
+    """)
+    cur.execute("SELECT DISTINCT flight_id FROM cancelled_bookings WHERE source IS NULL")
+    missing = [r[0] for r in cur.fetchall() if r[0]]
+    store = get_flight_store()
+    if missing and not store.holds_inventory:
+        found = store.get_many(missing)
+        rows = [(found[fid.upper()][1], found[fid.upper()][2], fid)
+                for fid in missing if fid.upper() in found]
+        if rows:
+            cur.executemany("""
+                UPDATE cancelled_bookings SET source=%s, destination=%s
+                WHERE flight_id=%s AND source IS NULL
+            """, rows)
+
+    totals = """
+        bookings INT NOT NULL DEFAULT 0,
+        seats_sold INT NOT NULL DEFAULT 0,
+        gross DECIMAL(14,2) NOT NULL DEFAULT 0,
+        cancellations INT NOT NULL DEFAULT 0,
+        seats_cancelled INT NOT NULL DEFAULT 0,
+        refunds DECIMAL(14,2) NOT NULL DEFAULT 0
+    """
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS sales_by_flight (
+        flight_id VARCHAR(50) PRIMARY KEY,
+        {totals}
+    )
+    """)
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS sales_by_route (
+        source VARCHAR(100) NOT NULL,
+        destination VARCHAR(100) NOT NULL,
+        {totals},
+        PRIMARY KEY (source, destination)
+    )
+    """)
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS sales_by_day (
+        day DATE PRIMARY KEY,
+        {totals}
+    )
+    """)
+    rebuild(cur, ("sales_by_flight", "sales_by_route", "sales_by_day"))
+
+
+def _create_export_watermarks(cur):
+    # last id each incremental export has written (exports.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS export_watermarks (
+        name VARCHAR(100) PRIMARY KEY,
+        last_id BIGINT NOT NULL,
+        exported_at DATETIME NOT NULL
+    )
+    """)
+
+
+def _add_feedback_search(cur):
+    # full-text index on feedback messages (feedback_search.py)
+    from feedback_search import create_index
+
+    create_index(cur)
+
+
+def _add_daily_sales_summaries(cur):
+    # sales per flight and per route on each day (sales_summary.py), and
+    # the route index the route report sums seats left through
+    from sales_summary import rebuild
+
+    totals = """
+        bookings INT NOT NULL DEFAULT 0,
+        seats_sold INT NOT NULL DEFAULT 0,
+        gross DECIMAL(14,2) NOT NULL DEFAULT 0,
+        cancellations INT NOT NULL DEFAULT 0,
+        seats_cancelled INT NOT NULL DEFAULT 0,
+        refunds DECIMAL(14,2) NOT NULL DEFAULT 0
+    """
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS sales_by_day_flight (
+        day DATE NOT NULL,
+        flight_id VARCHAR(50) NOT NULL,
+        {totals},
+        PRIMARY KEY (day, flight_id)
+    )
+    """)
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS sales_by_day_route (
+        day DATE NOT NULL,
+        source VARCHAR(100) NOT NULL,
+        destination VARCHAR(100) NOT NULL,
+        {totals},
+        PRIMARY KEY (day, source, destination)
+    )
+    """)
+    _add_index(cur, "flights", "idx_flights_route", "source, destination")
+    rebuild(cur, ("sales_by_day_flight", "sales_by_day_route"))
+
+
+MIGRATIONS = [
+    (1, "initial schema", _create_tables),
+    (2, "indexes for booking, cancellation and feedback listings", _add_listing_indexes),
+    (3, "flights table for seat inventory", _create_flights_table),
+    (4, "indexes for paged admin booking view", _add_booking_page_indexes),
+    (5, "route and fare snapshot on bookings", _add_booking_fares),
+    (6, "sales summaries per flight, route and day", _add_sales_summaries),
+    (7, "watermarks for incremental exports", _create_export_watermarks),
+    (8, "full-text search on feedback", _add_feedback_search),
+    (9, "sales summaries per flight and route on each day", _add_daily_sales_summaries),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# queries that must not full-scan their table; (table, sql, params)
+HOT_QUERIES = [
+    ("bookings",
+     "SELECT id, flight_id, source, destination, seats_booked, price_per_seat, "
+     "total_amount, booking_date, receipt_id "
+     "FROM bookings WHERE user_id=%s ORDER BY booking_date DESC", (1,)),
+    ("bookings",
+     "SELECT id, user_id, flight_id, seats_booked, booking_date "
+     "FROM bookings ORDER BY booking_date DESC LIMIT 50", ()),
+    ("cancelled_bookings",
+     "SELECT booking_id, username, flight_id FROM cancelled_bookings "
+     "ORDER BY cancellation_date DESC LIMIT 50", ()),
+    ("bookings",
+     "SELECT id, flight_id, booking_date FROM bookings "
+     "WHERE booking_date < %s OR (booking_date = %s AND id < %s) "
+     "ORDER BY booking_date DESC, id DESC LIMIT 21",
+     ("2030-01-01", "2030-01-01", 1)),
+    ("cancelled_bookings",
+     "SELECT booking_id, flight_id, booking_date FROM cancelled_bookings "
+     "WHERE flight_id = %s ORDER BY booking_date DESC, booking_id DESC LIMIT 21",
+     ("AI101",)),
+    ("feedback",
+     "SELECT id, user_id, message, created_at FROM feedback "
+     "ORDER BY created_at DESC LIMIT 50", ()),
+    ("feedback",
+     "SELECT id FROM feedback WHERE MATCH(message) AGAINST (%s IN BOOLEAN MODE)", ("+delay",)),
+    ("sales_by_day_flight",
+     "SELECT flight_id, bookings, seats_sold, gross FROM sales_by_day_flight "
+     "WHERE day = %s ORDER BY flight_id LIMIT 101", ("2030-01-01",)),
+    ("flights",
+     "SELECT SUM(seats) FROM flights WHERE source=%s AND destination=%s", ("Mumbai", "Delhi")),
+    ("users",
+     "SELECT id, username, email, password FROM users WHERE username=%s", ("admin",)),
+    ("users",
+     "SELECT id, username, email, password FROM users WHERE email=%s", ("admin@example.com",)),
+]
+
+
+def current_version(cur):
+    # highest applied version, or 0 if schema_version is missing or empty
+    try:
+        cur.execute("SELECT MAX(version) FROM schema_version")
+        row = cur.fetchone()
+    except Exception:
+        return 0
+    return (row[0] or 0) if row else 0
+
+
+def migrate(con):
+    # applies pending migrations in order; returns the resulting version
+    cur = con.cursor()
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    version = current_version(cur)
+
+    for number, description, apply in MIGRATIONS:
+        if number <= version:
+            continue
+        apply(cur)
+        cur.execute(
+            "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+            (number, description)
+        )
+        con.commit()
+        print(f"Applied migration {number}: {description}")
+        version = number
+
+    cur.close()
+    return version
+
+
+def full_scans(con):
+    # runs EXPLAIN on HOT_QUERIES; returns the ones that scan a whole table
+    cur = con.cursor(dictionary=True)
+    offenders = []
+    for table, sql, params in HOT_QUERIES:
+        cur.execute("EXPLAIN " + sql, params)
+        for row in cur.fetchall():
+            if row["table"] == table and row["type"] == "ALL":
+                offenders.append((sql, row))
+    cur.close()
+    return offenders
+
+
+if __name__ == "__main__":
+    # python migrations.py          -> apply pending migrations
+    # python migrations.py explain  -> check hot queries for full scans
+    from db_connection import initialize_database, connection
+
+    initialize_database()
+    with connection() as con:
+        cur = con.cursor()
+        print("Schema version:", current_version(cur))
+        cur.close()
+
+        if len(sys.argv) > 1 and sys.argv[1] == "explain":
+            offenders = full_scans(con)
+            for sql, row in offenders:
+                print("Full scan:", sql)
+                print("   ", row)
+            if offenders:
+                sys.exit(1)
+            print("All hot queries use an index.")
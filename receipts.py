@@ -0,0 +1,324 @@
+import atexit
+import datetime
+import glob
+import os
+import queue
+import struct
+import threading
+import ids
+import metrics
+from config import get_setting
+
+try:
+    import fcntl
+except ImportError:  # Windows: archive writes are not locked across processes
+    fcntl = None
+
+# Receipts are rendered on the caller's thread (so the text, including the
+# cancellation time, is fixed when the sale happens) and written by one
+# background thread. receipt_mode=files keeps the old one-file-per-receipt
+# layout; receipt_mode=archive appends them to daily length-prefixed log
+# files with a small text index for lookup by ID. The console app and the
+# API server can share one archive: appends hold an flock on the day's
+# files, so offsets and index lines never interleave. A lookup by a
+# receipt ID from ids.new_receipt_id reads only the index of the day the
+# ID was made (or a later one); other IDs fall back to every index.
+
+
+def receipt_filename(receipt_id, username, kind="booking"):
+    if kind == "booking":
+        return f"BookingReceipt_{username}_{receipt_id}.txt"
+    return f"CancellationReceipt_{username}_BID{receipt_id}.txt"
+
+
+def render_receipt(receipt_id, username, flight, num_seats=1, kind="booking",
+                   total_cost=None, refunded=0.0, reason=None):
+    # returns the text of a booking or cancellation receipt
+    price_per_seat = float(flight[3]) if flight and len(flight) > 3 else (total_cost or 0.0)
+    total = total_cost if total_cost is not None else (price_per_seat * num_seats)
+
+    lines = [
+        "----------------------------------\n",
+        "     AIRPORT MANAGEMENT SYSTEM\n",
+        "----------------------------------\n",
+    ]
+
+    if kind == "booking":
+        lines.append("            BOOKING RECEIPT\n")
+        lines.append("----------------------------------\n")
+        lines.append(f"Receipt ID   : {receipt_id}\n")
+        lines.append(f"Username     : {username}\n")
+        if flight:
+            lines.append(f"Flight ID    : {flight[0]}\n")
+            lines.append(f"Source       : {flight[1]}\n")
+            lines.append(f"Destination  : {flight[2]}\n")
+            lines.append(f"Price/Seat   : {price_per_seat}\n")
+            lines.append(f"Seats Booked : {num_seats}\n")
+        lines.append(f"Total Cost   : {total}\n")
+    else:
+        lines.append("         CANCELLATION RECEIPT\n")
+        lines.append("----------------------------------\n")
+        lines.append(f"Original Booking ID: {receipt_id}\n")
+        lines.append(f"Username           : {username}\n")
+        if flight:
+            lines.append(f"Flight ID          : {flight[0]}\n")
+            lines.append(f"Source             : {flight[1]}\n")
+            lines.append(f"Destination        : {flight[2]}\n")
+        lines.append(f"Seats Cancelled    : {num_seats}\n")
+        lines.append(f"Original Amount    : {total}\n")
+        lines.append(f"Amount Refunded    : {refunded}\n")
+        lines.append(f"Reason             : {reason or 'No reason provided'}\n")
+        lines.append(
+            f"Cancellation on    : "
+            f"{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+        )
+
+    lines.append("----------------------------------\n")
+    lines.append("Thank you for choosing our service!\n")
+    return "".join(lines)
+
+
+def receipt_key(receipt_id, kind="booking"):
+    # archive lookup key; booking receipt IDs and booking IDs can't collide
+    return f"{kind}:{receipt_id}"
+
+
+def receipt_day(receipt_id):
+    # local date an RCPT... receipt ID was made, or None for other IDs
+    text = str(receipt_id)
+    if not text.startswith("RCPT") or len(text) != 4 + ids.WIDTH:
+        return None
+    try:
+        value = ids.decode(text[4:])
+    except ValueError:
+        return None
+    return ids.id_time(value).astimezone().date()
+
+
+class FileSink:
+    # one text file per receipt, named as before
+
+    def __init__(self, directory="."):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, items):
+        for receipt_id, username, kind, text in items:
+            path = os.path.join(self.directory, receipt_filename(receipt_id, username, kind))
+            with open(path, "w") as f:
+                f.write(text)
+
+    def find(self, receipt_id, kind="booking"):
+        pattern = receipt_filename(receipt_id, "*", kind)
+        for path in glob.glob(os.path.join(glob.escape(self.directory), pattern)):
+            with open(path, "r") as f:
+                return f.read()
+        return None
+
+
+class ArchiveSink:
+    # daily archive files: YYYY-MM-DD.log holds records of
+    # <key length><text length><key><text> (little-endian uint16, uint32),
+    # YYYY-MM-DD.idx holds "key<TAB>offset<TAB>length" lines for each record
+
+    RECORD = struct.Struct("<HI")
+
+    def __init__(self, directory="receipts"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, day):
+        base = os.path.join(self.directory, day)
+        return base + ".log", base + ".idx"
+
+    def write(self, items):
+        log_path, idx_path = self._paths(datetime.date.today().isoformat())
+        records = []
+        for receipt_id, username, kind, text in items:
+            key = receipt_key(receipt_id, kind).encode("utf-8")
+            body = text.encode("utf-8")
+            records.append((key.decode("utf-8"),
+                            self.RECORD.pack(len(key), len(body)) + key + body))
+        with open(log_path, "ab") as log, open(idx_path, "a") as idx:
+            # other processes may append to the same day; the offset is
+            # only known once the end of the log is ours
+            if fcntl:
+                fcntl.flock(log, fcntl.LOCK_EX)
+                fcntl.flock(idx, fcntl.LOCK_EX)
+            offset = log.seek(0, os.SEEK_END)
+            entries = []
+            for key, record in records:
+                entries.append(f"{key}\t{offset}\t{len(record)}\n")
+                offset += len(record)
+            log.write(b"".join(r for _, r in records))
+            log.flush()
+            # the index is written after the data, so every indexed record is complete
+            idx.write("".join(entries))
+            idx.flush()
+
+    def read(self, log_path, offset, length):
+        with open(log_path, "rb") as log:
+            log.seek(offset)
+            record = log.read(length)
+        key_len, text_len = self.RECORD.unpack_from(record)
+        start = self.RECORD.size + key_len
+        return record[start:start + text_len].decode("utf-8")
+
+    def _find_in(self, idx_path, key):
+        # (offset, length) of the last entry for key in one index, or None
+        found = None
+        with open(idx_path, "r") as idx:
+            if fcntl:
+                # no half-written index lines
+                fcntl.flock(idx, fcntl.LOCK_SH)
+            for line in idx:
+                k, offset, length = line.rstrip("\n").split("\t")
+                if k == key:
+                    found = (int(offset), int(length))
+        return found
+
+    def find(self, receipt_id, kind="booking"):
+        # newest day first; the last entry wins if a key was written twice
+        key = receipt_key(receipt_id, kind)
+        paths = sorted(glob.glob(os.path.join(glob.escape(self.directory), "*.idx")),
+                       reverse=True)
+        day = receipt_day(receipt_id)
+        if day is not None:
+            # written no earlier than the ID was made (a day early at most,
+            # should the clock have stepped); the ID's own day goes first
+            made = day.isoformat()
+            first = (day - datetime.timedelta(days=1)).isoformat()
+            paths = [p for p in paths if os.path.basename(p)[:-4] >= first]
+            paths.sort(key=lambda p: os.path.basename(p)[:-4] != made)
+        for idx_path in paths:
+            found = self._find_in(idx_path, key)
+            if found:
+                return self.read(idx_path[:-4] + ".log", *found)
+        return None
+
+
+def make_sink():
+    # sink chosen by the receipt_mode and receipt_dir settings
+    if get_setting("receipt_mode", "files") == "archive":
+        return ArchiveSink(get_setting("receipt_dir", "receipts"))
+    return FileSink(get_setting("receipt_dir", "."))
+
+
+class ReceiptWriter:
+    # background thread draining a bounded queue into a sink; writes are
+    # batched by taking everything already queued at once
+
+    BATCH = 256
+
+    def __init__(self, sink, max_queue=1000):
+        self.sink = sink
+        self._queue = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name="receipt-writer", daemon=True)
+        self._thread.start()
+
+    def _check(self):
+        if not self._thread.is_alive():
+            raise RuntimeError("The receipt writer has stopped.")
+
+    def submit(self, item):
+        # blocks while the queue is full
+        self._check()
+        self._queue.put(item)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            while len(batch) < self.BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            items = [i for i in batch if i is not None]
+            try:
+                if items:
+                    with metrics.timer("receipt_write_seconds"):
+                        self.sink.write(items)
+                    metrics.count("receipts_written_total", len(items))
+                    metrics.count("receipts_bytes_written_total", sum(len(i[3]) for i in items))
+            except Exception as err:
+                # a bad batch is dropped; the thread must keep draining or
+                # every later submit and flush would wait forever
+                print(f"Could not write {len(items)} receipt(s): {err!r}")
+                metrics.count("receipt_write_errors_total")
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                return
+
+    def flush(self):
+        # waits until everything submitted so far is written; raises if
+        # the writer thread is gone and never will
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                self._check()
+                self._queue.all_tasks_done.wait(0.5)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_receipt_writer():
+    # process-wide writer, started on first use and drained at exit
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ReceiptWriter(make_sink(), get_setting("receipt_queue_size", 1000, int))
+            atexit.register(close_receipt_writer)
+        return _writer
+
+
+def close_receipt_writer():
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close()
+
+
+def flush_receipts():
+    if _writer is not None:
+        _writer.flush()
+
+
+def write_receipt(receipt_id, username, flight, num_seats=1, kind="booking",
+                  total_cost=None, refunded=0.0, reason=None):
+    # renders a receipt now and queues it for the writer thread
+    text = render_receipt(receipt_id, username, flight, num_seats, kind,
+                          total_cost, refunded, reason)
+    get_receipt_writer().submit((receipt_id, username, kind, text))
+
+
+def write_receipts(receipts):
+    # queues many receipts; each item is a dict of write_receipt arguments
+    for r in receipts:
+        write_receipt(**r)
+
+
+def find_receipt(receipt_id, kind="booking"):
+    # receipt text by ID from the configured store, or None
+    flush_receipts()
+    return make_sink().find(receipt_id, kind)
+
+
+if __name__ == "__main__":
+    # python receipts.py <receipt id> [booking|cancellation]
+    import sys
+    if len(sys.argv) < 2:
+        print("Usage: python receipts.py <receipt id> [booking|cancellation]")
+        sys.exit(1)
+    text = find_receipt(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else "booking")
+    if text is None:
+        print("Receipt not found.")
+        sys.exit(1)
+    print(text, end="")
@@ -0,0 +1,133 @@
+import sys
+from db_connection import connection
+
+# Running sales totals kept next to the bookings, one row per flight,
+# per route and per day (migration 6), and per flight and per route on
+# each day (migration 9):
+#
+#   bookings, seats_sold, gross          sales, counted when booked
+#   cancellations, seats_cancelled,      cancellations, counted when
+#   refunds                              cancelled
+#
+# Booking and cancellation transactions add their deltas here before
+# they commit, so the totals always match the booking tables and a
+# report reads one row per flight, route or day (or per flight or route
+# for a single day) however long the history is. rebuild() recomputes everything from bookings and
+# cancelled_bookings. Days are the booking date for sales and the
+# cancellation date for cancellations.
+
+TABLES = {
+    "sales_by_flight": ("flight_id",),
+    "sales_by_route": ("source", "destination"),
+    "sales_by_day": ("day",),
+    "sales_by_day_flight": ("day", "flight_id"),
+    "sales_by_day_route": ("day", "source", "destination"),
+}
+COLUMNS = ("bookings", "seats_sold", "gross", "cancellations", "seats_cancelled", "refunds")
+
+
+def _add(totals, table, key, delta):
+    row = totals.setdefault((table, key), [0] * len(COLUMNS))
+    for i, value in enumerate(delta):
+        row[i] += value
+
+
+def _apply(cur, totals):
+    # one upsert per table, rows in key order so concurrent transactions
+    # lock them in the same order
+    for table, keys in TABLES.items():
+        rows = [key + tuple(delta) for (t, key), delta in sorted(totals.items())
+                if t == table]
+        if not rows:
+            continue
+        names = ", ".join(keys + COLUMNS)
+        marks = ", ".join(["%s"] * (len(keys) + len(COLUMNS)))
+        updates = ", ".join(f"{c} = {c} + VALUES({c})" for c in COLUMNS)
+        cur.executemany(
+            f"INSERT INTO {table} ({names}) VALUES ({marks}) ON DUPLICATE KEY UPDATE {updates}",
+            rows
+        )
+
+
+def _record(cur, day, events, delta):
+    totals = {}
+    for flight_id, source, destination, seats, amount in events:
+        d = delta(seats, amount)
+        _add(totals, "sales_by_flight", (flight_id.upper(),), d)
+        _add(totals, "sales_by_day_flight", (day, flight_id.upper()), d)
+        if source is not None:
+            _add(totals, "sales_by_route", (source, destination), d)
+            _add(totals, "sales_by_day_route", (day, source, destination), d)
+        _add(totals, "sales_by_day", (day,), d)
+    _apply(cur, totals)
+
+
+def record_sales(cur, day, sales):
+    # sales: (flight_id, source, destination, seats, total) per booking
+    _record(cur, day, sales, lambda seats, total: (1, seats, float(total or 0), 0, 0, 0))
+
+
+def record_cancellations(cur, day, cancellations):
+    # cancellations: (flight_id, source, destination, seats, refunded)
+    _record(cur, day, cancellations,
+            lambda seats, refunded: (0, 0, 0, 1, seats, float(refunded or 0)))
+
+
+# every sale and cancellation in the booking tables, one row each:
+# (flight_id, source, destination, day, then COLUMNS)
+EVENTS = """
+    SELECT flight_id, source, destination, DATE(booking_date) AS day,
+           1 AS bookings, seats_booked AS seats_sold,
+           COALESCE(total_amount, 0) AS gross, 0 AS cancellations,
+           0 AS seats_cancelled, 0 AS refunds
+    FROM bookings
+    UNION ALL
+    SELECT flight_id, source, destination, DATE(booking_date),
+           1, seats_booked, COALESCE(total_amount, 0), 0, 0, 0
+    FROM cancelled_bookings
+    UNION ALL
+    SELECT flight_id, source, destination, DATE(cancellation_date),
+           0, 0, 0, 1, seats_booked, COALESCE(amount_refunded, 0)
+    FROM cancelled_bookings
+"""
+
+
+def rebuild(cur, tables=None):
+    # recomputes the summary tables (all of them, or the ones named) from
+    # the booking history
+    sums = ", ".join(f"SUM({c})" for c in COLUMNS)
+    for table, keys in TABLES.items():
+        if tables is not None and table not in tables:
+            continue
+        names = ", ".join(keys)
+        known = " AND ".join(f"{k} IS NOT NULL" for k in keys)
+        cur.execute(f"DELETE FROM {table}")
+        cur.execute(f"""
+            INSERT INTO {table} ({names}, {", ".join(COLUMNS)})
+            SELECT {names}, {sums} FROM ({EVENTS}) e
+            WHERE {known}
+            GROUP BY {names}
+        """)
+
+
+def rebuild_summaries():
+    # rebuild in one transaction; returns the number of flights summarized
+    with connection() as con:
+        cur = con.cursor()
+        rebuild(cur)
+        cur.execute("SELECT COUNT(*) FROM sales_by_flight")
+        count = cur.fetchone()[0]
+        con.commit()
+        cur.close()
+    return count
+
+
+if __name__ == "__main__":
+    # python sales_summary.py rebuild
+    from db_connection import initialize_database
+
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("Usage: python sales_summary.py rebuild")
+        sys.exit(1)
+    initialize_database()
+    print(f"Sales summaries rebuilt for {rebuild_summaries()} flights.")
@@ -0,0 +1,3 @@
+# Headless business logic. Functions take plain parameters, return plain
+# values and raise services.errors.ServiceError subclasses; the console
+# menus are thin adapters over them.
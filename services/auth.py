@@ -0,0 +1,188 @@
+import collections
+import threading
+import time
+import metrics
+from config import get_setting
+from db_connection import connection
+from services.errors import (AuthenticationError, Conflict, NotFound,
+                             ValidationError, database_errors)
+
+
+def is_valid_email(email):
+    # check if the email has an @ and a dot in the right place
+    if email.count("@") != 1:
+        return False
+    parts = email.split("@")
+    if not parts[0] or not parts[1]:
+        return False
+    if "." not in parts[1]:
+        return False
+    domain_parts = parts[1].split(".")
+    if not domain_parts[0] or len(domain_parts[-1]) < 2:
+        return False
+    return True
+
+
+def _fetch_one(sql, params):
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        cur.execute(sql, params)
+        row = cur.fetchone()
+        cur.close()
+    return row
+
+
+def check_database():
+    # raises Unavailable if no connection can be made
+    with database_errors(), connection():
+        pass
+
+
+def admin_exists(username):
+    return _fetch_one("SELECT 1 FROM admin WHERE username=%s", (username,)) is not None
+
+
+@metrics.timed("operation_seconds", op="authenticate_admin")
+def authenticate_admin(username, password):
+    # raises NotFound or AuthenticationError; returns the username
+    row = _fetch_one("SELECT password FROM admin WHERE username=%s", (username,))
+    if not row:
+        raise NotFound("Admin name not found.")
+    if password != row[0]:
+        raise AuthenticationError("Wrong password.")
+    return username
+
+
+class Session:
+    # the logged-in user, created at login and passed to every user action
+
+    __slots__ = ("id", "username", "email")
+
+    def __init__(self, user_id, username, email):
+        self.id = user_id
+        self.username = username
+        self.email = email
+
+    def __repr__(self):
+        return f"Session({self.id}, {self.username!r}, {self.email!r})"
+
+
+class UserCache:
+    # small LRU of sessions by username and by email; entries expire after
+    # ttl seconds so changes made outside this process are picked up
+
+    def __init__(self, size=256, ttl=60.0):
+        self.size = size
+        self.ttl = ttl
+        self._items = collections.OrderedDict()  # key -> (session, expires)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if item[1] < time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, session):
+        expires = time.monotonic() + self.ttl
+        with self._lock:
+            for key in (session.username, session.email):
+                self._items[key] = (session, expires)
+                self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def user_cache():
+    # process-wide cache, created on first use
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = UserCache(get_setting("user_cache_size", 256, int),
+                               get_setting("user_cache_ttl", 60, float))
+        return _cache
+
+
+def _lookup(identifier):
+    # (id, username, email, password) by email if it looks like one, else
+    # by username; each is a unique-index lookup. Usernames may contain @,
+    # so those fall back to the username index.
+    columns = "SELECT id, username, email, password FROM users WHERE "
+    if "@" in identifier:
+        row = _fetch_one(columns + "email=%s", (identifier,))
+        if row:
+            return row
+    return _fetch_one(columns + "username=%s", (identifier,))
+
+
+def find_user(identifier):
+    # Session for a username or email, from the cache when possible
+    session = user_cache().get(identifier)
+    if session is None:
+        row = _lookup(identifier)
+        if not row:
+            raise NotFound("User not found.")
+        session = Session(row[0], row[1], row[2])
+        user_cache().put(session)
+    return session
+
+
+@metrics.timed("operation_seconds", op="login")
+def login(identifier, password):
+    # Session for a username or email and password
+    row = _lookup(identifier)
+    if not row:
+        raise NotFound("User not found.")
+    if password != row[3]:
+        raise AuthenticationError("Incorrect password.")
+    session = Session(row[0], row[1], row[2])
+    user_cache().put(session)
+    return session
+
+
+def check_username(username):
+    # raises if the username cannot be registered
+    if not username:
+        raise ValidationError("Username cannot be empty.")
+    if _fetch_one("SELECT id FROM users WHERE username=%s", (username,)):
+        raise Conflict("That name is taken.")
+
+
+def check_email(email):
+    # raises if the email cannot be registered
+    if not is_valid_email(email):
+        raise ValidationError("Email format is wrong.")
+    if _fetch_one("SELECT id FROM users WHERE email=%s", (email,)):
+        raise Conflict("Email is already used.")
+
+
+@metrics.timed("operation_seconds", op="register_user")
+def register_user(username, email, password):
+    # creates a user account; returns its Session
+    check_username(username)
+    check_email(email)
+    if not password:
+        raise ValidationError("Password cannot be empty.")
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        cur.execute(
+            "INSERT INTO users (username, email, password) VALUES (%s, %s, %s)",
+            (username, email, password)
+        )
+        user_id = cur.lastrowid
+        con.commit()
+        cur.close()
+    return Session(user_id, username, email)
@@ -0,0 +1,455 @@
+import datetime
+import mysql.connector
+from config import get_setting
+import metrics
+from ids import new_receipt_id
+from db_connection import connection
+from feedback_search import index_feedback
+from inventory import (get_seats, reserve_seats, release_seats, ensure_flight,
+                       lock_flights, set_many_seats, mirror_seats, mirror_many_seats)
+from receipts import write_receipt, write_receipts
+from sales_summary import record_sales, record_cancellations
+from services.errors import Conflict, InsufficientSeats, NotFound, ValidationError, database_errors
+from services.inventory import find_flight
+from utils import format_price, get_flight
+
+# Booking, cancellation and feedback. Seats are taken and given back in the
+# same transaction as the booking rows; the flight file and the receipt
+# are updated after the commit. Each booking keeps the route and fare it
+# was sold at, so listings and refunds never read the schedule. Refunds
+# are rounded by the database (ROUND(total * rate, 2)) on every path, so
+# one booking gets the same refund however it is cancelled. The sales
+# summaries are updated in the same transactions.
+
+BOOKING_INSERT = (
+    "INSERT INTO bookings (user_id, flight_id, receipt_id, seats_booked, "
+    "source, destination, price_per_seat, total_amount, booking_date) "
+    "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)"
+)
+
+CANCELLATION_INSERT = """
+    INSERT INTO cancelled_bookings
+    (booking_id, username, flight_id, source, destination, seats_booked,
+    total_amount, amount_refunded,
+    booking_date, cancellation_date, reason)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def _snapshot_flight(flight_id, source, destination, price):
+    # flight row for receipts, rebuilt from a booking's snapshot
+    if source is None:
+        return None
+    return [flight_id, source, destination, float(price or 0)]
+
+
+def create_booking(con, user_id, flight, num, receipt_id):
+    # one transaction: conditional seat decrement, then the booking row,
+    # priced from the flights row the seats were taken from (flight is
+    # only used to add a flight the table does not know yet); returns that
+    # row after commit, with the seats left, or None if not enough seats
+    cur = con.cursor()
+    try:
+        reserved = reserve_seats(cur, flight[0], num)
+        if not reserved and get_seats(cur, flight[0]) is None:
+            # flight only known to the flight file so far
+            ensure_flight(cur, flight)
+            reserved = reserve_seats(cur, flight[0], num)
+        if not reserved:
+            con.rollback()
+            return None
+
+        # the decrement holds the row lock, so this is the fare it sold at
+        row = lock_flights(cur, [flight[0]])[flight[0].upper()]
+        fid, source, destination, price, seats_left = row
+        total = round(price * num, 2)
+        now = datetime.datetime.now()
+        cur.execute(BOOKING_INSERT, (user_id, fid, receipt_id, num, source,
+                                     destination, price, total, now))
+        record_sales(cur, now.date(), [(fid, source, destination, num, total)])
+        con.commit()
+        return [fid, source, destination, format_price(price), str(seats_left)]
+    except Exception:
+        con.rollback()
+        raise
+    finally:
+        cur.close()
+
+
+@metrics.timed("operation_seconds", op="book_flight")
+def book_flight(session, flight_id, num_seats):
+    # books seats and queues the receipt; returns
+    # {"receipt_id", "flight", "seats", "total_cost", "seats_left"}
+    flight = find_flight(flight_id.strip().upper())
+    try:
+        num_seats = int(num_seats)
+    except (TypeError, ValueError):
+        raise ValidationError("Invalid input.")
+    if num_seats <= 0:
+        raise ValidationError("Invalid number of seats.")
+
+    receipt_id = new_receipt_id()
+    with database_errors(), connection() as con:
+        flight = create_booking(con, session.id, flight, num_seats, receipt_id)
+    if flight is None:
+        raise InsufficientSeats("Not enough seats left. Someone else may have just booked them.")
+    seats_left = int(flight[4])
+    mirror_seats(flight[0], seats_left)
+
+    total_cost = round(float(flight[3]) * num_seats, 2)
+    write_receipt(receipt_id, session.username, flight, num_seats,
+                  kind="booking", total_cost=total_cost)
+    return {"receipt_id": receipt_id, "flight": flight, "seats": num_seats,
+            "total_cost": total_cost, "seats_left": seats_left}
+
+
+@metrics.timed("operation_seconds", op="user_bookings")
+def user_bookings(session):
+    # the user's bookings, newest first, as (id, flight_id, source,
+    # destination, seats_booked, price_per_seat, total_amount,
+    # booking_date, receipt_id); route and fare are None for bookings
+    # whose flight was gone before fares were recorded
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        cur.execute("""
+            SELECT b.id, b.flight_id, b.source, b.destination, b.seats_booked,
+                   b.price_per_seat, b.total_amount, b.booking_date, b.receipt_id
+            FROM bookings b
+            WHERE b.user_id=%s
+            ORDER BY b.booking_date DESC
+        """, (session.id,))
+        rows = cur.fetchall()
+        cur.close()
+    return rows
+
+
+@metrics.timed("operation_seconds", op="cancel_booking")
+def cancel_booking(session, booking_id, reason=None):
+    # cancels one of the user's bookings with the configured refund;
+    # returns {"booking_id", "flight", "seats", "total_amount", "refunded"}
+    user_id, username = session.id, session.username
+    try:
+        booking_id = int(booking_id)
+    except (TypeError, ValueError):
+        raise ValidationError("Invalid ID.")
+    reason = reason or "No reason provided"
+    refund_rate = get_setting("refund_rate", 0.75, float)
+
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        cur.execute(
+            "SELECT flight_id, seats_booked, booking_date, source, destination, "
+            "price_per_seat, total_amount, ROUND(COALESCE(total_amount, 0) * %s, 2) "
+            "FROM bookings WHERE id=%s AND user_id=%s",
+            (refund_rate, booking_id, user_id)
+        )
+        row = cur.fetchone()
+        if not row:
+            cur.execute("SELECT 1 FROM cancelled_bookings WHERE booking_id=%s "
+                        "AND username=%s", (booking_id, username))
+            cancelled = cur.fetchone()
+            cur.close()
+            if cancelled:
+                raise Conflict("This booking was already cancelled.")
+            raise NotFound("Booking ID not found.")
+        flight_id, seats_booked, booking_date, source, destination, price, total, refunded = row
+        flight = _snapshot_flight(flight_id, source, destination, price)
+        total_amount = float(total or 0)
+        amount_refunded = float(refunded)
+
+        # delete first so two cancels of one booking cannot both refund
+        cur.execute("DELETE FROM bookings WHERE id=%s", (booking_id,))
+        if cur.rowcount != 1:
+            con.rollback()
+            cur.close()
+            raise Conflict("This booking was already cancelled.")
+        now = datetime.datetime.now()
+        cur.execute(CANCELLATION_INSERT, (
+            booking_id, username, flight_id, source, destination, seats_booked,
+            total_amount, amount_refunded,
+            booking_date, now, reason
+        ))
+        release_seats(cur, flight_id, seats_booked)
+        record_cancellations(cur, now.date(), [(flight_id, source, destination,
+                                                seats_booked, amount_refunded)])
+        seats_left = get_seats(cur, flight_id)
+        con.commit()
+        cur.close()
+
+    mirror_seats(flight_id, seats_left)
+    write_receipt(booking_id, username, flight, num_seats=seats_booked,
+                  kind="cancellation", total_cost=total_amount,
+                  refunded=amount_refunded, reason=reason)
+    return {"booking_id": booking_id, "flight": flight, "seats": seats_booked,
+            "total_amount": total_amount, "refunded": amount_refunded}
+
+
+@metrics.timed("operation_seconds", op="send_feedback")
+def send_feedback(session, message):
+    message = (message or "").strip()
+    if not message:
+        raise ValidationError("Feedback cannot be empty.")
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        cur.execute(
+            "INSERT INTO feedback (user_id, message) VALUES (%s, %s)",
+            (session.id, message)
+        )
+        index_feedback(cur, [(cur.lastrowid, message)])
+        con.commit()
+        cur.close()
+
+
+# Non-interactive booking and cancellation for group bookings and agency
+# feeds. A batch is checked against inventory in memory and written in
+# one transaction; one bad item is reported in its own result and does
+# not stop the others.
+
+
+def _find_users(cur, identifiers):
+    # {identifier: (id, username)} for every identifier that matches a
+    # username or an email; one IN lookup per unique index. MySQL compares
+    # them without case, so matches are keyed in lower case and mapped back
+    # to the identifiers as given.
+    names = sorted(set(identifiers))
+    found = {}
+    emails = [n for n in names if "@" in n]
+    if emails:
+        marks = ", ".join(["%s"] * len(emails))
+        cur.execute(f"SELECT id, username, email FROM users WHERE email IN ({marks})", emails)
+        for user_id, username, email in cur.fetchall():
+            found[email.lower()] = (user_id, username)
+    # usernames, and anything with an @ that was not an email
+    names = [n for n in names if n.lower() not in found]
+    if names:
+        marks = ", ".join(["%s"] * len(names))
+        cur.execute(f"SELECT id, username FROM users WHERE username IN ({marks})", names)
+        for user_id, username in cur.fetchall():
+            found[username.lower()] = (user_id, username)
+    return {n: found[n.lower()] for n in identifiers if n.lower() in found}
+
+
+@metrics.timed("operation_seconds", op="book_many")
+def book_many(requests):
+    # requests: iterable of {"user": username or email, "flight_id": ..., "seats": n}
+    # returns one dict per request, in order, with "ok" and either
+    # "receipt_id" or "error"
+    requests = list(requests)
+    results = [{"index": i, "ok": False} for i in range(len(requests))]
+    pending = []
+
+    for i, req in enumerate(requests):
+        try:
+            user = str(req["user"]).strip()
+            fid = str(req["flight_id"]).strip().upper()
+            seats = int(req.get("seats", 1))
+        except (KeyError, TypeError, ValueError):
+            results[i]["error"] = "Malformed request."
+            continue
+        if not user or not fid:
+            results[i]["error"] = "User and flight ID are required."
+        elif seats <= 0:
+            results[i]["error"] = "Invalid number of seats."
+        else:
+            results[i]["flight_id"] = fid
+            results[i]["seats"] = seats
+            pending.append((i, user, fid, seats))
+
+    if not pending:
+        return results
+
+    receipts = []
+    now = datetime.datetime.now()
+    try:
+        with connection() as con:
+            cur = con.cursor()
+            users = _find_users(cur, [p[1] for p in pending])
+
+            flight_ids = {p[2] for p in pending}
+            flights = lock_flights(cur, flight_ids)
+            for fid in flight_ids - set(flights):
+                # flight only known to the flight file so far
+                row = get_flight(fid)
+                if row:
+                    ensure_flight(cur, row)
+            if len(flights) < len(flight_ids):
+                flights = lock_flights(cur, flight_ids)
+
+            # allocate in request order against the locked seat counts
+            seats_left = {fid: f[4] for fid, f in flights.items()}
+            rows = []
+            for i, user, fid, seats in pending:
+                if user not in users:
+                    results[i]["error"] = "User not found."
+                    continue
+                if fid not in flights:
+                    results[i]["error"] = "Invalid Flight ID."
+                    continue
+                if seats > seats_left[fid]:
+                    results[i]["error"] = "Not enough seats left."
+                    continue
+                seats_left[fid] -= seats
+                user_id, username = users[user]
+                receipt_id = new_receipt_id()
+                flight = flights[fid]
+                total = round(flight[3] * seats, 2)
+                rows.append((user_id, fid, receipt_id, seats, flight[1], flight[2],
+                             flight[3], total, now))
+                results[i].update(ok=True, receipt_id=receipt_id, total_cost=total)
+                receipts.append({
+                    "receipt_id": receipt_id, "username": username,
+                    "flight": flight, "num_seats": seats, "kind": "booking",
+                    "total_cost": total,
+                })
+
+            changed = {fid: n for fid, n in seats_left.items() if n != flights[fid][4]}
+            if rows:
+                cur.executemany(BOOKING_INSERT, rows)
+                set_many_seats(cur, changed)
+                record_sales(cur, now.date(), [(fid, src, dst, seats, total) for
+                                               _, fid, _, seats, src, dst, _, total, _ in rows])
+            con.commit()
+            cur.close()
+    except mysql.connector.Error as err:
+        for i, _, _, _ in pending:
+            results[i] = {"index": i, "ok": False, "error": f"Database error: {err.msg}"}
+        return results
+
+    mirror_many_seats(changed)
+    write_receipts(receipts)
+    return results
+
+
+@metrics.timed("operation_seconds", op="cancel_many")
+def cancel_many(booking_ids, reason=None):
+    # cancels bookings by id with the configured refund; returns one dict
+    # per id, in order, with "ok" and either "refunded" or "error"
+    booking_ids = list(booking_ids)
+    results = [{"booking_id": bid, "ok": False} for bid in booking_ids]
+    ids = set()
+    for r in results:
+        try:
+            r["booking_id"] = int(r["booking_id"])
+            ids.add(r["booking_id"])
+        except (TypeError, ValueError):
+            r["error"] = "Invalid ID."
+    if not ids:
+        return results
+
+    refund_rate = get_setting("refund_rate", 0.75, float)
+    reason = reason or "No reason provided"
+    now = datetime.datetime.now()
+    receipts = []
+    done = {}
+    try:
+        with connection() as con:
+            cur = con.cursor()
+            marks = ", ".join(["%s"] * len(ids))
+            cur.execute(f"""
+                SELECT b.id, u.username, b.flight_id, b.seats_booked, b.booking_date,
+                       b.source, b.destination, b.price_per_seat, b.total_amount,
+                       ROUND(COALESCE(b.total_amount, 0) * %s, 2)
+                FROM bookings b LEFT JOIN users u ON b.user_id = u.id
+                WHERE b.id IN ({marks})
+                FOR UPDATE
+            """, [refund_rate] + sorted(ids))
+            bookings = cur.fetchall()
+
+            released = {}
+            for _, _, fid, seats, *_ in bookings:
+                released[fid.upper()] = released.get(fid.upper(), 0) + seats
+            flights = lock_flights(cur, released)
+
+            cancelled = []
+            for (bid, username, fid, seats, bdate, source, destination, price, total,
+                 refunded) in bookings:
+                flight = _snapshot_flight(fid, source, destination, price)
+                total = float(total or 0)
+                refunded = float(refunded)
+                cancelled.append((bid, username, fid, source, destination, seats, total,
+                                  refunded, bdate, now, reason))
+                done[bid] = {"ok": True, "refunded": refunded}
+                receipts.append({
+                    "receipt_id": bid, "username": username, "flight": flight,
+                    "num_seats": seats, "kind": "cancellation",
+                    "total_cost": total, "refunded": refunded, "reason": reason,
+                })
+
+            new_seats = {fid: f[4] + released[fid] for fid, f in flights.items()}
+            if cancelled:
+                cur.executemany(CANCELLATION_INSERT, cancelled)
+                marks = ", ".join(["%s"] * len(done))
+                cur.execute(f"DELETE FROM bookings WHERE id IN ({marks})", list(done))
+                set_many_seats(cur, new_seats)
+                record_cancellations(cur, now.date(), [
+                    (fid, src, dst, seats, refunded)
+                    for _, _, fid, src, dst, seats, _, refunded, _, _, _ in cancelled
+                ])
+            con.commit()
+            cur.close()
+    except mysql.connector.Error as err:
+        for r in results:
+            if "error" not in r:
+                r["error"] = f"Database error: {err.msg}"
+        return results
+
+    for r in results:
+        if "error" in r:
+            continue
+        if r["booking_id"] in done:
+            r.update(done[r["booking_id"]])
+            done[r["booking_id"]] = {"ok": False, "error": "Duplicate booking ID in batch."}
+        else:
+            r["error"] = "Booking ID not found."
+
+    mirror_many_seats(new_seats)
+    write_receipts(receipts)
+    return results
+
+
+def cancel_flight_bookings(cur, flight_id, reason):
+    # cancels every booking on a flight inside the caller's transaction,
+    # with the configured refund: one INSERT ... SELECT and one DELETE
+    # however many bookings there are. The caller should hold the
+    # flight's row lock so no booking joins in between. Returns the
+    # receipts to queue once the transaction commits.
+    fid = flight_id.upper()
+    refund_rate = get_setting("refund_rate", 0.75, float)
+    now = datetime.datetime.now()
+
+    # the refund is computed by the same expression the insert stores
+    cur.execute("""
+        SELECT b.id, u.username, b.seats_booked, b.source, b.destination,
+               b.price_per_seat, COALESCE(b.total_amount, 0),
+               ROUND(COALESCE(b.total_amount, 0) * %s, 2)
+        FROM bookings b LEFT JOIN users u ON b.user_id = u.id
+        WHERE b.flight_id = %s
+        FOR UPDATE
+    """, (refund_rate, fid))
+    bookings = cur.fetchall()
+    if not bookings:
+        return []
+
+    cur.execute("""
+        INSERT INTO cancelled_bookings
+        (booking_id, username, flight_id, source, destination, seats_booked,
+        total_amount, amount_refunded,
+        booking_date, cancellation_date, reason)
+        SELECT b.id, u.username, b.flight_id, b.source, b.destination, b.seats_booked,
+               COALESCE(b.total_amount, 0), ROUND(COALESCE(b.total_amount, 0) * %s, 2),
+               b.booking_date, %s, %s
+        FROM bookings b LEFT JOIN users u ON b.user_id = u.id
+        WHERE b.flight_id = %s
+    """, (refund_rate, now, reason, fid))
+    cur.execute("DELETE FROM bookings WHERE flight_id = %s", (fid,))
+    record_cancellations(cur, now.date(), [
+        (fid, source, destination, seats, refunded)
+        for _, _, seats, source, destination, _, _, refunded in bookings
+    ])
+
+    return [{
+        "receipt_id": bid, "username": username,
+        "flight": _snapshot_flight(fid, source, destination, price),
+        "num_seats": seats, "kind": "cancellation", "total_cost": float(total),
+        "refunded": float(refunded), "reason": reason,
+    } for bid, username, seats, source, destination, price, total, refunded in bookings]
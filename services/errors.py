@@ -0,0 +1,47 @@
+import contextlib
+import mysql.connector
+
+# Every error a service raises is a ServiceError whose message is ready to
+# show to the user as is.
+
+
+class ServiceError(Exception):
+    pass
+
+
+class ValidationError(ServiceError):
+    # bad input: empty fields, negative numbers, malformed email...
+    pass
+
+
+class NotFound(ServiceError):
+    # unknown user, flight or booking
+    pass
+
+
+class Conflict(ServiceError):
+    # the request clashes with current state: duplicate ID, taken
+    # username, booking already cancelled
+    pass
+
+
+class InsufficientSeats(Conflict):
+    pass
+
+
+class AuthenticationError(ServiceError):
+    pass
+
+
+class Unavailable(ServiceError):
+    # the database could not be reached or rejected the statement
+    pass
+
+
+@contextlib.contextmanager
+def database_errors():
+    # turns connector errors into Unavailable
+    try:
+        yield
+    except mysql.connector.Error as err:
+        raise Unavailable(f"Database error: {err.msg}") from err
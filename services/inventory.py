@@ -0,0 +1,183 @@
+import metrics
+from db_connection import connection
+from inventory import (get_seats, lock_flights, sync_flight, update_schedule,
+                       delete_flight as remove_inventory)
+from flight_search import get_search_index
+from receipts import write_receipts
+from services.errors import Conflict, NotFound, Unavailable, ValidationError, database_errors
+from utils import (read_flights, get_flight, get_flight_store, append_flight, save_flight,
+                   format_price)
+
+# Flight schedule management and search. The flights table is written
+# first and the flight file only after the commit, so a failed write
+# leaves both unchanged. The menus reach flights only through here and
+# the FlightRepository returned by get_flight_store().
+
+
+def parse_price(value):
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        raise ValidationError("Invalid price.")
+    if price <= 0:
+        raise ValidationError("Price must be positive.")
+    return price
+
+
+def parse_seats(value, allow_zero=True):
+    try:
+        seats = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError("Invalid seat number.")
+    if seats < 0:
+        raise ValidationError("Seats cannot be negative.")
+    if seats == 0 and not allow_zero:
+        raise ValidationError("Seats must be positive.")
+    return seats
+
+
+def check_new_flight_id(flight_id):
+    # returns the normalized id, or raises if it cannot be added
+    fid = (flight_id or "").strip().upper()
+    if not fid:
+        raise ValidationError("Flight ID cannot be empty.")
+    with database_errors():
+        taken = fid in get_flight_store()
+    if taken:
+        raise Conflict("Flight ID already exists.")
+    return fid
+
+
+def list_flights():
+    with database_errors():
+        return read_flights()
+
+
+def find_flight(flight_id):
+    with database_errors():
+        flight = get_flight(flight_id)
+    if not flight:
+        raise NotFound("Flight ID not found.")
+    return flight
+
+
+def available_seats(flight):
+    # the flights table is the authority on seats; the file may lag
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        seats = get_seats(cur, flight[0])
+        cur.close()
+    return int(flight[4]) if seats is None else seats
+
+
+def _write_inventory(change, *args):
+    # one change to the flights table in its own transaction
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        change(cur, *args)
+        con.commit()
+        cur.close()
+
+
+def _store(change, store_change, *args):
+    # a schedule change to the flights table and then the flight store;
+    # a store that is the flights table takes it in one write
+    if not get_flight_store().holds_inventory:
+        _write_inventory(change, *args)
+    with database_errors():
+        store_change(*args)
+
+
+@metrics.timed("operation_seconds", op="add_flight")
+def add_flight(flight_id, source, destination, price, seats):
+    # returns the new flight row
+    fid = check_new_flight_id(flight_id)
+    flight = [fid, source.strip(), destination.strip(),
+              format_price(parse_price(price)), str(parse_seats(seats, allow_zero=False))]
+    _store(sync_flight, append_flight, flight)
+    return flight
+
+
+@metrics.timed("operation_seconds", op="update_flight")
+def update_flight(flight_id, source=None, destination=None, price=None, seats=None):
+    # changes the given fields only; returns the updated flight row
+    flight = find_flight(flight_id)
+    if source:
+        flight[1] = source
+    if destination:
+        flight[2] = destination
+    if price is not None:
+        flight[3] = format_price(parse_price(price))
+    if seats is not None:
+        flight[4] = str(parse_seats(seats))
+        _store(sync_flight, save_flight, flight)
+        return flight
+
+    # no new seat count: bookings may have taken seats since the store's
+    # copy was read, so only the route and price are written and the
+    # store gets the table's current count
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        flight[4] = str(update_schedule(cur, flight))
+        con.commit()
+        cur.close()
+    with database_errors():
+        get_flight_store().record_update(flight)
+    return flight
+
+
+def bookings_on_flight(flight_id):
+    # number of live bookings a removal would cancel
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        cur.execute("SELECT COUNT(*) FROM bookings WHERE flight_id=%s",
+                    (flight_id.strip().upper(),))
+        count = cur.fetchone()[0]
+        cur.close()
+    return count
+
+
+@metrics.timed("operation_seconds", op="remove_flight")
+def remove_flight(flight_id, reason=None):
+    # cancels the flight's bookings with the configured refund and drops
+    # its inventory row in one transaction, then removes it from the
+    # flight store; returns the number of bookings cancelled
+    from services.booking import cancel_flight_bookings
+
+    fid = flight_id.strip().upper()
+    store = get_flight_store()
+    with database_errors():
+        known = fid in store
+    if not known:
+        raise NotFound("Flight ID not found.")
+
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        lock_flights(cur, [fid])
+        receipts = cancel_flight_bookings(cur, fid, reason or "Flight cancelled by the airline")
+        remove_inventory(cur, fid)
+        con.commit()
+        cur.close()
+    with database_errors():
+        store.record_removal(fid)
+    write_receipts(receipts)
+    return len(receipts)
+
+
+@metrics.timed("operation_seconds", op="search_flights")
+def search_flights(source="", destination="", min_price=0, max_price=float("inf")):
+    # flights matching the filters, in schedule order
+    if max_price < 0:
+        raise ValidationError("Max price cannot be negative.")
+    return get_search_index().search(source.strip().lower(), destination.strip().lower(),
+                                     max(min_price, 0), max_price)
+
+
+def route_summary(source="", destination=""):
+    # [source, destination, flights, seats left, average fare] per route
+    try:
+        from flight_columns import get_flight_columns
+    except ImportError:
+        raise Unavailable("Route summary needs NumPy (pip install numpy).")
+    with database_errors():
+        return get_flight_columns().route_summary(source, destination)
@@ -0,0 +1,153 @@
+import datetime
+import metrics
+import feedback_search
+from db_connection import connection
+from sales_summary import rebuild_summaries
+from services.errors import ValidationError, database_errors
+
+# Sales reports for admins. They read only the summary tables kept by
+# sales_summary.py (and the flights of the routes on the page for seats
+# left), so they cost the same however long the booking history grows.
+# The flight and route reports cover all time or a single day and come a
+# page at a time, as (rows, key of the next page or None). Each row ends with
+#   bookings, cancellations, seats sold, gross, refunds, net revenue,
+#   load factor
+# where seats sold and net revenue are after cancellations, and the load
+# factor is seats sold over seats sold plus seats left (None when the
+# flights are gone, and in the daily reports, which have no capacity).
+#
+# Feedback search goes through the full-text index of feedback_search.py.
+
+TOTALS = "s.bookings, s.seats_sold, s.gross, s.cancellations, s.seats_cancelled, s.refunds"
+
+
+def _report_row(key, totals, seats_left=None):
+    bookings, seats_sold, gross, cancellations, seats_cancelled, refunds = totals
+    seats = int(seats_sold) - int(seats_cancelled)
+    gross, refunds = float(gross), float(refunds)
+    load = None
+    if seats_left is not None and seats + int(seats_left) > 0:
+        load = round(seats / (seats + int(seats_left)), 3)
+    return list(key) + [int(bookings), int(cancellations), seats, gross, refunds,
+                        round(gross - refunds, 2), load]
+
+
+def _query(sql, params=()):
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cur.close()
+    return rows
+
+
+def _day(day):
+    # a date or YYYY-MM-DD text as a date; None stays None
+    if day is None or isinstance(day, datetime.date):
+        return day
+    try:
+        return datetime.date.fromisoformat(str(day))
+    except ValueError:
+        raise ValidationError("Invalid date, use YYYY-MM-DD.")
+
+
+def _page(rows, limit, width):
+    # (rows, key of the next page or None) from up to limit + 1 rows; the
+    # key is the first width columns of the last row kept
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, tuple(rows[-1][:width])
+
+
+@metrics.timed("operation_seconds", op="sales_by_flight")
+def sales_by_flight(day=None, after=None, limit=100):
+    # one page of [flight id, source, destination, totals...] per flight
+    # sold, all time or on day, after the flight id key of the page before
+    day = _day(day)
+    limit = max(1, min(int(limit), 500))
+    where, params = [], []
+    if day is not None:
+        where.append("s.day = %s")
+        params.append(day)
+    if after is not None:
+        where.append("s.flight_id > %s")
+        params.append(after[0])
+    rows = _query(f"""
+        SELECT s.flight_id, f.source, f.destination, {"NULL" if day else "f.seats"}, {TOTALS}
+        FROM {"sales_by_day_flight" if day else "sales_by_flight"} s
+        LEFT JOIN flights f ON f.id = s.flight_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY s.flight_id LIMIT %s
+    """, params + [limit + 1])
+    return _page([_report_row(r[:3], r[4:], r[3]) for r in rows], limit, 1)
+
+
+@metrics.timed("operation_seconds", op="sales_by_route")
+def sales_by_route(day=None, after=None, limit=100):
+    # one page of [source, destination, totals...] per route sold, all
+    # time or on day, after the (source, destination) key of the page
+    # before; seats left are summed over the page's routes only
+    day = _day(day)
+    limit = max(1, min(int(limit), 500))
+    where, params = [], []
+    if day is not None:
+        where.append("s.day = %s")
+        params.append(day)
+    if after is not None:
+        where.append("(s.source > %s OR (s.source = %s AND s.destination > %s))")
+        params += [after[0], after[0], after[1]]
+    seats = "NULL" if day else """(SELECT SUM(f.seats) FROM flights f
+                   WHERE f.source = s.source AND f.destination = s.destination)"""
+    rows = _query(f"""
+        SELECT s.source, s.destination, {seats}, {TOTALS}
+        FROM {"sales_by_day_route" if day else "sales_by_route"} s
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY s.source, s.destination LIMIT %s
+    """, params + [limit + 1])
+    return _page([_report_row(r[:2], r[3:], r[2]) for r in rows], limit, 2)
+
+
+@metrics.timed("operation_seconds", op="sales_by_day")
+def sales_by_day(days=30):
+    # [day, totals...] for the latest days with sales, newest first
+    try:
+        days = int(days)
+    except (TypeError, ValueError):
+        raise ValidationError("Invalid number of days.")
+    if days <= 0:
+        raise ValidationError("Number of days must be positive.")
+    rows = _query(f"SELECT s.day, {TOTALS} FROM sales_by_day s "
+                  "ORDER BY s.day DESC LIMIT %s", (days,))
+    return [_report_row(r[:1], r[1:]) for r in rows]
+
+
+def rebuild():
+    # recomputes the summaries from the booking history; returns the
+    # number of flights summarized
+    with database_errors():
+        return rebuild_summaries()
+
+
+@metrics.timed("operation_seconds", op="search_feedback")
+def search_feedback(text, since=None, until=None, order="rank", after=None, limit=20):
+    # one page of feedback matching every word of text, as
+    # (rows, key of the next page or None); rows are
+    # (id, username, email, message, created_at, score)
+    words = feedback_search.terms(text)
+    if not words:
+        raise ValidationError("Enter at least one word to search for.")
+    if order not in feedback_search.ORDERS:
+        raise ValidationError(f"Order must be one of {', '.join(feedback_search.ORDERS)}.")
+    if since is not None and until is not None and since >= until:
+        raise ValidationError("The start date must be before the end date.")
+    limit = max(1, min(int(limit), 500))
+    with database_errors(), connection() as con:
+        cur = con.cursor()
+        rows = feedback_search.search(cur, words, since, until, order, after, limit + 1)
+        cur.close()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, (last[5] if order == "rank" else last[4], last[0])
@@ -0,0 +1,213 @@
+import csv
+import sys
+from db_connection import connection
+from utils import HEADERS, FLIGHTS_CSV, FlightRepository, format_price
+
+# Flight schedule kept in the flights table (migration 3): id is the
+# primary key, price DECIMAL(10,2), seats INT. The same rows hold the
+# seat inventory, so bookings can join flights and a schedule change is
+# one transaction. Nothing is cached; every process reads the same
+# table. The search index in each process follows the changes made
+# through this process.
+
+COLUMNS = "id, source, destination, price, seats"
+
+
+def _row(record):
+    # table row -> [id, source, destination, price, seats] as strings, like the file stores
+    return [record[0], record[1], record[2], format_price(record[3]), str(record[4])]
+
+
+def _params(flight):
+    return (flight[0].upper(), flight[1], flight[2], float(flight[3]), int(flight[4]))
+
+
+class SQLFlightStore(FlightRepository):
+    # flight store over the flights table
+
+    holds_inventory = True
+
+    def __init__(self):
+        self._listeners = []
+
+    def _read(self, sql, params=()):
+        with connection() as con:
+            cur = con.cursor()
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            cur.close()
+        return [_row(r) for r in rows]
+
+    def _write(self, sql, params, many=False):
+        # one statement in its own transaction; returns the rowcount
+        with connection() as con:
+            cur = con.cursor()
+            if many:
+                cur.executemany(sql, params)
+            else:
+                cur.execute(sql, params)
+            count = cur.rowcount
+            con.commit()
+            cur.close()
+        return count
+
+    def refresh(self):
+        # reads always go to the table
+        pass
+
+    def all(self):
+        return self._read(f"SELECT {COLUMNS} FROM flights ORDER BY id")
+
+    def get(self, flight_id):
+        rows = self._read(f"SELECT {COLUMNS} FROM flights WHERE id=%s", (flight_id.upper(),))
+        return rows[0] if rows else None
+
+    def get_many(self, flight_ids):
+        # one IN lookup on the primary key
+        ids = sorted({fid.upper() for fid in flight_ids})
+        if not ids:
+            return {}
+        marks = ", ".join(["%s"] * len(ids))
+        rows = self._read(f"SELECT {COLUMNS} FROM flights WHERE id IN ({marks})", ids)
+        return {r[0]: r for r in rows}
+
+    def __contains__(self, flight_id):
+        with connection() as con:
+            cur = con.cursor()
+            cur.execute("SELECT 1 FROM flights WHERE id=%s", (flight_id.upper(),))
+            found = cur.fetchone() is not None
+            cur.close()
+        return found
+
+    def add(self, flight):
+        self._write(f"INSERT INTO flights ({COLUMNS}) VALUES (%s, %s, %s, %s, %s)",
+                    _params(flight))
+        self._notify("add", [flight[0].upper()] + list(flight[1:]))
+
+    def add_many(self, flights):
+        # one transaction for all rows
+        rows = [_params(f) for f in flights]
+        if not rows:
+            return
+        self._write(f"INSERT INTO flights ({COLUMNS}) VALUES (%s, %s, %s, %s, %s)",
+                    rows, many=True)
+        for flight in flights:
+            self._notify("add", [flight[0].upper()] + list(flight[1:]))
+
+    def update(self, flight):
+        fid, source, destination, price, seats = _params(flight)
+        changed = self._write(
+            "UPDATE flights SET source=%s, destination=%s, price=%s, seats=%s WHERE id=%s",
+            (source, destination, price, seats, fid)
+        )
+        # MySQL counts only rows whose values changed
+        if not changed and fid not in self:
+            return False
+        self._notify("update", [fid] + list(flight[1:]))
+        return True
+
+    def set_seats(self, flight_id, seats):
+        return self.set_many_seats({flight_id: seats}) == 1
+
+    def set_many_seats(self, seats_by_id):
+        existing = self.get_many(seats_by_id)
+        changed = [(int(seats), fid.upper()) for fid, seats in seats_by_id.items()
+                   if fid.upper() in existing]
+        if changed:
+            self._write("UPDATE flights SET seats=%s WHERE id=%s", changed, many=True)
+        for seats, fid in changed:
+            self._notify("seats", (fid, seats))
+        return len(changed)
+
+    def record_seats(self, seats_by_id):
+        # the booking transaction already wrote these counts here; only
+        # listeners need to hear about them
+        for fid, seats in seats_by_id.items():
+            self._notify("seats", (fid.upper(), int(seats)))
+        return len(seats_by_id)
+
+    def remove(self, flight_id):
+        fid = flight_id.upper()
+        if not self._write("DELETE FROM flights WHERE id=%s", (fid,)):
+            return False
+        self._notify("remove", fid)
+        return True
+
+    def record_update(self, flight):
+        # the row went in the caller's transaction; tell listeners only
+        self._notify("update", [flight[0].upper()] + list(flight[1:]))
+        return True
+
+    def record_removal(self, flight_id):
+        # the row went in the caller's transaction; tell listeners only
+        self._notify("remove", flight_id.upper())
+        return True
+
+    def replace_all(self, flights):
+        # swaps the whole schedule in one transaction
+        rows = [_params(f) for f in flights if f]
+        with connection() as con:
+            cur = con.cursor()
+            cur.execute("DELETE FROM flights")
+            if rows:
+                cur.executemany(
+                    f"INSERT INTO flights ({COLUMNS}) VALUES (%s, %s, %s, %s, %s)", rows
+                )
+            con.commit()
+            cur.close()
+        self._notify("reload")
+
+
+def import_csv(csv_path=FLIGHTS_CSV):
+    # one-shot copy of a flight file into the flights table; returns
+    # (copied, skipped). Seat counts already in the table are kept, since
+    # bookings have been taking seats from them.
+    with open(csv_path, "r", newline="") as f:
+        records = [r for r in csv.reader(f) if r]
+    if records and records[0] == HEADERS:
+        records = records[1:]
+    rows, skipped = [], 0
+    for r in records:
+        try:
+            rows.append(_params(r))
+        except (ValueError, IndexError):
+            print("Skipping invalid flight row:", r)
+            skipped += 1
+    if rows:
+        with connection() as con:
+            cur = con.cursor()
+            cur.executemany(f"""
+                INSERT INTO flights ({COLUMNS}) VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    source=VALUES(source), destination=VALUES(destination),
+                    price=VALUES(price)
+            """, rows)
+            con.commit()
+            cur.close()
+    return len(rows), skipped
+
+
+def export_csv(csv_path=FLIGHTS_CSV):
+    # writes the flights table out in the csv layout; returns row count
+    rows = SQLFlightStore().all()
+    with open(csv_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        writer.writerows(rows)
+    return len(rows)
+
+
+if __name__ == "__main__":
+    # python sql_flights.py import [flights.csv]
+    # python sql_flights.py export [flights.csv]
+    from db_connection import initialize_database
+
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python sql_flights.py import|export [flights.csv]")
+        sys.exit(1)
+    initialize_database()
+    if sys.argv[1] == "import":
+        copied, skipped = import_csv(*sys.argv[2:3])
+        print(f"{copied} flights copied into the flights table, {skipped} skipped.")
+    else:
+        print(f"{export_csv(*sys.argv[2:3])} flights written.")
@@ -0,0 +1,142 @@
+import datetime
+import re
+import sqlite3
+import mysql.connector
+
+# SQLite stand-in for running without a MySQL server (db_backend=sqlite).
+# The app's SQL is written for MySQL; translate() rewrites the handful of
+# MySQL-only constructs it uses, and sqlite errors are re-raised as
+# mysql.connector errors so every existing except clause still applies.
+# A locking read (FOR UPDATE) starts an immediate transaction instead,
+# since sqlite locks the whole database for writing rather than rows.
+
+_LOCKING_READ = re.compile(r"\s+FOR UPDATE\b", re.I)
+_RULES = [
+    (re.compile(r"%s"), "?"),
+    (_LOCKING_READ, ""),
+    (re.compile(r"\bINSERT IGNORE\b", re.I), "INSERT OR IGNORE"),
+    (re.compile(r"\bINT AUTO_INCREMENT PRIMARY KEY\b", re.I),
+     "INTEGER PRIMARY KEY AUTOINCREMENT"),
+]
+_UPSERT = re.compile(r"\bON DUPLICATE KEY UPDATE\b", re.I)
+_UPSERT_VALUE = re.compile(r"\bVALUES\((\w+)\)", re.I)
+
+_cache = {}
+
+# store datetimes the way mysql prints them
+sqlite3.register_adapter(datetime.datetime, lambda v: v.isoformat(" "))
+sqlite3.register_adapter(datetime.date, lambda v: v.isoformat())
+
+
+def translate(sql):
+    # MySQL statement -> SQLite statement; cached per statement text
+    out = _cache.get(sql)
+    if out is None:
+        out = sql
+        for pattern, repl in _RULES:
+            out = pattern.sub(repl, out)
+        if _UPSERT.search(out):
+            out = _UPSERT.sub("ON CONFLICT DO UPDATE SET", out)
+            out = _UPSERT_VALUE.sub(r"excluded.\1", out)
+        _cache[sql] = out
+    return out
+
+
+def _error(err):
+    if isinstance(err, sqlite3.IntegrityError):
+        return mysql.connector.IntegrityError(msg=str(err))
+    return mysql.connector.DatabaseError(msg=str(err))
+
+
+class SQLiteCursor:
+    # the subset of the mysql.connector cursor API the app uses
+
+    def __init__(self, con, dictionary=False):
+        self._con = con
+        self._cur = con.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        try:
+            if not self._con.in_transaction and _LOCKING_READ.search(sql):
+                self._con.execute("BEGIN IMMEDIATE")
+            self._cur.execute(translate(sql), tuple(params))
+        except sqlite3.Error as err:
+            raise _error(err) from err
+
+    def executemany(self, sql, seq):
+        try:
+            self._cur.executemany(translate(sql), [tuple(p) for p in seq])
+        except sqlite3.Error as err:
+            raise _error(err) from err
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {d[0]: v for d, v in zip(self._cur.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cur.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(r) for r in self._cur.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cur.fetchall()]
+
+    def __iter__(self):
+        for row in self._cur:
+            yield self._row(row)
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self):
+        self._cur.close()
+
+
+class SQLiteConnection:
+    # one sqlite connection, usable from the pool's worker threads
+
+    def __init__(self, path, timeout=30):
+        try:
+            self._con = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+            self._con.execute("PRAGMA journal_mode=WAL")
+            self._con.execute("PRAGMA foreign_keys=ON")
+        except sqlite3.Error as err:
+            raise _error(err) from err
+
+    def cursor(self, dictionary=False, **kwargs):
+        return SQLiteCursor(self._con, dictionary)
+
+    def commit(self):
+        try:
+            self._con.commit()
+        except sqlite3.Error as err:
+            raise _error(err) from err
+
+    def rollback(self):
+        self._con.rollback()
+
+    @property
+    def in_transaction(self):
+        return self._con.in_transaction
+
+    def is_connected(self):
+        try:
+            self._con.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self._con.close()
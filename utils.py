@@ -1,67 +1,525 @@
+import abc
 import csv
-from tabulate import tabulate
-import time
+import decimal
+import os
+import threading
+import metrics
+from config import get_setting
 
 FLIGHTS_CSV = "flights.csv"
 HEADERS = ["id", "source", "destination", "price", "seats"]
 
-def ensure_file_exists():
+def format_price(value):
+    # price as flight rows hold it: "5000" rather than "5000.0", so every
+    # store and the CSV round trip give back the same text
+    price = float(value)
+    return str(int(price)) if price.is_integer() else str(price)
+
+def ensure_file_exists(path=FLIGHTS_CSV):
     # create flights csv if it does not exist
     try:
-        open(FLIGHTS_CSV, "r").close()
+        open(path, "r").close()
     except FileNotFoundError:
-        with open(FLIGHTS_CSV, "w", newline="") as f:
+        with open(path, "w", newline="") as f:
             writer = csv.writer(f)
             writer.writerow(HEADERS)
 
-def read_flights():
-    # read flight data from csv file
-    ensure_file_exists()
-    data = []
-    with open(FLIGHTS_CSV, "r", newline="") as f:
-        reader = csv.reader(f)
-        data = list(reader)
-
-    records = data
-    if records and records[0] == HEADERS:
-        records = data[1:]
-
-    # make sure flight ids are in uppercase
-    for r in records:
-        if r and len(r) > 0:
+
+def write_csv_atomic(path, rows):
+    # writes the header and rows to a temp file and renames it over path,
+    # so a crash leaves either the old file or the new one; returns bytes written
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(tmp, path)
+    fsync_dir(path)
+    return size
+
+
+def fsync_dir(path):
+    # makes a rename into path's directory durable; directories cannot be
+    # opened on Windows
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class StoreEvents:
+    # change notifications for flight stores; callbacks get (event, data):
+    #   "reload"          data is None, every row may have changed
+    #   "add", "update"   data is a copy of the row
+    #   "seats"           data is (flight id, new seat count)
+    #   "remove"          data is the flight id
+    # stores set self._listeners = [] in __init__
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    def _notify(self, event, data=None):
+        for callback in self._listeners:
+            callback(event, list(data) if isinstance(data, list) else data)
+
+
+class FlightRepository(StoreEvents, abc.ABC):
+    # what the rest of the program needs from a flight store. Rows are
+    # [id, source, destination, price, seats] lists of strings with the id
+    # in upper case; methods that take an id return False when it is
+    # missing. Implementations: FlightStore (flights.csv),
+    # JournalFlightStore (flight_journal.py), BinaryFlightStore
+    # (binary_flights.py) and SQLFlightStore (sql_flights.py), chosen by
+    # flights_format in get_flight_store(). A store must implement every
+    # abstract method; the others have defaults built on them.
+
+    # True when the store is the flights table itself, so schedule changes
+    # need no separate write to the seat inventory
+    holds_inventory = False
+
+    @abc.abstractmethod
+    def refresh(self):
+        # picks up changes made by other processes
+        pass
+
+    @abc.abstractmethod
+    def all(self):
+        # copies of every row
+        pass
+
+    @abc.abstractmethod
+    def get(self, flight_id):
+        # copy of one row, or None
+        pass
+
+    def get_many(self, flight_ids):
+        # {id: row} for the ids that exist
+        found = {}
+        for fid in flight_ids:
+            row = self.get(fid)
+            if row is not None:
+                found[row[0]] = row
+        return found
+
+    @abc.abstractmethod
+    def __contains__(self, flight_id):
+        pass
+
+    @abc.abstractmethod
+    def add(self, flight):
+        pass
+
+    @abc.abstractmethod
+    def add_many(self, flights):
+        pass
+
+    @abc.abstractmethod
+    def update(self, flight):
+        pass
+
+    @abc.abstractmethod
+    def set_seats(self, flight_id, seats):
+        pass
+
+    @abc.abstractmethod
+    def set_many_seats(self, seats_by_id):
+        # returns how many flights were changed
+        pass
+
+    def record_seats(self, seats_by_id):
+        # seat counts a booking transaction committed to the flights table;
+        # file stores keep a copy of them for listings
+        return self.set_many_seats(seats_by_id)
+
+    @abc.abstractmethod
+    def remove(self, flight_id):
+        pass
+
+    def record_update(self, flight):
+        # a flight a transaction already updated in the flights table;
+        # file stores write their copy of it
+        return self.update(flight)
+
+    def record_removal(self, flight_id):
+        # a flight a transaction already deleted from the flights table;
+        # file stores drop their copy of it
+        return self.remove(flight_id)
+
+    @abc.abstractmethod
+    def replace_all(self, flights):
+        pass
+
+
+class FlightStore(FlightRepository):
+    # keeps flights.csv parsed in memory with a hash index by flight id;
+    # the file is re-read only when its mtime or size changes
+
+    def __init__(self, path=FLIGHTS_CSV):
+        self.path = path
+        self._rows = []
+        self._index = {}    # flight id -> row (same list object as in _rows)
+        self._stamp = None  # (mtime, size) of the file when last loaded
+        self._lock = threading.RLock()
+        self._listeners = []
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _refresh(self):
+        # reload if the file changed on disk since we last saw it
+        ensure_file_exists(self.path)
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            self._load()
+            self._stamp = stamp
+            self._notify("reload")
+
+    def _load(self):
+        with metrics.timer("flights_file_seconds", op="read"), \
+                open(self.path, "r", newline="") as f:
+            records = list(csv.reader(f))
+        if records and records[0] == HEADERS:
+            records = records[1:]
+        self._rows = []
+        self._index = {}
+        for r in records:
+            if not r:
+                continue
+            # make sure flight ids are in uppercase
             r[0] = r[0].upper()
+            self._rows.append(r)
+            self._index.setdefault(r[0], r)
+
+    def _save(self):
+        # write all rows back and remember the new file stamp
+        with metrics.timer("flights_file_seconds", op="write"):
+            written = write_csv_atomic(self.path, self._rows)
+        metrics.count("flights_file_bytes_written_total", written)
+        self._stamp = self._file_stamp()
+
+    def refresh(self):
+        # picks up changes made to the file by someone else
+        with self._lock:
+            self._refresh()
 
-    return records
+    def all(self):
+        # copies of every row, in file order
+        with self._lock:
+            self._refresh()
+            return [list(r) for r in self._rows]
+
+    def get(self, flight_id):
+        # copy of one row, or None
+        with self._lock:
+            self._refresh()
+            row = self._index.get(flight_id.upper())
+            return list(row) if row else None
+
+    def __contains__(self, flight_id):
+        with self._lock:
+            self._refresh()
+            return flight_id.upper() in self._index
+
+    def add(self, flight):
+        # appends a row without rewriting the file
+        with self._lock:
+            self._refresh()
+            row = list(flight)
+            row[0] = row[0].upper()
+            with metrics.timer("flights_file_seconds", op="append"), \
+                    open(self.path, "a", newline="") as f:
+                start = f.tell()
+                csv.writer(f).writerow(row)
+                metrics.count("flights_file_bytes_written_total", f.tell() - start)
+            self._rows.append(row)
+            self._index.setdefault(row[0], row)
+            self._stamp = self._file_stamp()
+            self._notify("add", row)
+
+    def add_many(self, flights):
+        # appends several rows with one file write
+        with self._lock:
+            self._refresh()
+            rows = []
+            for f in flights:
+                row = list(f)
+                row[0] = row[0].upper()
+                rows.append(row)
+            with metrics.timer("flights_file_seconds", op="append"), \
+                    open(self.path, "a", newline="") as f:
+                start = f.tell()
+                csv.writer(f).writerows(rows)
+                metrics.count("flights_file_bytes_written_total", f.tell() - start)
+            for row in rows:
+                self._rows.append(row)
+                self._index.setdefault(row[0], row)
+            self._stamp = self._file_stamp()
+            for row in rows:
+                self._notify("add", row)
+
+    def update(self, flight):
+        # replaces the row with the same id; returns False if missing
+        with self._lock:
+            self._refresh()
+            row = self._index.get(flight[0].upper())
+            if row is None:
+                return False
+            row[1:] = list(flight[1:])
+            self._save()
+            self._notify("update", row)
+            return True
+
+    def set_seats(self, flight_id, seats):
+        # changes only the seat count of one flight
+        with self._lock:
+            self._refresh()
+            row = self._index.get(flight_id.upper())
+            if row is None:
+                return False
+            row[4] = str(seats)
+            self._save()
+            self._notify("seats", (row[0], int(seats)))
+            return True
+
+    def set_many_seats(self, seats_by_id):
+        # changes seat counts of several flights with one file write
+        with self._lock:
+            self._refresh()
+            changed = []
+            for fid, seats in seats_by_id.items():
+                row = self._index.get(fid.upper())
+                if row is not None:
+                    row[4] = str(seats)
+                    changed.append((row[0], int(seats)))
+            if changed:
+                self._save()
+            for change in changed:
+                self._notify("seats", change)
+            return len(changed)
+
+    def remove(self, flight_id):
+        # drops every row with this id; returns False if missing
+        with self._lock:
+            self._refresh()
+            fid = flight_id.upper()
+            if fid not in self._index:
+                return False
+            self._rows = [r for r in self._rows if r[0] != fid]
+            del self._index[fid]
+            self._save()
+            self._notify("remove", fid)
+            return True
+
+    def replace_all(self, flights):
+        # replaces the whole schedule
+        with self._lock:
+            self._rows = []
+            self._index = {}
+            for f in flights:
+                if not f:
+                    continue
+                row = list(f)
+                row[0] = row[0].upper()
+                self._rows.append(row)
+                self._index.setdefault(row[0], row)
+            self._save()
+            self._notify("reload")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_flight_store():
+    # process-wide flight store; flights_format in db_config.txt picks
+    # journal (flights.csv plus a change journal), binary (memory-mapped
+    # fixed-width file) or sql (the flights table)
+    global _store
+    with _store_lock:
+        if _store is None:
+            kind = get_setting("flights_format", "csv")
+            if kind == "binary":
+                from binary_flights import BinaryFlightStore, FLIGHTS_BIN
+                _store = BinaryFlightStore(get_setting("flights_file", FLIGHTS_BIN))
+            elif kind == "journal":
+                from flight_journal import JournalFlightStore
+                _store = JournalFlightStore(get_setting("flights_file", FLIGHTS_CSV))
+            elif kind == "sql":
+                from sql_flights import SQLFlightStore
+                _store = SQLFlightStore()
+            else:
+                _store = FlightStore(get_setting("flights_file", FLIGHTS_CSV))
+        return _store
+
+def read_flights():
+    # read flight data from csv file
+    return get_flight_store().all()
 
 def write_flights(flights):
     # write all flight records back to csv
-    formatted_flights = []
     for f in flights:
         if f and len(f) > 0:
             f[0] = f[0].upper()
-        formatted_flights.append(f)
-
-    with open(FLIGHTS_CSV, "w", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(HEADERS)
-        writer.writerows(formatted_flights)
+    get_flight_store().replace_all(flights)
 
 def append_flight(flight):
     # add a new flight record to csv
-    ensure_file_exists()
-
     if flight and len(flight) > 0:
         flight[0] = flight[0].upper()
+    get_flight_store().add(flight)
 
-    with open(FLIGHTS_CSV, "a", newline="") as f:
-        writer = csv.writer(f)
-        writer.writerow(flight)
-
-def display_table(records, headers=HEADERS):
-    # display data in table format
-    if not records:
-        print("No records available.")
-        time.sleep(1)
-    else:
-        print(tabulate(records, headers=headers, tablefmt="grid"))
-        time.sleep(1)
+def append_flights(flights):
+    # add several new flight records at once
+    get_flight_store().add_many(flights)
+
+def get_flight(flight_id):
+    # look up one flight by id
+    return get_flight_store().get(flight_id)
+
+def save_flight(flight):
+    # store changes to one existing flight
+    return get_flight_store().update(flight)
+
+def set_flight_seats(flight_id, seats):
+    # store a new seat count for one flight
+    return get_flight_store().set_seats(flight_id, seats)
+
+def set_many_flight_seats(seats_by_id):
+    # store new seat counts for several flights at once
+    return get_flight_store().set_many_seats(seats_by_id)
+
+def delete_flight(flight_id):
+    # remove one flight by id
+    return get_flight_store().remove(flight_id)
+
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float, decimal.Decimal)):
+        return True
+    try:
+        float(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+def _cell(value):
+    # one line of text per cell
+    return "" if value is None else " ".join(str(value).split())
+
+class TablePager:
+    # pages over a list or any iterable of rows, pulling rows from it
+    # only as pages are asked for; column widths come from known limits or
+    # a sample and only widen if a later page needs more, so each page is
+    # formatted on its own
+
+    def __init__(self, records, headers, page_size=20, widths=None, sample=100, max_width=60):
+        self.headers = [str(h) for h in headers]
+        self.page_size = max(1, page_size)
+        self._source = iter(records)
+        self._rows = []
+        self._done = False
+        self.max_width = max_width
+        self._fill(max(sample, self.page_size))
+        self.widths = list(widths) if widths else self._measure(self._rows)
+        self._numeric = [all(_is_number(r[i]) for r in self._rows if r[i] not in (None, ""))
+                         for i in range(len(self.headers))]
+
+    def _fill(self, count):
+        # buffers rows until count are held or the source runs out; rows
+        # are padded or cut to one cell per header, since a malformed line
+        # in the flight file can be short
+        n = len(self.headers)
+        while not self._done and len(self._rows) < count:
+            try:
+                row = list(next(self._source))[:n]
+            except StopIteration:
+                self._done = True
+                break
+            self._rows.append(row + [""] * (n - len(row)))
+
+    def _measure(self, rows, widths=None):
+        # widest cell per column, up to max_width
+        widths = list(widths or [len(h) for h in self.headers])
+        for row in rows:
+            for i, value in enumerate(row):
+                widths[i] = max(widths[i], min(len(_cell(value)), self.max_width))
+        return widths
+
+    def has_page(self, number):
+        # pages count from 0
+        self._fill(number * self.page_size + 1)
+        return len(self._rows) > number * self.page_size
+
+    @property
+    def pages(self):
+        # page count once the source is used up, else None
+        if not self._done:
+            return None
+        return max(1, -(-len(self._rows) // self.page_size))
+
+    def _line(self, fill):
+        return "+" + "+".join(fill * (w + 2) for w in self.widths) + "+"
+
+    def _format(self, values, numeric):
+        cells = []
+        for value, width, right in zip(values, self.widths, numeric):
+            text = _cell(value)
+            if len(text) > width:
+                text = text[:max(width - 3, 0)] + "..."[:width]
+            cells.append(text.rjust(width) if right else text.ljust(width))
+        return "| " + " | ".join(cells) + " |"
+
+    def render(self, number):
+        # the page as a grid table, in the layout tabulate's "grid" uses;
+        # columns only widen if a later page holds longer values
+        start = number * self.page_size
+        self._fill(start + self.page_size)
+        page = self._rows[start:start + self.page_size]
+        self.widths = self._measure(page, self.widths)
+        rule = self._line("-")
+        lines = [rule, self._format(self.headers, self._numeric), self._line("=")]
+        for row in page:
+            lines.append(self._format(row, self._numeric))
+            lines.append(rule)
+        return "\n".join(lines)
+
+def display_table(records, headers=HEADERS, page_size=None, widths=None,
+                  empty="No records available."):
+    # shows rows from a list or generator a page at a time; a single page
+    # is printed without a prompt
+    pager = TablePager(records, headers, page_size or get_setting("page_size", 20, int), widths)
+    if not pager.has_page(0):
+        print(empty)
+        return
+    number = 0
+    while True:
+        print(pager.render(number))
+        more = pager.has_page(number + 1)
+        if number == 0 and not more:
+            return
+        total = pager.pages
+        print(f"Page {number + 1}" + (f" of {total}" if total else ""))
+        options = (["n = next"] if more else []) + (["p = previous"] if number else [])
+        c = input(f"[{', '.join(options + ['j <page> = jump', 'q = done'])}]: ").strip().lower()
+        if c == "n" or (c == "" and more):
+            if more:
+                number += 1
+        elif c == "p":
+            number = max(number - 1, 0)
+        elif c.startswith("j"):
+            target = c[1:].strip() or input("Page: ").strip()
+            if target.isdigit() and int(target) > 0 and pager.has_page(int(target) - 1):
+                number = int(target) - 1
+            else:
+                print("No such page.")
+        elif c in ("q", ""):
+            return